@@ -1,7 +1,5 @@
 import streamlit as st
-import pandas as pd
 from utils.fonctions import load_css
-from utils.chatbot import get_embeddings
 
 st.set_page_config(
     page_title="Netflix Clone - Connexion",
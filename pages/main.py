@@ -2,13 +2,15 @@ import streamlit as st
 from utils.fonctions import (
     load_css,
     get_random_movies,
+    get_films_pour_vous,
+    get_catalogue,
+    ma_liste_ids,
     afficher_films_sans_boutons,
-    load_movies,
+    catalogue_disponible,
     call_chatbot,
     afficher_films_par_cible
     
 )
-from utils.vectorestore import load_vectorstore
 
 st.set_page_config(
     page_title="MovieMind",
@@ -22,11 +24,11 @@ load_css("style.css")
 
 
 # Initialisation de l'état de session
-if "selected_film" not in st.session_state:
-    st.session_state["selected_film"] = None
+if "selected_film_id" not in st.session_state:
+    st.session_state["selected_film_id"] = None
 
-# Chargement des films
-movies = load_movies()
+# Catalogue disponible ? (sans copier le DataFrame)
+films_disponibles = catalogue_disponible()
 
 # Structure de la page principale
 container = st.container()
@@ -37,18 +39,9 @@ with st.sidebar:
 
 
 # Initialisation des variables de session
-if "conversation" not in st.session_state:
-    st.session_state.conversation = None
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
-
 if "query" not in st.session_state:
     st.session_state.query = "spider_man"
 
-# Initialisation du vectorstore
-if "vectorstore" not in st.session_state:
-    st.session_state.vectorstore = load_vectorstore()
-
 # Contenu principal
 with container:
     # En-tête
@@ -68,13 +61,19 @@ with container:
         st.switch_page("pages/page_2.py")
 
     # Affichage des films suggérés
-    if not query and not movies.empty:
+    if not query and films_disponibles:
         st.markdown('<h2 style="color: #999; margin: 1em 0;">Films suggérés pour vous</h2>', 
                    unsafe_allow_html=True)
         
-        random_movies = get_random_movies(movies, count=20)
+        # Classement selon "Ma Liste" si elle n'est pas vide, tirage aléatoire sinon
+        ids_liste = ma_liste_ids()
+        random_movies = get_films_pour_vous(count=5, nb_cibles=4, ids_liste=ids_liste)
+        if random_movies is None:
+            random_movies = get_random_movies(count=5, nb_cibles=4)
+        if ids_liste:
+            random_movies = {"❤️ Ma Liste": get_catalogue().films(ids_liste[:10]), **random_movies}
         afficher_films_par_cible(random_movies)
-    elif movies.empty:
+    elif not films_disponibles:
         st.error("Aucune donnée de films disponible. Vérifiez la base de données.")
     
 
@@ -14,8 +14,42 @@ load_css("style.css")
 with st.sidebar:
     call_chatbot()
 
-movies = load_movies()
+@st.fragment
+def afficher_resultats(query):
+    """
+    Grille des résultats : la pagination ne réexécute que ce fragment.
+    """
+    results = fuzzy_search(query, limit=50)
+    
+    if results:
+        # Résolution par id_tmdb, dans le backend de la recherche
+        matched_ids = [id_tmdb for _, _, ids in results for id_tmdb in ids]
+        matched_movies = films_trouves(matched_ids)
 
+        # Nouvelle recherche : retour à la première page de résultats
+        if st.session_state.get("page_resultats_query") != query:
+            st.session_state["page_resultats_query"] = query
+            st.session_state["page_resultats"] = 0
+        # Un clic sur un titre sous la grille ouvre la fiche du film (page 3)
+        affiches = afficher_grille(matched_movies, par_page=20, key="page_resultats")
+        choisir_film(affiches, key="choix_resultats")
+    else:
+        st.warning("Aucun résultat trouvé pour votre recherche.")
+
+        # Plus comme ça : voisins (graphe précalculé) des titres les plus
+        # approchants, à défaut du dernier film consulté
+        approchants = titres_approchants(query, limit=3)
+        depart = [id_tmdb for _, _, ids in approchants for id_tmdb in ids]
+        if not depart and st.session_state.get("selected_film_id") is not None:
+            depart = [st.session_state["selected_film_id"]]
+        suggestions = plus_comme_ca(depart, k=10) if depart else None
+        if suggestions is not None and not suggestions.empty:
+            st.markdown("<h4>Vous aimerez peut-être</h4>", unsafe_allow_html=True)
+            afficher_grille(suggestions)
+            choisir_film(suggestions, key="choix_similaires")
+
+        if st.button("Retour à la page principale"):
+            st.switch_page("pages/main.py")
 
 if "query" in st.session_state:
     query = st.session_state["query"]
@@ -23,36 +57,7 @@ if "query" in st.session_state:
     st.markdown("<h2>Résultats de recherche</h2>", unsafe_allow_html=True)
     st.markdown("<h4>Films correspondants à votre recherche</h4>", unsafe_allow_html=True)
     
-    titles = movies["title"].tolist()
-    results = fuzzy_search(query, titles)
-    
-    if results:
-        matched_titles = [res[0] for res in results]
-        matched_movies = movies[movies["title"].isin(matched_titles)]
-        matched_movies = matched_movies.drop_duplicates(subset='id_tmdb')
-        cols = st.columns(5)
-        
-        for idx, (_, film) in enumerate(matched_movies.iterrows()):
-            col = cols[idx % 5]
-            with col:
-                with st.container():
-                    st.markdown(f"""
-                        <div class="movie-card">
-                            <img src="{film['lien_photos']}" style="width: 100%; border-radius: 4px;">
-                        </div>
-                    """, unsafe_allow_html=True)
-                    
-                    if st.button(
-                        film['title'],
-                        key=f"btn_{idx}",
-                        use_container_width=True,
-                    ):
-                        st.session_state["selected_film"] = film.to_dict()
-                        st.switch_page("pages/page_3.py")
-    else:
-        st.warning("Aucun résultat trouvé pour votre recherche.")
-        if st.button("Retour à la page principale"):
-            st.switch_page("pages/main.py")
+    afficher_resultats(query)
 else:
     st.error("Aucune recherche détectée. Veuillez effectuer une recherche depuis la page principale.")
     if st.button("Retour à la page principale"):
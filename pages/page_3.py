@@ -11,8 +11,15 @@ with st.sidebar:
     call_chatbot()
 
 
-if "selected_film" in st.session_state and st.session_state["selected_film"]:
-    film = st.session_state["selected_film"]
+@st.fragment
+def afficher_film():
+    """
+    Fiche du film et recommandations : un clic sur une recommandation ou sur
+    "+ Ma Liste" ne réexécute que ce fragment.
+    """
+    film = film_selectionne()
+    if film is None:
+        return
     
     col1, col2 = st.columns([2, 1])
     
@@ -23,7 +30,7 @@ if "selected_film" in st.session_state and st.session_state["selected_film"]:
         
         st.markdown(f"""
         <div class="movie-info">
-        ⭐ Note: {film.get('note_moyenne', 0) if pd.notna(film.get('note_moyenne')) else 0}/10<br>
+        ⭐ Note: {film['note_moyenne'] if film['note_moyenne'] is not None else 0}/10<br>
         </div>
         """, unsafe_allow_html=True)
 
@@ -35,33 +42,31 @@ if "selected_film" in st.session_state and st.session_state["selected_film"]:
             if st.button("▶️ Voir plus de détails", use_container_width=True):
                 st.switch_page("pages/page_4.py")
         with col_btn1:
-            st.button("+ Ma Liste", use_container_width=True, icon="❤️")
+            dans_ma_liste = film["id_tmdb"] in ma_liste_ids()
+            st.button(
+                "Retirer de Ma Liste" if dans_ma_liste else "+ Ma Liste",
+                use_container_width=True,
+                icon="❤️",
+                on_click=basculer_ma_liste,
+                args=(film["id_tmdb"],),
+            )
     
     with col2:
         st.image(film["lien_photos"], use_container_width=True)
 
     st.markdown('<p class="category-title">Films recommendés</p>', unsafe_allow_html=True)
-    recommendations = eval(film.get("recommendations", "[]"))
-    movies = load_movies()
-    recommended_movies = movies[movies["title"].isin(recommendations)]
+    # Recommandations du CSV déjà résolues en id_tmdb dans les artefacts du
+    # catalogue ; à défaut, films similaires précalculés sur le contenu
+    catalogue = get_catalogue()
+    ids_recommandes = catalogue.recommandations_ou_similaires(film["id_tmdb"])
+    recommended_movies = catalogue.films(ids_recommandes)
     
-    cols = st.columns(5)
-    for idx, (_, movie) in enumerate(recommended_movies.iterrows()):
-        with cols[idx % 5]:
-            with st.container():
-                st.markdown(f"""
-                    <div class="movie-card">
-                        <img src="{movie['lien_photos']}" style="width: 100%; border-radius: 4px;">
-                    </div>
-                """, unsafe_allow_html=True)
-                
-                if st.button(
-                    movie["title"],
-                    key=f"rec_{idx}",
-                    use_container_width=True
-                ):
-                    st.session_state["selected_film"] = movie.to_dict()
-                    st.rerun()
+    # Grille en un seul bloc HTML ; un clic sur un titre affiche ce film et
+    # ne réexécute que ce fragment
+    afficher_grille(recommended_movies)
+    choisir_film(recommended_movies, key="choix_recommandation", page=None)
+
+afficher_film()
 
 #button navigation 
 col1, col2 , col3 = st.columns([1,2,1])
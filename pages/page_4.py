@@ -1,7 +1,6 @@
 import streamlit as st
 import pandas as pd
-import ast
-from utils.fonctions import load_css , call_chatbot
+from utils.fonctions import load_css , call_chatbot, film_selectionne
 
 st.set_page_config(page_title="NetflixClone", page_icon="🎬", layout="wide")
 #css
@@ -10,12 +9,9 @@ load_css("style.css")
 with st.sidebar:
     call_chatbot()
 
-if "selected_film" not in st.session_state:
-    st.session_state["selected_film"] = None
+film = film_selectionne()
 
-
-if st.session_state["selected_film"]:
-    film = st.session_state["selected_film"]
+if film is not None:
 
     # En-tête du film
     st.markdown(f'<h1 class="movie-title">{film["title"]}</h1>', unsafe_allow_html=True)
@@ -27,7 +23,7 @@ if st.session_state["selected_film"]:
         st.markdown("""
             <div class="movie-container">
         """, unsafe_allow_html=True)
-        st.image(film.get("lien_photos", ""), use_container_width=True)
+        st.image(film["lien_photos"], use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
     with col2:
@@ -36,20 +32,15 @@ if st.session_state["selected_film"]:
             <h3 class="section-title">🎥 Bande-annonce</h3>
         """, unsafe_allow_html=True)
         
-        if "trailers" in film and pd.notnull(film["trailers"]):
-            try:
-                trailers = ast.literal_eval(film["trailers"]) if isinstance(film["trailers"], str) else film["trailers"]
-                if trailers:
-                    selected_trailer = st.selectbox(
-                        "Choisissez une bande-annonce :",
-                        trailers,
-                        key="trailer_select"
-                    )
-                    st.video(selected_trailer)
-                else:
-                    st.info("Aucune bande-annonce disponible.")
-            except Exception as e:
-                st.error(f"Erreur lors de la lecture des trailers : {e}")
+        # Listes déjà analysées à l'ingestion du catalogue
+        trailers = list(film["trailers"])
+        if trailers:
+            selected_trailer = st.selectbox(
+                "Choisissez une bande-annonce :",
+                trailers,
+                key="trailer_select"
+            )
+            st.video(selected_trailer)
         else:
             st.info("Aucune bande-annonce disponible.")
         st.markdown("</div>", unsafe_allow_html=True)
@@ -60,7 +51,7 @@ if st.session_state["selected_film"]:
         <h3 class="section-title">📖 Synopsis</h3>
         <div class="movie-description">
     """, unsafe_allow_html=True)
-    st.write(film.get("overview", "Aucune description disponible."))
+    st.write(film["overview"] or "Aucune description disponible.")
     st.markdown("</div></div>", unsafe_allow_html=True)
 
     # Section informations
@@ -72,23 +63,19 @@ if st.session_state["selected_film"]:
     # Note moyenne
     st.markdown(f"""
         <div class="movie-rating">
-        ⭐ Note : {film.get('note_moyenne', 'N/A')}/10
+        ⭐ Note : {film['note_moyenne'] if film['note_moyenne'] is not None else 'N/A'}/10
         </div>
     """, unsafe_allow_html=True)
 
     # Casting
     st.markdown('<h3 class="section-title">🎭 Distribution</h3>', unsafe_allow_html=True)
-    acteur_name = 'name_x'
-    if acteur_name in film and pd.notnull(film[acteur_name]):
-        try:
-            cast = ast.literal_eval(film[acteur_name]) if isinstance(film[acteur_name], str) else film[acteur_name]
-            st.markdown(f"""
-                <div class="movie-cast">
-                {", ".join(cast)}
-                </div>
-            """, unsafe_allow_html=True)
-        except Exception as e:
-            st.error(f"Erreur lors de la lecture des intervenants : {e}")
+    cast = film["name_x"]
+    if cast:
+        st.markdown(f"""
+            <div class="movie-cast">
+            {", ".join(cast)}
+            </div>
+        """, unsafe_allow_html=True)
     else:
         st.write("Aucun intervenant disponible.")
     st.markdown("</div>", unsafe_allow_html=True)
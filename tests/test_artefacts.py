@@ -0,0 +1,64 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils import artefacts
+
+
+@pytest.fixture
+def csv(tmp_path):
+    chemin = tmp_path / "films.csv"
+    pd.DataFrame({
+        "id_tmdb": [10, 11, 12],
+        "title": ["Alpha", "Beta", "Gamma"],
+        "overview": ["a", "b", "c"],
+        "recommendations": ["['Beta']", "[]", "[]"],
+        "note_moyenne": [7.0, 5.0, 6.0],
+        "lien_photos": ["p10", "p11", "p12"],
+        "cibles": ["Famille", "Adultes", "Famille"],
+    }).to_csv(chemin, index=False)
+    return chemin
+
+
+def test_version_existante_gardee(csv, tmp_path):
+    dossier = str(tmp_path / "artefacts")
+    final = artefacts.construire_artefacts(str(csv), dossier, avec_similaires=False)
+    marque = os.path.join(final, "ouvert-par-un-autre-processus")
+    open(marque, "w").close()
+
+    assert artefacts.construire_artefacts(str(csv), dossier, avec_similaires=False) == final
+    assert os.path.exists(marque)
+    assert not [nom for nom in os.listdir(dossier) if nom.endswith(".tmp")]
+    assert artefacts.dossier_courant(dossier) == final
+
+
+def test_publication_sans_suppression_puis_nettoyage(csv, tmp_path):
+    dossier = tmp_path / "artefacts"
+    ancienne = dossier / "0123456789abcdef"
+    ancienne.mkdir(parents=True)
+    (dossier / "sauvegardes").mkdir()
+
+    final = artefacts.construire_artefacts(str(csv), str(dossier), avec_similaires=False)
+    assert ancienne.exists() and (dossier / "sauvegardes").exists()
+
+    supprimes = artefacts.supprimer_anciennes_versions(str(dossier), os.path.basename(final))
+    assert supprimes == ["0123456789abcdef"]
+    assert sorted(os.listdir(dossier)) == sorted([artefacts.FICHIER_COURANT, os.path.basename(final), "sauvegardes"])
+
+
+def test_reconstruction_hors_ligne_dans_un_nouveau_dossier(csv, tmp_path):
+    dossier = str(tmp_path / "artefacts")
+    publie = artefacts.construire_artefacts(str(csv), dossier, avec_similaires=False)
+    marque = os.path.join(publie, "projete-par-un-serveur")
+    open(marque, "w").close()
+
+    final = artefacts.construire_artefacts(str(csv), dossier, remplacer=True)
+    assert final == f"{publie}-1"
+    assert os.path.exists(marque)
+    assert artefacts.dossier_courant(dossier) == final
+    assert artefacts.dossier_version(dossier, os.path.basename(publie)) == final
+    assert artefacts.charger_ou_construire(str(csv), dossier).version == os.path.basename(publie)
+
+    supprimes = artefacts.supprimer_anciennes_versions(dossier, os.path.basename(final))
+    assert supprimes == [os.path.basename(publie)]
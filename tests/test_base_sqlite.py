@@ -0,0 +1,227 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.base_sqlite import (
+    BaseCatalogue,
+    PoolConnexions,
+    construire_base,
+    nom_base,
+    requete_fts,
+    supprimer_anciennes_versions,
+)
+
+
+@pytest.fixture
+def csv_films(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 120
+    ids = rng.integers(1, 80, n)
+    titres = [f"Film {i % 60}" for i in ids]
+    pd.DataFrame({
+        "id_tmdb": ids,
+        "title": titres,
+        "overview": [f"synopsis {i}" for i in ids],
+        "recommendations": [str([f"Film {j}" for j in rng.integers(0, 70, 3)]) for _ in ids],
+        "note_moyenne": np.where(rng.random(n) < 0.1, np.nan, rng.integers(10, 90, n) / 10),
+        "lien_photos": [f"p{i}" for i in ids],
+        "cibles": rng.choice(["Famille", "Adultes", "Adolescents", None], n),
+        "trailers": [str([f"t{i}"]) for i in ids],
+        "name_x": [str(["A", f"B{i % 3}"]) for i in ids],
+    }).to_csv(tmp_path / "films.csv", index=False)
+    return str(tmp_path / "films.csv")
+
+
+def test_requete_fts_echappe_la_syntaxe():
+    assert requete_fts("Amélie") == '"amelie"*'
+    assert requete_fts('Spider-Man: "NEAR" (OR) *') == '"spider"* "man"* "near"* "or"*'
+    assert requete_fts("l'été AND") == '"l"* "ete"* "and"*'
+    assert requete_fts("") == ""
+    assert requete_fts(" -:*() ") == ""
+    assert requete_fts("Spidr-Man a", approchee=True) == '"spi"* OR "man"*'
+
+
+def test_pool_borne(tmp_path):
+    pool = PoolConnexions(str(tmp_path / "app.sqlite3"), taille=2, delai=0.05)
+    with pool.connexion() as a, pool.connexion() as b:
+        assert a is not b
+        with pytest.raises(TimeoutError):
+            with pool.connexion():
+                pass
+    with pool.connexion() as c:
+        assert c in (a, b)
+    assert pool._nb_ouvertes == 2
+    pool.fermer()
+    assert pool._nb_ouvertes == 0
+
+
+def test_connexion_empruntee_fermee_au_retour(tmp_path):
+    pool = PoolConnexions(str(tmp_path / "app.sqlite3"), taille=2)
+    with pool.connexion() as conn:
+        pool.fermer()
+        conn.execute("SELECT 1")
+    assert pool._nb_ouvertes == 0 and pool._libres.empty()
+
+
+def test_registre_ferme_la_base_remplacee(tmp_path):
+    from utils.ressources import Registre
+
+    version = ["a"]
+    pools = []
+
+    def fabrique():
+        pools.append(PoolConnexions(str(tmp_path / f"catalogue-{version[0]}.sqlite3")))
+        with pools[-1].connexion():
+            pass
+        return pools[-1]
+
+    registre = Registre()
+    registre.enregistrer("base", fabrique, version=lambda: version[0], fermer=lambda pool: pool.fermer())
+    premier = registre.obtenir("base")
+    version[0] = "b"
+    assert registre.obtenir("base") is not premier
+    assert premier._nb_ouvertes == 0 and pools[1]._nb_ouvertes == 1
+    registre.oublier("base")
+    assert pools[1]._nb_ouvertes == 0
+
+
+def test_transaction_annulee_au_retour(tmp_path):
+    pool = PoolConnexions(str(tmp_path / "app.sqlite3"), taille=1)
+    with pool.connexion() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+        assert conn.in_transaction
+    with pool.connexion() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT count(*) FROM t").fetchone()[0] == 0
+
+
+def test_pool_entre_threads(tmp_path):
+    pool = PoolConnexions(str(tmp_path / "app.sqlite3"), taille=3)
+    with pool.connexion() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+    erreurs = []
+
+    def ecrire(i):
+        try:
+            for j in range(20):
+                with pool.connexion() as conn, conn:
+                    conn.execute("INSERT INTO t VALUES (?)", (i * 100 + j,))
+        except Exception as e:  # remonté au thread principal
+            erreurs.append(e)
+
+    threads = [threading.Thread(target=ecrire, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert erreurs == []
+    assert pool._nb_ouvertes <= 3
+    with pool.connexion() as conn:
+        assert conn.execute("SELECT count(*) FROM t").fetchone()[0] == 160
+
+
+def test_rechercher(tmp_path):
+    csv = tmp_path / "films.csv"
+    pd.DataFrame({
+        "id_tmdb": [1, 2, 2, 3],
+        "title": ["Le Fabuleux Destin d'Amélie Poulain", "Spider-Man", "Spider-Man", "Alien"],
+        "overview": ["Montmartre", "une araignée", "une araignée", "un monstre"],
+        "note_moyenne": [7.9, 7.3, 7.3, 8.5],
+        "lien_photos": ["a", "s", "s", "al"],
+        "cibles": ["Adultes", "Famille", "Adolescents", "Adultes"],
+    }).to_csv(csv, index=False)
+    chemin = str(tmp_path / "catalogue-0123456789abcdef.sqlite3")
+    construire_base(str(csv), chemin, "0123456789abcdef")
+    base = BaseCatalogue(PoolConnexions(chemin))
+
+    assert len(base) == 4
+    assert base.rechercher("amelie")[0][0] == "Le Fabuleux Destin d'Amélie Poulain"
+    assert [(titre, ids) for titre, _, ids in base.rechercher("spid")] == [("Spider-Man", [2])]
+    assert base.rechercher('"') == []
+    assert base.films([3, 99, 1, 3])["id_tmdb"].tolist() == [3, 1]
+
+
+def test_suppression_des_seules_anciennes_versions(tmp_path):
+    courante = nom_base("0123456789abcdef")
+    noms = [
+        courante, f"{courante}-wal", "catalogue-0123456789abcdef.sqlite3",
+        "catalogue-fedcba9876543210-f2.sqlite3", "catalogue-fedcba9876543210-f2.sqlite3-wal",
+        "catalogue-fedcba9876543210-f2.sqlite3-shm", "catalogue-notes.txt",
+        "catalogue-fedcba9876543210-f2.sqlite3.123.tmp", "moviemind.sqlite3",
+    ]
+    for nom in noms:
+        (tmp_path / nom).write_text("")
+    supprimes = supprimer_anciennes_versions(str(tmp_path), "0123456789abcdef")
+    assert supprimes == [
+        "catalogue-0123456789abcdef.sqlite3", "catalogue-fedcba9876543210-f2.sqlite3",
+        "catalogue-fedcba9876543210-f2.sqlite3-shm", "catalogue-fedcba9876543210-f2.sqlite3-wal",
+    ]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(set(noms) - set(supprimes))
+
+
+def test_meme_interface_que_le_catalogue(csv_films, tmp_path):
+    pytest.importorskip("sklearn")
+    from utils import artefacts
+
+    dossier = str(tmp_path / "artefacts")
+    catalogue = artefacts.charger_artefacts(artefacts.construire_artefacts(csv_films, dossier))
+    chemin = str(tmp_path / f"catalogue-{catalogue.version}.sqlite3")
+    construire_base(csv_films, chemin, catalogue.version)
+    base = BaseCatalogue(PoolConnexions(chemin), catalogue.version,
+                         dossier_artefacts=str(tmp_path / "artefacts" / catalogue.version))
+
+    assert len(base) == len(catalogue)
+    ids = sorted(set(pd.read_csv(csv_films)["id_tmdb"]))
+    for id_tmdb in ids:
+        assert dict(base.fiche(id_tmdb)) == dict(catalogue.fiche(id_tmdb))
+        assert base.recommandations(id_tmdb) == catalogue.recommandations(id_tmdb)
+        assert base.similaires(id_tmdb) == catalogue.similaires(id_tmdb)
+    assert any(base.similaires(id_tmdb) for id_tmdb in ids)
+    assert base.fiche(999) is None and base.fiche("pas un id") is None
+    assert base.fiche(ids[0]) is base.fiche(ids[0])  # cache LRU
+
+    # Même graine, mêmes films tirés par cible, dans le même ordre de cibles
+    for graine in range(5):
+        tirage = base.films_par_cible(4, graine, nb_cibles=2)
+        attendu = catalogue.films_par_cible(4, graine, nb_cibles=2)
+        assert list(tirage) == list(attendu)
+        for cible in tirage:
+            assert tirage[cible]["id_tmdb"].tolist() == attendu[cible]["id_tmdb"].tolist()
+
+    pairs = lambda ids: ids % 2 == 0
+    for (cible, meilleurs), (cible_attendue, attendus) in zip(
+        base.meilleurs_par_cible(7, pairs), catalogue.meilleurs_par_cible(7, pairs)
+    ):
+        assert cible == cible_attendue and meilleurs.tolist() == attendus.tolist()
+
+    notes = base.par_cible("Famille", limite=10, decalage=5)["note_moyenne"]
+    assert len(notes) == 10 and notes.dropna().is_monotonic_decreasing
+
+
+def test_similaires_absents(csv_films, tmp_path, caplog):
+    chemin = str(tmp_path / "catalogue-0123456789abcdef.sqlite3")
+    construire_base(csv_films, chemin, "0123456789abcdef")
+    base = BaseCatalogue(PoolConnexions(chemin), "0123456789abcdef", dossier_artefacts=str(tmp_path / "absent"))
+    id_tmdb = int(pd.read_csv(csv_films)["id_tmdb"][0])
+    assert base.similaires(id_tmdb) == []
+    assert "non précalculés" in caplog.text
+    assert base.recommandations_ou_similaires(id_tmdb) == base.recommandations(id_tmdb)
+
+
+def test_base_publiee_jamais_remplacee(csv_films, tmp_path):
+    chemin = str(tmp_path / nom_base("0123456789abcdef"))
+    construire_base(csv_films, chemin, "0123456789abcdef")
+    pool = PoolConnexions(chemin)
+    with pool.connexion() as conn:
+        avant = os.stat(chemin).st_ino
+        construire_base(csv_films, chemin, "0123456789abcdef")
+        assert os.stat(chemin).st_ino == avant
+        assert conn.execute("SELECT count(*) FROM films").fetchone()[0] > 0
+    assert not [nom for nom in os.listdir(tmp_path) if nom.endswith(".tmp")]
+    pool.fermer()
@@ -0,0 +1,45 @@
+import glob
+import os
+
+import numpy as np
+
+from utils.cache_embeddings import CacheEmbeddings, cle_document, embed_incremental
+
+
+class EmbeddingsFactices:
+    def __init__(self):
+        self.appels = 0
+
+    def embed_documents(self, textes):
+        self.appels += len(textes)
+        return [[len(t), t.count("a"), 1.0] for t in textes]
+
+
+def test_incremental_puis_compactage(tmp_path):
+    embeddings = EmbeddingsFactices()
+    cache = CacheEmbeddings("modele", dossier=str(tmp_path))
+    embed_incremental(["a", "bb", "a"], embeddings, "modele", cache=cache, taille_lot=1)
+    assert embeddings.appels == 2
+
+    vecteurs, nb = embed_incremental(["a", "ccc"], embeddings, "modele", cache=cache)
+    assert nb == 1 and embeddings.appels == 3
+    assert vecteurs.tolist() == [[1, 1, 1], [3, 0, 1]]
+
+    retirees = cache.compacter([cle_document(t, "modele") for t in ("a", "ccc")])
+    assert retirees == 1
+    assert len(glob.glob(os.path.join(cache.dossier, "lot-*.cles.npy"))) == 1
+    assert len(glob.glob(os.path.join(cache.dossier, "lot-*.vecteurs.npy"))) == 1
+
+    relu = CacheEmbeddings("modele", dossier=str(tmp_path))
+    assert len(relu) == 2
+    assert cle_document("bb", "modele") not in relu
+    np.testing.assert_array_equal(relu.obtenir([cle_document("ccc", "modele")]), [[3, 0, 1]])
+    assert relu.compacter([cle_document("a", "modele"), cle_document("ccc", "modele")]) == 0
+
+
+def test_compactage_vide(tmp_path):
+    cache = CacheEmbeddings("modele", dossier=str(tmp_path))
+    cache.ajouter([cle_document("a", "modele")], [[1.0, 2.0]])
+    assert cache.compacter([]) == 1
+    assert len(cache) == 0
+    assert os.listdir(cache.dossier) == []
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from utils import cache_reponses
+from utils.cache_reponses import CacheReponses
+
+
+class Horloge:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    horloge = Horloge()
+    monkeypatch.setattr(cache_reponses.time, "monotonic", horloge)
+    return horloge
+
+
+def test_question_normalisee_et_historique(horloge):
+    cache = CacheReponses()
+    cache.ajouter("Un film d'horreur ?", [], "Scream")
+    assert cache.obtenir("un film d’HORREUR")[0] == "Scream"
+    assert cache.obtenir("un film d'horreur", historique=[("bonjour", "salut")])[0] is None
+    assert (cache.succes, cache.echecs) == (1, 1)
+
+
+def test_ttl(horloge):
+    cache = CacheReponses(ttl=10)
+    cache.ajouter("question", None, "réponse")
+    horloge.t += 9
+    assert cache.obtenir("question")[0] == "réponse"
+    horloge.t += 2
+    assert cache.obtenir("question")[0] is None
+    assert len(cache) == 0
+
+
+def test_lru(horloge):
+    cache = CacheReponses(capacite=2)
+    cache.ajouter("a", None, "A")
+    cache.ajouter("b", None, "B")
+    cache.obtenir("a")  # "a" redevient la plus récente
+    cache.ajouter("c", None, "C")
+    assert cache.obtenir("b")[0] is None
+    assert cache.obtenir("a")[0] == "A" and cache.obtenir("c")[0] == "C"
+
+
+class EmbeddingsFactices:
+    def embed_query(self, texte):
+        return np.array([1.0, 0.1 if "comedie" in texte else 0.0, 0.0 if "drame" not in texte else 1.0])
+
+
+def test_recherche_semantique(horloge):
+    cache = CacheReponses(seuil_semantique=0.95)
+    embeddings = EmbeddingsFactices()
+    _, vecteur = cache.obtenir("une comedie", embeddings=embeddings)
+    cache.ajouter("une comedie", None, "La Grande Vadrouille", vecteur)
+    assert cache.obtenir("une bonne comedie", embeddings=embeddings)[0] == "La Grande Vadrouille"
+    assert cache.obtenir("un drame", embeddings=embeddings)[0] is None
+    # Sans modèle d'embedding, seule la correspondance exacte compte
+    assert cache.obtenir("une bonne comedie")[0] is None
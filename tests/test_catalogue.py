@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.catalogue import Catalogue, parser_liste, preparer_catalogue
+
+
+@pytest.fixture
+def brut():
+    return pd.DataFrame({
+        "id_tmdb": [10, 11, 12, 10, 13],
+        "title": ["Alpha", "Beta", "Gamma", "Alpha", "Alpha"],
+        "overview": ["a", None, "c", "a", "e"],
+        "recommendations": ["['Beta', 'Gamma']", "[]", "pas une liste", "['Beta']", None],
+        "note_moyenne": [7.25, 5.0, None, 7.25, 8.0],
+        "lien_photos": ["p10", "p11", "p12", "p10", "p13"],
+        "cibles": ["Famille", "Adultes", "Famille", "Adultes", None],
+        "trailers": ["['t10']", "[]", "[]", "['t10']", "[]"],
+        "name_x": ["['A', 'B']", "['B']", "[]", "['A', 'B']", "['C']"],
+    })
+
+
+@pytest.fixture
+def catalogue(brut):
+    df, listes, anomalies = preparer_catalogue(brut)
+    return Catalogue(df, "v1", listes, anomalies)
+
+
+def test_parser_liste():
+    assert parser_liste("['a', 'b']") == ["a", "b"]
+    assert parser_liste(None) == []
+    assert parser_liste(float("nan")) == []
+    with pytest.raises(ValueError):
+        parser_liste("pas une liste")
+
+
+def test_anomalie_signalee_une_fois(catalogue):
+    assert [(p, c) for p, c, _ in catalogue.anomalies] == [(2, "recommendations")]
+    assert catalogue.listes["recommendations"][2] == []
+
+
+def test_films_ordre_sans_doublon_ni_inconnu(catalogue):
+    films = catalogue.films([12, 10, 99, 12])
+    assert films["id_tmdb"].tolist() == [12, 10]
+    assert catalogue.positions([10, 99]).tolist() == [0, -1]
+
+
+def test_liste_et_fiche(catalogue):
+    assert catalogue.liste("name_x", 10) == ["A", "B"]
+    assert catalogue.liste("name_x", 99) == []
+    fiche = catalogue.fiche(10)
+    assert fiche["title"] == "Alpha"
+    assert fiche["note_moyenne"] == 7.2
+    assert fiche["trailers"] == ("t10",)
+    assert catalogue.fiche(11)["overview"] == ""
+    assert catalogue.fiche(99) is None
+    assert catalogue.fiche("pas un id") is None
+    assert catalogue.fiche(10) is fiche  # cache LRU
+    with pytest.raises(TypeError):
+        fiche["title"] = "modifié"
+
+
+def test_index_titres_et_recommandations(catalogue):
+    assert sorted(catalogue.index_titres["Alpha"]) == [10, 13]
+    assert catalogue.recommandations(10) == [11, 12]
+    assert catalogue.recommandations(12) == []
+    assert catalogue.recommandations(99) == []
+
+
+def test_index_cibles(catalogue):
+    noms, offsets, positions = catalogue.index_cibles
+    assert noms.tolist() == ["Famille", "Adultes"]
+    assert positions[offsets[0] : offsets[1]].tolist() == [0, 2]
+    assert positions[offsets[1] : offsets[2]].tolist() == [1, 3]
+
+
+def test_echantillon_reproductible(catalogue):
+    premier = catalogue.echantillon_par_cible(1, graine=42)
+    second = catalogue.echantillon_par_cible(1, graine=42)
+    assert [(c, p.tolist()) for c, p in premier] == [(c, p.tolist()) for c, p in second]
+    assert [len(p) for _, p in catalogue.echantillon_par_cible(5, graine=1)] == [2, 2]
+
+
+def test_df_copie_ne_modifie_pas_le_catalogue(catalogue):
+    df = catalogue.df
+    df.loc[0, "title"] = "Gamma"
+    df["nouvelle"] = 1
+    assert catalogue.fiche(11)["title"] == "Beta"
+    assert catalogue._df["title"].iloc[0] == "Alpha"
+    assert "nouvelle" not in catalogue._df.columns
+
+
+def test_compacter(catalogue):
+    df = catalogue._df
+    assert df["cibles"].dtype == "category"
+    assert df["note_moyenne"].dtype == np.float32
+    assert df["id_tmdb"].dtype.itemsize < 8
+
+
+def test_similaires_hors_ligne_seulement(brut, tmp_path, caplog):
+    pytest.importorskip("sklearn")
+    from utils import artefacts
+
+    csv = tmp_path / "films.csv"
+    brut.to_csv(csv, index=False)
+    dossier = str(tmp_path / "artefacts")
+
+    # Reconstruction pendant une requête, sans version précédente : pas de
+    # similaires, la page 3 n'a que les recommandations du CSV
+    charge = artefacts.charger_ou_construire(str(csv), dossier)
+    assert not (tmp_path / "artefacts" / charge.version / "similaires.npy").exists()
+    assert "sans films similaires" in caplog.text
+    assert charge.recommandations_ou_similaires(10) == [11, 12]
+    assert charge.recommandations(11) == []
+    assert charge.recommandations_ou_similaires(11) == []
+
+    charge = artefacts.charger_artefacts(artefacts.construire_artefacts(str(csv), dossier, remplacer=True))
+    assert 10 not in charge.similaires(10)
+    assert set(charge.similaires(10)) <= {11, 12, 13}
+    similaires_11 = charge.recommandations_ou_similaires(11)
+    assert similaires_11 and set(similaires_11) <= {10, 12, 13}
+
+    # CSV modifié : les similaires de la version précédente sont repris
+    # pour les films toujours présents
+    brut[brut["id_tmdb"] != 12].to_csv(csv, index=False)
+    charge = artefacts.charger_ou_construire(str(csv), dossier)
+    assert charge.recommandations_ou_similaires(11) == [i for i in similaires_11 if i != 12]
+    assert 12 not in charge.similaires(10)
@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document
+
+from utils.contexte import ConstructeurContexte, recommandations_document, tronquer
+from utils.memoire import compter_tokens
+
+
+def document(id_tmdb, titre, synopsis="Un film.", cibles="Famille", note=7.45, recommandations="[]"):
+    contenu = f"title: {titre}\n\nDescription: {synopsis}\n\\systeme de recommendation: {recommandations}"
+    return Document(page_content=contenu, metadata={
+        "id_tmdb": id_tmdb, "title": titre, "Description": synopsis, "cibles": cibles, "note_moyenne": note,
+    })
+
+
+def test_tronquer():
+    assert tronquer("court", 10) == "court"
+    texte = "Première phrase assez longue. Deuxième phrase qui dépasse le budget."
+    assert tronquer(texte, 9) == "Première phrase assez longue."
+    assert tronquer("un deux trois quatre cinq six", 4) == "un deux trois…"
+
+
+def test_dedoublonnage_par_film():
+    constructeur = ConstructeurContexte(nb_documents=3)
+    documents = [document(1, "Alien", cibles="Adultes"), document(1, "Alien", cibles="Adolescents"),
+                 document(2, "Cars"), document(3, "Scream"), document(4, "Up")]
+    resultat = constructeur.construire(documents)
+    assert [d.metadata["id_tmdb"] for d in resultat] == [1, 2, 3]
+    assert "Public : Adultes" in resultat[0].page_content
+
+
+def test_budget_par_document():
+    constructeur = ConstructeurContexte(tokens_par_document=40)
+    long = " ".join(f"Phrase numéro {i} du synopsis." for i in range(100))
+    compact = constructeur.compacter(document(1, "Alien", synopsis=long))
+    assert compact.metadata["tokens"] <= 40
+    assert compact.metadata["tokens"] == compter_tokens(compact.page_content)
+    assert compact.metadata["tokens_origine"] > compact.metadata["tokens"]
+    assert compact.page_content.startswith("Titre : Alien\nNote : 7.5/10\nPublic : Famille\nSynopsis : Phrase")
+
+
+def test_recommandations_seulement_si_demandees():
+    doc = document(1, "Alien", recommandations="['Aliens', \"Prometheus\", 'Predator']")
+    assert recommandations_document(doc) == [("Aliens", ""), ("", "Prometheus"), ("Predator", "")]
+    constructeur = ConstructeurContexte(nb_recommandations=2)
+    assert "Films similaires" not in constructeur.construire([doc], "un film de monstre")[0].page_content
+    avec = constructeur.construire([doc], "un film similaire à Alien")[0].page_content
+    assert "Films similaires : Aliens, Prometheus" in avec
+
+
+def test_voisins_si_un_seul_film():
+    appels = []
+
+    def voisins(id_tmdb, k):
+        appels.append((id_tmdb, k))
+        return [document(2, "Aliens"), document(3, "Prometheus")]
+
+    constructeur = ConstructeurContexte(nb_documents=3, voisins=voisins)
+    resultat = constructeur.construire([document(1, "Alien"), document(1, "Alien")])
+    assert appels == [(1, 2)]
+    assert [d.metadata["title"] for d in resultat] == ["Alien", "Aliens", "Prometheus"]
+    constructeur.construire([document(1, "Alien"), document(4, "Cars")])
+    assert len(appels) == 1
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+pytest.importorskip("langchain_core")
+
+from utils.embeddings import EmbeddingsLocaux, creer_embeddings, verifier_compatibilite
+
+CORPUS = ["le chat dort", "le chien court", "le chat court", "la voiture rouge"]
+
+
+def test_idf_attenue_les_termes_frequents():
+    sans_idf = EmbeddingsLocaux(dimension=256)
+    avec_idf = EmbeddingsLocaux(dimension=256).ajuster(CORPUS)
+    requete = "le chat"
+    # "le" apparaît presque partout : avec l'IDF, "le chien" s'éloigne de "le chat"
+    proche_sans = float(sans_idf.embed_query(requete) @ sans_idf.embed_query("le chien"))
+    proche_avec = float(avec_idf.embed_query(requete) @ avec_idf.embed_query("le chien"))
+    assert proche_avec < proche_sans
+    vecteurs = avec_idf.embed_documents(CORPUS)
+    np.testing.assert_allclose(np.linalg.norm(vecteurs, axis=1), 1.0, rtol=1e-5)
+
+
+def test_idf_enregistree_avec_l_index(tmp_path):
+    construit = EmbeddingsLocaux(dimension=256).ajuster(CORPUS)
+    construit.sauvegarder_idf(str(tmp_path))
+    requetes = EmbeddingsLocaux(dimension=256)
+    assert requetes.modele != construit.modele
+    requetes.charger_idf(str(tmp_path))
+    assert requetes.modele == construit.modele
+    verifier_compatibilite({"backend": "local", "modele": construit.modele}, requetes)
+    with pytest.raises(ValueError):
+        verifier_compatibilite({"backend": "local", "modele": "hashing-tf-512-v1"}, requetes)
+
+
+def test_embedding_des_questions_memorise():
+    pytest.importorskip("langchain_openai")
+    from utils.cache_reponses import CacheReponses
+    from utils.embeddings import EmbeddingsOpenAI
+
+    class Client:
+        appels = 0
+
+        def embed_query(self, texte):
+            Client.appels += 1
+            return [3.0, 4.0]
+
+    embeddings = EmbeddingsOpenAI(api_key="sk-test", taille_memo=2)
+    embeddings._client = Client()
+    # Échec du cache sémantique puis recherche dans l'index : un seul appel
+    _, vecteur = CacheReponses(seuil_semantique=0.9).obtenir("Un film ?", embeddings=embeddings)
+    requete = embeddings.embed_query("Un film ?")
+    assert Client.appels == 1
+    np.testing.assert_allclose(vecteur, [0.6, 0.8])
+    assert requete.tolist() == [3.0, 4.0]  # la normalisation n'a pas modifié le vecteur mémorisé
+    embeddings.embed_query("b")
+    embeddings.embed_query("c")
+    embeddings.embed_query("Un film ?")
+    assert Client.appels == 4
+
+
+def test_backend_inconnu():
+    with pytest.raises(ValueError):
+        creer_embeddings("inconnu")
+
+
+def test_chargement_sans_modifier_le_modele_partage(tmp_path):
+    from langchain_core.documents import Document
+
+    from utils.index_vectoriel import IndexVectoriel
+
+    construit = EmbeddingsLocaux(dimension=256).ajuster(CORPUS)
+    documents = [Document(page_content=t, metadata={"id_tmdb": i}) for i, t in enumerate(CORPUS)]
+    IndexVectoriel.depuis_vecteurs(construit.embed_documents(CORPUS), documents, construit).save_local(str(tmp_path))
+
+    partage = EmbeddingsLocaux(dimension=256)
+    modele = partage.modele
+    index = IndexVectoriel.load_local(str(tmp_path), partage)
+    assert index.embeddings.modele == construit.modele
+    assert partage.idf is None and partage.modele == modele
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document
+
+from utils.embeddings import EmbeddingsLocaux
+from utils.hybride import ConstructeurBM25, fusion_rrf
+from utils.index_vectoriel import IndexVectoriel, construire_ivf_pour_index
+
+FILMS = [
+    ("Le Roi Lion", "un lionceau devient roi de la savane", "Famille", 8.3),
+    ("Alien", "un monstre traque l'equipage d'un vaisseau spatial", "Adultes", 8.5),
+    ("Toy Story", "des jouets prennent vie quand personne ne regarde", "Famille", 8.0),
+    ("Cars", "une voiture de course apprend l'humilite", "Famille", 6.2),
+    ("Scream", "un tueur masque terrorise des lyceens", "Adolescents", 7.1),
+]
+
+
+@pytest.fixture
+def index():
+    documents = [
+        Document(page_content=f"title: {t}\n\nDescription: {d}",
+                 metadata={"id_tmdb": i, "title": t, "Description": d, "cibles": c, "note_moyenne": n})
+        for i, (t, d, c, n) in enumerate(FILMS)
+    ]
+    embeddings = EmbeddingsLocaux(dimension=256).ajuster([doc.page_content for doc in documents])
+    vecteurs = embeddings.embed_documents([doc.page_content for doc in documents])
+    return IndexVectoriel.depuis_vecteurs(vecteurs, documents, embeddings)
+
+
+def test_extraire_cible_et_note(index):
+    filtres = index.filtres
+    assert filtres.extraire("un film pour la famille noté au moins 7,5") == {"cible": "Famille", "note_min": 7.5}
+    assert filtres.extraire("les meilleurs films pour adolescent")["cible"] == "Adolescents"
+    assert filtres.extraire("les meilleurs films pour adolescent")["note_min"] == 7.0
+    assert filtres.extraire("un film de monstre") == {"cible": None, "note_min": None}
+
+
+def test_masque(index):
+    assert index.filtres.masque("Famille", 7.0).tolist() == [True, False, True, False, False]
+    assert index.filtres.masque() is None
+    assert index.filtres.masque("Inconnue", None) is None
+
+
+def test_fusion_rrf():
+    positions, scores = fusion_rrf([np.array([2, 0, 1]), np.array([0, 3])], k_rrf=60)
+    assert positions.tolist() == [0, 2, 3, 1]
+    assert scores[0] == pytest.approx(1 / 62 + 1 / 61)
+    assert fusion_rrf([])[0].tolist() == []
+
+
+def test_bm25_candidats_egal_au_calcul_complet():
+    constructeur = ConstructeurBM25()
+    constructeur.ajouter([f"{t} {d}" for t, d, _, _ in FILMS])
+    bm25 = constructeur.terminer()
+    complets = bm25.scores("roi savane voiture")
+    candidats = np.array([0, 2, 3])
+    np.testing.assert_allclose(bm25.scores("roi savane voiture", candidats), complets[candidats], rtol=1e-6)
+    assert complets[0] > 0 and complets[3] > 0 and complets[1] == 0
+    assert bm25.scores("zzz", candidats).tolist() == [0, 0, 0]
+    assert len(bm25.scores("roi", np.array([], dtype=np.int64))) == 0
+
+
+def test_retriever_applique_les_filtres(index):
+    retriever = index.as_retriever(search_kwargs={"k": 2})
+    documents = retriever.invoke("un film pour la famille avec un roi")
+    assert documents[0].metadata["title"] == "Le Roi Lion"
+    assert {d.metadata["cibles"] for d in documents} == {"Famille"}
+
+
+@pytest.mark.parametrize("fraction_copie", [0.0, 1.0])
+def test_produit_vectoriel_avec_ou_sans_copie(index, fraction_copie):
+    retriever = index.as_retriever(search_kwargs={"fraction_copie": fraction_copie})
+    positions, _ = retriever.rechercher("des jouets", cible="Famille")
+    assert positions[0] == 2
+    assert set(positions.tolist()) <= {0, 2, 3}
+
+
+def test_ivf_construit_avec_l_index_et_sonde_par_le_retriever(index, tmp_path):
+    index.save_local(str(tmp_path))
+    construire_ivf_pour_index(str(tmp_path), nb_listes=2)
+    charge = IndexVectoriel.load_local(str(tmp_path), index.embeddings)
+    assert charge.ivf is not None and len(charge.ivf[0]) == 2
+
+    # Tous les groupes sondés : même classement vectoriel que la recherche exacte
+    exact = charge.as_retriever(search_kwargs={"k": 5}).invoke("des jouets")
+    approx = charge.as_retriever(search_kwargs={"k": 5, "nb_sondes": 2}).invoke("des jouets")
+    assert [d.metadata["title"] for d in approx] == [d.metadata["title"] for d in exact]
+
+    positions, _ = charge.as_retriever(search_kwargs={"nb_sondes": 2}).rechercher("des jouets", cible="Famille")
+    assert positions[0] == 2
+    assert set(positions.tolist()) <= {0, 2, 3}
+    assert charge.similarity_search("des jouets", k=1, nb_sondes=1)
+
+
+def test_ivf_index_vide_ou_trop_petit(index, tmp_path):
+    vide = IndexVectoriel(np.empty((0, 4), dtype=np.float32), None)
+    with pytest.raises(ValueError):
+        vide.construire_ivf()
+    with pytest.raises(ValueError):
+        index.construire_ivf(nb_listes=len(index) + 1)
+
+    # Moins de documents que de groupes : pas d'IVF, la recherche reste exacte
+    index.save_local(str(tmp_path))
+    construire_ivf_pour_index(str(tmp_path), nb_listes=len(index) + 1)
+    charge = IndexVectoriel.load_local(str(tmp_path), index.embeddings)
+    assert charge.ivf is None
+    documents = charge.as_retriever(search_kwargs={"k": 5, "nb_sondes": 2}).invoke("des jouets")
+    assert documents[0].metadata["title"] == "Toy Story"
@@ -0,0 +1,44 @@
+import pytest
+
+from utils import ma_liste
+from utils.fonctions import connect_to_db
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+
+def script_utilisateur():
+    import streamlit as st
+
+    from utils.fonctions import utilisateur_courant
+
+    st.text(utilisateur_courant())
+
+
+def utilisateur(at):
+    return at.run().text[0].value
+
+
+def test_invite_propre_a_chaque_session():
+    premiere, seconde = AppTest.from_function(script_utilisateur), AppTest.from_function(script_utilisateur)
+    invite = utilisateur(premiere)
+    assert invite.startswith("invite-")
+    assert utilisateur(premiere) == invite
+    assert utilisateur(seconde).startswith("invite-") and utilisateur(seconde) != invite
+
+    premiere.session_state["username"] = "alice"
+    assert utilisateur(premiere) == "alice"
+
+
+def test_listes_separees_par_utilisateur(tmp_path):
+    with connect_to_db(str(tmp_path / "app.sqlite3")) as conn:
+        ma_liste.creer_schema(conn)
+        ma_liste.ajouter(conn, "invite-a", 10)
+        ma_liste.ajouter(conn, "invite-a", 11)
+        ma_liste.ajouter(conn, "invite-a", 10)
+        ma_liste.ajouter(conn, "invite-b", 12)
+        assert sorted(ma_liste.lister(conn, "invite-a")) == [10, 11]
+        assert ma_liste.lister(conn, "invite-b") == [12]
+
+        ma_liste.retirer(conn, "invite-a", 10)
+        assert ma_liste.lister(conn, "invite-a") == [11]
+        assert ma_liste.lister(conn, "invite-b") == [12]
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from utils.memoire import MemoireConversation, compter_tokens, resumer_tour
+
+
+def test_compter_tokens():
+    assert compter_tokens("") == 0
+    assert compter_tokens("abcd") == 1
+    assert compter_tokens("abcde") == 2
+
+
+def test_resumer_tour_garde_les_films():
+    reponse = "Voici mes idées.\n### 🎬 Alien\nUn classique.\n### 🎬 Scream\n"
+    assert resumer_tour("Un film qui fait peur ?", reponse) == (
+        "- Question : Un film qui fait peur ? → films proposés : Alien, Scream"
+    )
+    assert resumer_tour("Bonjour", "Bonjour ! Que cherchez-vous ?") == "- Question : Bonjour → Bonjour !"
+    assert len(resumer_tour("q" * 500, "r")) == 200
+
+
+def test_fenetre_glissante():
+    memoire = MemoireConversation(budget_tokens=10_000, nb_tours_max=2)
+    for i in range(4):
+        memoire.ajouter(f"question {i}", f"réponse {i}.")
+    assert [q for q, _ in memoire.tours] == ["question 2", "question 3"]
+    assert len(memoire.resume) == 2 and len(memoire) == 4
+
+
+def test_budget_de_tokens_respecte():
+    memoire = MemoireConversation(budget_tokens=100, nb_tours_max=6, part_resume=0.3)
+    for i in range(20):
+        memoire.ajouter(f"question {i} " + "x" * 60, f"réponse {i}. " + "y" * 100)
+        assert memoire.tokens() <= memoire.budget_tokens
+        assert sum(compter_tokens(l) for l in memoire.resume) <= memoire.budget_resume
+    assert memoire.tours[-1][0].startswith("question 19")
+
+
+def test_dernier_tour_toujours_garde():
+    memoire = MemoireConversation(budget_tokens=10)
+    memoire.ajouter("q" * 200, "r" * 200)
+    assert len(memoire.tours) == 1
+    assert memoire.derniere_reponse == "r" * 200
+
+
+def test_messages():
+    memoire = MemoireConversation(budget_tokens=10_000, nb_tours_max=1)
+    memoire.ajouter("q1", "r1.")
+    memoire.ajouter("q2", "r2.")
+    messages = memoire.messages()
+    assert [type(m) for m in messages] == [SystemMessage, HumanMessage, AIMessage]
+    assert "q1" in messages[0].content
+    assert memoire.paires()[0][0] == "résumé" and memoire.paires()[1] == ("q2", "r2.")
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from utils.recherche import IndexRecherche, ngrammes, normaliser_titre
+
+pytest.importorskip("rapidfuzz")
+
+
+@pytest.fixture
+def index():
+    titres = ["Le Fabuleux Destin d'Amélie Poulain", "Spider-Man", "Spider-Man", "Spider-Man 2", "Matrix", None]
+    ids = [1000, 1001, 1002, 1003, 1004, 1005]
+    return IndexRecherche.construire(titres, ids)
+
+
+def test_normaliser_titre():
+    assert normaliser_titre("  L'Été — Meurtrier!  ") == "l ete meurtrier"
+    assert "  a" in ngrammes("abc")
+
+
+def test_titres_dedoublonnes(index):
+    i = index.titres_normalises.to_pylist().index("spider man")
+    assert index.ids(i) == [1001, 1002]
+
+
+def test_rechercher_faute_et_accents(index):
+    resultats = index.rechercher("amelie poulin", seuil=60)
+    assert resultats[0][0] == "Le Fabuleux Destin d'Amélie Poulain"
+    assert resultats[0][2] == [1000]
+
+
+def test_rechercher_regroupe_les_ids(index):
+    titre, score, ids = index.rechercher("spiderman")[0]
+    assert titre == "Spider-Man" and ids == [1001, 1002]
+    assert score >= 70
+
+
+def test_rechercher_sans_resultat(index):
+    assert index.rechercher("") == []
+    assert index.rechercher("zzzz") == []
+
+
+def test_candidats_limites_aux_titres_touches(index):
+    candidats = index.candidats("matrix", taille=200)
+    touches = set(index.titres_normalises.take(candidats).to_pylist())
+    assert "matrix" in touches and "le fabuleux destin d amelie poulain" not in touches
+    assert len(index.candidats("spider", taille=1)) == 1
+    assert candidats.dtype == np.int64
@@ -0,0 +1,469 @@
+"""
+Artefacts versionnés du catalogue
+
+Tout ce que l'application dérive du CSV est écrit une fois dans un dossier
+`data/artefacts/<version>/`, où la version est le hash du CSV (puis
+`<version>-<n>/` quand la commande hors ligne reconstruit une version déjà
+publiée) :
+
+- catalogue.arrow : colonnes du catalogue (colonnes listes comprises), Arrow IPC
+- ids.npy, ids_positions.npy : index id_tmdb -> position de ligne
+- recherche_*.npy, recherche_titres.arrow : index de recherche des titres
+- recommandations_*.npy : recommandations du CSV résolues en id_tmdb
+- cibles_*.npy : positions de ligne par cible (page d'accueil)
+- similaires.npy : films similaires calculés sur le contenu (utils/similaires.py),
+  seulement par la commande ci-dessous (calcul en O(N²), jamais pendant une
+  requête) ; une reconstruction automatique reprend ceux de la version
+  précédente pour les films toujours présents
+- vectorstore/ : matrice d'embeddings et métadonnées (optionnel)
+- manifest.json : version, signature du CSV source et liste des fichiers
+
+Tous les formats ont une disposition fixe : au démarrage, les tableaux sont
+projetés en mémoire (np.load(mmap_mode="r"), Arrow memory_map) au lieu
+d'être relus ou recalculés. Le démarrage prend quelques millisecondes quelle
+que soit la taille du catalogue, et plusieurs processus serveur partagent les
+mêmes pages physiques. Aucun pickle.
+
+Un dossier publié n'est jamais renommé ni supprimé par l'application :
+d'autres processus serveur peuvent encore le projeter en mémoire. Une
+reconstruction écrit un nouveau dossier et le désigne dans COURANT. Les
+dossiers précédents ne sont supprimés qu'à la demande, par la commande hors
+ligne (`--supprimer-anciennes`, voir `supprimer_anciennes_versions`).
+
+Utilisation :
+    python -m utils.artefacts            # catalogue + index vectoriel
+    python -m utils.artefacts --supprimer-anciennes   # quand plus aucun serveur ne lit les anciennes
+    python -m utils.artefacts --sans-embeddings
+    python -m utils.artefacts --ivf-listes 256   # + index vectoriel approximatif
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from utils.catalogue import (
+    CSV_PATH,
+    COLONNES_LISTES,
+    Catalogue,
+    ColonneListe,
+    hash_fichier,
+    lire_csv,
+    preparer_catalogue,
+)
+from utils.recherche import IndexRecherche
+
+ARTEFACTS_DIR = "data/artefacts"
+logger = logging.getLogger(__name__)
+FICHIER_COURANT = "COURANT"
+FORMAT = 4
+# Dossier d'une version : les 16 premiers caractères hexadécimaux du hash du
+# CSV, suivis de "-<n>" pour la n-ième reconstruction de la même version
+DOSSIER_VERSION = re.compile(r"([0-9a-f]{16})(?:-([0-9]+))?")
+
+
+def _ecrire_arrow(chemin, table):
+    with pa.OSFile(chemin, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _lire_arrow(chemin):
+    return ipc.open_file(pa.memory_map(chemin, "r")).read_all()
+
+
+def _charger_npy(dossier, nom):
+    return np.load(os.path.join(dossier, f"{nom}.npy"), mmap_mode="r")
+
+
+def _categorielle(tableau):
+    """
+    Categorical pandas dont les catégories restent dans la mémoire projetée
+    (le dictionnaire Arrow n'est pas recopié en chaînes Python).
+    """
+    categories = pd.Index(pd.array(tableau.dictionary, dtype=pd.ArrowDtype(tableau.dictionary.type)))
+    codes = np.asarray(tableau.indices.fill_null(-1))
+    return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))
+
+
+def _signature_source(csv_path):
+    stat = os.stat(csv_path)
+    return {"taille": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def ecrire_catalogue(catalogue, dossier, avec_similaires=True):
+    """
+    Écrit le catalogue et ses index dérivés dans un dossier d'artefacts.
+
+    Avec avec_similaires=False, les films similaires (calcul en O(N²), voir
+    utils/similaires.py) ne sont pas calculés ni écrits.
+
+    Returns:
+        dict: Description (dtype, forme) des tableaux écrits, pour le manifeste
+    """
+    os.makedirs(dossier, exist_ok=True)
+    fichiers = {}
+
+    # Colonnes scalaires + colonnes listes (pa.list_) dans un seul fichier Arrow
+    table = pa.Table.from_pandas(catalogue.df, preserve_index=False)
+    for colonne, liste in catalogue.listes.items():
+        tableau = pa.ListArray.from_arrays(pa.array(liste.offsets, pa.int32()), liste.valeurs)
+        table = table.append_column(colonne, tableau)
+    _ecrire_arrow(os.path.join(dossier, "catalogue.arrow"), table)
+
+    index = catalogue.index_recherche
+    _ecrire_arrow(
+        os.path.join(dossier, "recherche_titres.arrow"),
+        pa.table({"titre": index.titres, "titre_normalise": index.titres_normalises}),
+    )
+
+    ids, positions = catalogue.index_ids
+    offsets_recommandations, ids_recommandations = catalogue.index_recommandations
+    noms_cibles, offsets_cibles, positions_cibles = catalogue.index_cibles
+    tableaux = {
+        "ids": ids,
+        "ids_positions": positions,
+        "recherche_ids_offsets": index.ids_offsets,
+        "recherche_ids_valeurs": index.ids_valeurs,
+        "recherche_grammes": index.grammes,
+        "recherche_grammes_offsets": index.grammes_offsets,
+        "recherche_postings": index.postings,
+        "recommandations_offsets": offsets_recommandations,
+        "recommandations_ids": ids_recommandations,
+        "cibles_noms": noms_cibles,
+        "cibles_offsets": offsets_cibles,
+        "cibles_positions": positions_cibles,
+    }
+    if avec_similaires:
+        tableaux["similaires"] = catalogue.index_similaires
+    for nom, tableau in tableaux.items():
+        tableau = np.ascontiguousarray(tableau)
+        np.save(os.path.join(dossier, f"{nom}.npy"), tableau)
+        fichiers[f"{nom}.npy"] = {"dtype": tableau.dtype.str, "forme": list(tableau.shape)}
+    return fichiers
+
+
+def charger_artefacts(dossier):
+    """
+    Charge un dossier d'artefacts sans recalcul : tableaux projetés en mémoire.
+
+    Returns:
+        Catalogue: Catalogue dont les index dérivés sont déjà disponibles
+    """
+    with open(os.path.join(dossier, "manifest.json"), encoding="utf-8") as f:
+        manifeste = json.load(f)
+
+    table = _lire_arrow(os.path.join(dossier, "catalogue.arrow"))
+    listes = {}
+    for colonne in COLONNES_LISTES:
+        if colonne in table.column_names:
+            tableau = table.column(colonne).combine_chunks()
+            listes[colonne] = ColonneListe(np.asarray(tableau.offsets), tableau.values)
+            table = table.drop_columns([colonne])
+    # ArrowDtype : le DataFrame s'appuie directement sur la mémoire projetée
+    dictionnaires = [c.name for c in table.schema if pa.types.is_dictionary(c.type)]
+    df = table.drop_columns(dictionnaires).to_pandas(types_mapper=pd.ArrowDtype)
+    for colonne in dictionnaires:
+        df[colonne] = _categorielle(table.column(colonne).combine_chunks())
+    df = df[[c for c in table.column_names]]
+
+    titres = _lire_arrow(os.path.join(dossier, "recherche_titres.arrow"))
+    index_recherche = IndexRecherche(
+        titres=titres.column("titre").combine_chunks(),
+        titres_normalises=titres.column("titre_normalise").combine_chunks(),
+        ids_offsets=_charger_npy(dossier, "recherche_ids_offsets"),
+        ids_valeurs=_charger_npy(dossier, "recherche_ids_valeurs"),
+        grammes=_charger_npy(dossier, "recherche_grammes"),
+        grammes_offsets=_charger_npy(dossier, "recherche_grammes_offsets"),
+        postings=_charger_npy(dossier, "recherche_postings"),
+    )
+    derives = {
+        "index_ids": (_charger_npy(dossier, "ids"), _charger_npy(dossier, "ids_positions")),
+        "index_recherche": index_recherche,
+        "index_recommandations": (
+            _charger_npy(dossier, "recommandations_offsets"),
+            _charger_npy(dossier, "recommandations_ids"),
+        ),
+        "index_cibles": (
+            _charger_npy(dossier, "cibles_noms"),
+            _charger_npy(dossier, "cibles_offsets"),
+            _charger_npy(dossier, "cibles_positions"),
+        ),
+    }
+    if os.path.exists(os.path.join(dossier, "similaires.npy")):
+        derives["index_similaires"] = _charger_npy(dossier, "similaires")
+    return Catalogue(df, manifeste["version"], listes, derives=derives, dossier=dossier)
+
+
+def _heriter_similaires(precedent, ids):
+    """
+    Similaires de la version `precedent` réindexés sur les id_tmdb triés `ids`
+    de la nouvelle version : les films retirés du catalogue disparaissent des
+    listes, un film nouveau n'a pas de voisins. None si rien à reprendre.
+    """
+    if precedent is None or not os.path.exists(os.path.join(precedent, "similaires.npy")):
+        return None
+    anciens_ids = np.asarray(_charger_npy(precedent, "ids"))
+    anciens = np.asarray(_charger_npy(precedent, "similaires"))
+    if len(anciens_ids) == 0 or len(ids) == 0:
+        return None
+
+    i = np.minimum(np.searchsorted(anciens_ids, ids), len(anciens_ids) - 1)
+    present = anciens_ids[i] == ids
+    lignes = anciens[i]
+    ids_voisins = np.where(lignes >= 0, anciens_ids[lignes], -1)
+    j = np.minimum(np.searchsorted(ids, ids_voisins), len(ids) - 1)
+    garder = (lignes >= 0) & (ids[j] == ids_voisins) & present[:, None]
+    voisins = np.where(garder, j, -1)
+    # Voisins gardés en tête de ligne, dans leur ordre, -1 en fin de ligne
+    ordre = np.argsort(~garder, axis=1, kind="stable")
+    return np.take_along_axis(voisins, ordre, axis=1).astype(np.int32)
+
+
+def construire_artefacts(csv_path=CSV_PATH, dossier=ARTEFACTS_DIR, avec_vectorstore=False,
+                         taille_lot=None, avec_similaires=True, remplacer=False, nb_listes_ivf=None):
+    """
+    Construit le dossier d'artefacts de la version actuelle du CSV.
+
+    La reconstruction automatique (charger_ou_construire, pendant une requête)
+    passe avec_similaires=False : les films similaires n'y sont pas calculés
+    mais repris de la version précédente (films toujours présents), jusqu'à
+    la prochaine construction hors ligne.
+
+    nb_listes_ivf : nombre de groupes de l'index vectoriel approximatif
+    (défaut : MOVIEMIND_IVF_LISTES, 0 pour la recherche exacte seulement).
+
+    Le dossier est écrit à côté puis renommé : un autre processus ne voit
+    jamais d'artefacts partiels. Si la version existe déjà (construite par
+    un autre processus), elle est gardée telle quelle ; seule la commande
+    hors ligne la reconstruit (remplacer=True), pour y ajouter l'index
+    vectoriel ou les similaires, dans un nouveau dossier `<version>-<n>` :
+    le dossier publié, que des serveurs projettent en mémoire, n'est pas touché.
+
+    Returns:
+        str: Chemin du dossier d'artefacts
+    """
+    debut = time.perf_counter()
+    sha = hash_fichier(csv_path)
+    version = sha[:16]
+    existant = dossier_version(dossier, version)
+    if not remplacer and existant is not None:
+        _publier(dossier, os.path.basename(existant))
+        return existant
+    final = _nouveau_dossier(dossier, version)
+    tmp = f"{final}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    df, listes, anomalies = preparer_catalogue(lire_csv(csv_path))
+    catalogue = Catalogue(df, version, listes, anomalies)
+    similaires = avec_similaires
+    if not avec_similaires:
+        precedent = dossier_courant(dossier)
+        herites = _heriter_similaires(precedent, catalogue.index_ids[0])
+        if herites is not None:
+            catalogue._derive("index_similaires", lambda: herites)
+            similaires = f"herite:{os.path.basename(precedent)}"
+        else:
+            logger.warning("Artefacts %s sans films similaires : lancer `python -m utils.artefacts`", version)
+    fichiers = ecrire_catalogue(catalogue, tmp, avec_similaires=bool(similaires))
+
+    vectorstore = False
+    if avec_vectorstore:
+        from utils.config import IVF_LISTES
+        from utils.vectorestore import TAILLE_LOT, build_vectorstore
+
+        build_vectorstore(csv_path, os.path.join(tmp, "vectorstore"), taille_lot=taille_lot or TAILLE_LOT,
+                          nb_listes_ivf=IVF_LISTES if nb_listes_ivf is None else nb_listes_ivf)
+        vectorstore = True
+    else:
+        # Reconstruction automatique (CSV modifié) : on garde l'index vectoriel
+        # de la version précédente jusqu'au prochain `python -m utils.artefacts`
+        precedent = dossier_courant(dossier)
+        if precedent is not None and os.path.isdir(os.path.join(precedent, "vectorstore")):
+            shutil.copytree(os.path.join(precedent, "vectorstore"), os.path.join(tmp, "vectorstore"))
+            vectorstore = f"herite:{os.path.basename(precedent)}"
+
+    manifeste = {
+        "format": FORMAT,
+        "version": version,
+        "source": {"chemin": csv_path, "sha256": sha, **_signature_source(csv_path)},
+        "cree_le": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "nb_lignes": len(catalogue),
+        "nb_films": int(len(catalogue.index_ids[0])),
+        "anomalies": [list(a) for a in anomalies],
+        "vectorstore": vectorstore,
+        "similaires": similaires,
+        "fichiers": fichiers,
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifeste, f, indent=2, ensure_ascii=False)
+
+    try:
+        os.replace(tmp, final)
+    except OSError:
+        # Un autre processus a publié le même dossier entre-temps : on le garde
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    _publier(dossier, os.path.basename(final))
+    logger.info("Artefacts %s construits en %.1f s", version, time.perf_counter() - debut)
+    return final
+
+
+def _revisions(dossier, version):
+    """
+    Dossiers publiés (avec manifeste) d'une version, triés par numéro de
+    reconstruction : [(n, nom)], `<version>` étant la reconstruction 0.
+    """
+    try:
+        noms = os.listdir(dossier)
+    except FileNotFoundError:
+        return []
+    revisions = []
+    for nom in noms:
+        trouve = DOSSIER_VERSION.fullmatch(nom)
+        if trouve and trouve.group(1) == version and os.path.exists(os.path.join(dossier, nom, "manifest.json")):
+            revisions.append((int(trouve.group(2) or 0), nom))
+    return sorted(revisions)
+
+
+def dossier_version(dossier, version):
+    """
+    Dernier dossier publié d'une version, ou None.
+    """
+    revisions = _revisions(dossier, version)
+    return os.path.join(dossier, revisions[-1][1]) if revisions else None
+
+
+def _nouveau_dossier(dossier, version):
+    """
+    Dossier de la prochaine construction d'une version : `<version>`, puis
+    `<version>-<n>` si la version est déjà publiée.
+    """
+    revisions = _revisions(dossier, version)
+    if not revisions:
+        return os.path.join(dossier, version)
+    n = revisions[-1][0] + 1
+    while os.path.exists(os.path.join(dossier, f"{version}-{n}")):
+        n += 1
+    return os.path.join(dossier, f"{version}-{n}")
+
+
+def _publier(dossier, nom):
+    """
+    Marque un dossier d'artefacts comme courant. Les dossiers précédents
+    restent en place : des processus serveur peuvent encore les lire.
+    """
+    tmp = os.path.join(dossier, f"{FICHIER_COURANT}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(nom)
+    os.replace(tmp, os.path.join(dossier, FICHIER_COURANT))
+
+
+def supprimer_anciennes_versions(dossier, version):
+    """
+    Supprime les dossiers d'artefacts autres que `version` (nom du dossier
+    publié) : autres versions et reconstructions précédentes (noms de 16
+    caractères hexadécimaux, suivis ou non de "-<n>"). Les autres entrées
+    du dossier ne sont pas touchées.
+
+    À n'appeler que hors ligne : un processus serveur peut encore projeter
+    une version précédente en mémoire.
+
+    Returns:
+        list: Noms des dossiers supprimés
+    """
+    supprimes = []
+    for nom in sorted(os.listdir(dossier)):
+        chemin = os.path.join(dossier, nom)
+        if nom != version and DOSSIER_VERSION.fullmatch(nom) and os.path.isdir(chemin):
+            # Sous Windows, un fichier encore projeté par un autre processus
+            # ne peut pas être supprimé : il le sera au prochain nettoyage.
+            shutil.rmtree(chemin, ignore_errors=True)
+            if not os.path.exists(chemin):
+                supprimes.append(nom)
+    return supprimes
+
+
+def dossier_courant(dossier=ARTEFACTS_DIR):
+    """
+    Dossier de la version d'artefacts courante, ou None.
+    """
+    try:
+        with open(os.path.join(dossier, FICHIER_COURANT), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    chemin = os.path.join(dossier, version)
+    return chemin if os.path.exists(os.path.join(chemin, "manifest.json")) else None
+
+
+def charger_ou_construire(csv_path=CSV_PATH, dossier=ARTEFACTS_DIR):
+    """
+    Charge les artefacts correspondant au CSV, en les construisant si besoin.
+
+    Le CSV n'est haché que si sa taille ou sa date de modification ont changé
+    depuis la construction des artefacts courants.
+    """
+    courant = dossier_courant(dossier)
+    if courant is not None:
+        with open(os.path.join(courant, "manifest.json"), encoding="utf-8") as f:
+            manifeste = json.load(f)
+        source = manifeste["source"]
+        signature = _signature_source(csv_path)
+        if manifeste.get("format") == FORMAT and all(source[c] == signature[c] for c in signature):
+            return charger_artefacts(courant)
+
+    chemin = dossier_version(dossier, hash_fichier(csv_path)[:16])
+    if chemin is not None:
+        with open(os.path.join(chemin, "manifest.json"), encoding="utf-8") as f:
+            manifeste = json.load(f)
+        if manifeste.get("format") == FORMAT:
+            # Contenu identique (fichier simplement touché) : on met à jour la signature
+            manifeste["source"].update(_signature_source(csv_path))
+            tmp = os.path.join(chemin, f"manifest.json.{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifeste, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, os.path.join(chemin, "manifest.json"))
+            _publier(dossier, os.path.basename(chemin))
+            return charger_artefacts(chemin)
+
+    # Construction pendant une requête : sans le calcul O(N²) des similaires
+    return charger_artefacts(construire_artefacts(csv_path, dossier, avec_similaires=False))
+
+
+def main():
+    """
+    Construit (ou reconstruit) les artefacts de la version actuelle du
+    catalogue. Les dossiers précédents ne sont supprimés qu'avec
+    --supprimer-anciennes.
+    """
+    parser = argparse.ArgumentParser(description="Construit les artefacts du catalogue MovieMind")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--dossier", default=ARTEFACTS_DIR)
+    parser.add_argument("--sans-embeddings", action="store_true",
+                        help="Ne pas (re)calculer l'index vectoriel")
+    parser.add_argument("--taille-lot", type=int, default=None,
+                        help="Nombre de documents par appel au modèle d'embedding")
+    parser.add_argument("--ivf-listes", type=int, default=None,
+                        help="Groupes de l'index vectoriel approximatif IVF (0 : recherche exacte)")
+    parser.add_argument("--supprimer-anciennes", action="store_true",
+                        help="Supprimer les dossiers précédents (aucun serveur ne doit encore les lire)")
+    args = parser.parse_args()
+    final = construire_artefacts(args.csv, args.dossier, avec_vectorstore=not args.sans_embeddings,
+                                 taille_lot=args.taille_lot, remplacer=True,
+                                 nb_listes_ivf=args.ivf_listes)
+    print(f"Artefacts publiés : {final}")
+    if args.supprimer_anciennes:
+        for nom in supprimer_anciennes_versions(args.dossier, os.path.basename(final)):
+            print(f"Supprimé : {nom}")
+
+
+if __name__ == "__main__":
+    main()
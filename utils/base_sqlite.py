@@ -0,0 +1,657 @@
+"""
+Base SQLite : pool de connexions et catalogue sur disque
+
+1. Pool de connexions : les connexions SQLite sont ouvertes une fois et
+   partagées par toutes les sessions Streamlit du processus (thread-safe,
+   taille bornée). Chaque connexion est configurée pour la lecture
+   concurrente : journal WAL (les lectures ne bloquent pas l'écriture),
+   synchronous=NORMAL, busy_timeout, cache et mmap bornés.
+
+2. Catalogue SQLite (optionnel, MOVIEMIND_CATALOGUE_BACKEND=sqlite) : le
+   CSV est chargé par morceaux dans une base indexée, sans jamais être lu
+   en entier en mémoire :
+   - table `films` : une ligne par ligne du CSV, colonnes listes en JSON ;
+   - index sur `id_tmdb` (fiches, films trouvés) et sur `title`
+     (recommandations du CSV, données par titre) ;
+   - index (cibles, note_moyenne) : films d'une cible par note décroissante ;
+   - table `cibles` et rang de chaque film dans sa cible, indexé : tirage
+     aléatoire de la page d'accueil sans parcourir la cible ;
+   - table FTS5 `films_fts` (titre + synopsis, sans accents, préfixes de
+     2 et 3 caractères indexés) pour la recherche plein texte et par préfixe.
+   `BaseCatalogue` a l'interface de `Catalogue` dont les pages se servent
+   (fiche, films_par_cible, recommandations_ou_similaires, films...) : avec
+   ce backend, le processus ne construit ni ne charge les artefacts du
+   catalogue en mémoire. Les films similaires sont lus dans le dossier
+   d'artefacts de la même version s'il a été construit hors ligne.
+
+3. Version : le fichier de la base porte la version du CSV (hash) et le
+   format du schéma (catalogue-<hash>-f<format>.sqlite3) ; une nouvelle
+   version ou un nouveau format est construit à côté puis publié sous son
+   propre nom, jamais à la place d'une base que d'autres processus lisent. Les versions précédentes
+   ne sont supprimées que par la commande ci-dessous, jamais par
+   l'application (un autre processus peut encore les lire).
+
+Utilisation (construction, suppression des anciennes versions et temps de requête) :
+    python -m utils.base_sqlite
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+# Bibliothèque standard seulement : le pool sert aussi aux pages qui ne
+# chargent pas le catalogue (pandas, pyarrow sont importés au premier usage).
+DOSSIER_BASES = "data"
+DOSSIER_ARTEFACTS = os.path.join(DOSSIER_BASES, "artefacts")  # ARTEFACTS_DIR de utils/artefacts.py
+COLONNES_LISTES = ("recommendations", "trailers", "name_x")  # comme utils/catalogue.py
+COLONNES = ("id_tmdb", "title", "overview", "note_moyenne", "lien_photos", "cibles") + COLONNES_LISTES
+COLONNES_GRILLE = ("id_tmdb", "title", "lien_photos", "note_moyenne", "cibles")
+TAILLE_CACHE_FICHES = 256  # comme utils/catalogue.py
+# Version du schéma, dans le nom du fichier : un nouveau format est construit
+# dans un nouveau fichier
+FORMAT_BASE = "2"
+# Fichiers d'une version de la base : base, journal WAL et mémoire partagée
+# (sans "-f<format>" : bases antérieures au format dans le nom)
+FICHIER_VERSION = re.compile(r"catalogue-([0-9a-f]{16})(?:-f([0-9]+))?\.sqlite3(?:-wal|-shm)?")
+
+SCHEMA = """
+CREATE TABLE films (
+    id_tmdb INTEGER NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    overview TEXT NOT NULL DEFAULT '',
+    note_moyenne REAL,
+    lien_photos TEXT NOT NULL DEFAULT '',
+    cibles TEXT NOT NULL DEFAULT '',
+    recommendations TEXT NOT NULL DEFAULT '[]',
+    trailers TEXT NOT NULL DEFAULT '[]',
+    name_x TEXT NOT NULL DEFAULT '[]',
+    rang_cible INTEGER
+);
+CREATE TABLE cibles (nom TEXT PRIMARY KEY, ordre INTEGER NOT NULL, nb INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE meta (cle TEXT PRIMARY KEY, valeur TEXT) WITHOUT ROWID;
+"""
+INDEX = """
+INSERT INTO cibles SELECT cibles, min(rowid), count(*) FROM films WHERE cibles != '' GROUP BY cibles;
+UPDATE films SET rang_cible = r.rang FROM (
+    SELECT rowid AS ligne, row_number() OVER (PARTITION BY cibles ORDER BY rowid) - 1 AS rang
+    FROM films WHERE cibles != ''
+) AS r WHERE films.rowid = r.ligne;
+CREATE INDEX idx_films_id_tmdb ON films (id_tmdb);
+CREATE INDEX idx_films_title ON films (title);
+CREATE INDEX idx_films_cibles ON films (cibles, note_moyenne DESC);
+CREATE INDEX idx_films_rang_cible ON films (cibles, rang_cible);
+CREATE VIRTUAL TABLE films_fts USING fts5(
+    title, overview, content='films', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+INSERT INTO films_fts (films_fts) VALUES ('rebuild');
+ANALYZE;
+"""
+
+
+class PoolConnexions:
+    """
+    Connexions SQLite partagées entre threads, au plus `taille` ouvertes à la fois.
+    """
+
+    def __init__(self, chemin, taille=8, delai=5.0):
+        self.chemin = chemin
+        self.taille = taille
+        self.delai = delai
+        self._libres = queue.LifoQueue()
+        self._nb_ouvertes = 0
+        self._ferme = False
+        self._verrou = threading.Lock()
+
+    def _ouvrir(self):
+        conn = sqlite3.connect(self.chemin, timeout=self.delai, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.delai * 1000)}")
+        conn.execute("PRAGMA cache_size=-8000")        # 8 Mo de cache de pages par connexion
+        conn.execute("PRAGMA mmap_size=268435456")     # lectures projetées (256 Mo max)
+        return conn
+
+    @contextlib.contextmanager
+    def connexion(self):
+        """
+        Connexion empruntée au pool le temps du bloc `with`, puis rendue.
+
+        Raises:
+            TimeoutError: Si aucune connexion ne se libère dans le délai
+        """
+        try:
+            conn = self._libres.get_nowait()
+        except queue.Empty:
+            with self._verrou:
+                ouvrir = self._nb_ouvertes < self.taille
+                if ouvrir:
+                    self._nb_ouvertes += 1
+            if ouvrir:
+                try:
+                    conn = self._ouvrir()
+                except sqlite3.Error:
+                    with self._verrou:
+                        self._nb_ouvertes -= 1
+                    raise
+            else:
+                try:
+                    conn = self._libres.get(timeout=self.delai)
+                except queue.Empty:
+                    raise TimeoutError(f"Aucune connexion SQLite libre ({self.chemin})") from None
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._ferme:
+                # Pool fermé pendant l'emprunt : la connexion n'est pas rendue
+                conn.close()
+                with self._verrou:
+                    self._nb_ouvertes -= 1
+            else:
+                self._libres.put(conn)
+
+    def fermer(self):
+        """
+        Ferme les connexions libres ; celles encore empruntées sont fermées
+        à leur retour.
+        """
+        self._ferme = True
+        while True:
+            try:
+                self._libres.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._verrou:
+                self._nb_ouvertes -= 1
+
+
+def _texte(valeur):
+    return "" if valeur is None or valeur != valeur else str(valeur)
+
+
+def _lignes_csv(csv_path, taille_morceau):
+    import pandas as pd
+
+    from utils.catalogue import parser_liste
+
+    for morceau in pd.read_csv(csv_path, chunksize=taille_morceau):
+        for colonne in COLONNES:
+            if colonne not in morceau.columns:
+                morceau[colonne] = None
+        lignes = []
+        for ligne in morceau[list(COLONNES)].itertuples(index=False):
+            ligne = ligne._asdict()
+            listes = {}
+            for colonne in COLONNES_LISTES:
+                try:
+                    listes[colonne] = json.dumps(parser_liste(ligne[colonne]), ensure_ascii=False)
+                except ValueError:
+                    listes[colonne] = "[]"
+            note = ligne["note_moyenne"]
+            lignes.append((
+                int(ligne["id_tmdb"]), _texte(ligne["title"]), _texte(ligne["overview"]),
+                None if note is None or note != note else float(note),
+                _texte(ligne["lien_photos"]), _texte(ligne["cibles"]),
+                listes["recommendations"], listes["trailers"], listes["name_x"],
+            ))
+        yield lignes
+
+
+def construire_base(csv_path, chemin, version, taille_morceau=5000):
+    """
+    Charge le CSV dans une nouvelle base SQLite, écrite à côté puis publiée
+    sous `chemin`. Si une base y a déjà été publiée (par un autre processus),
+    elle est gardée telle quelle : une base ouverte en WAL n'est jamais remplacée.
+    """
+    debut = time.perf_counter()
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(SCHEMA)
+        nb = 0
+        for lignes in _lignes_csv(csv_path, taille_morceau):
+            conn.executemany(f"INSERT INTO films ({', '.join(COLONNES)}) VALUES ({', '.join('?' * len(COLONNES))})",
+                             lignes)
+            nb += len(lignes)
+        conn.executescript(INDEX)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", version), ("source", csv_path), ("format", FORMAT_BASE), ("nb_lignes", str(nb)),
+        ])
+        conn.commit()
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+    try:
+        # Lien physique : échoue si `chemin` existe, sans fenêtre entre test et publication
+        os.link(tmp, chemin)
+    except FileExistsError:
+        logger.info("Base SQLite %s déjà publiée par un autre processus", version)
+    else:
+        logger.info("Base SQLite %s : %s lignes en %.1f s", version, nb, time.perf_counter() - debut)
+    finally:
+        os.remove(tmp)
+
+
+def nom_base(version):
+    """
+    Nom du fichier de la base d'une version du CSV, au format courant.
+    """
+    return f"catalogue-{version}-f{FORMAT_BASE}.sqlite3"
+
+
+def ouvrir_base_catalogue(csv_path=None, dossier=DOSSIER_BASES, taille_pool=8):
+    """
+    Base SQLite de la version actuelle du CSV, construite si besoin (une
+    base d'un format précédent porte un autre nom : elle n'est pas réutilisée).
+    Les versions précédentes sont laissées en place (voir supprimer_anciennes_versions).
+
+    Returns:
+        BaseCatalogue
+    """
+    from utils.artefacts import dossier_version
+    from utils.catalogue import CSV_PATH, hash_fichier
+
+    csv_path = csv_path or CSV_PATH
+    version = hash_fichier(csv_path)[:16]
+    chemin = os.path.join(dossier, nom_base(version))
+    if not os.path.exists(chemin):
+        os.makedirs(dossier, exist_ok=True)
+        construire_base(csv_path, chemin, version)
+    return BaseCatalogue(PoolConnexions(chemin, taille=taille_pool), version,
+                         dossier_artefacts=dossier_version(DOSSIER_ARTEFACTS, version))
+
+
+def supprimer_anciennes_versions(dossier, version):
+    """
+    Supprime les fichiers des autres versions de la base, et ceux de la
+    même version dans un format précédent (catalogue-<hash>[-f<format>].sqlite3
+    et ses fichiers -wal / -shm). Les autres fichiers du dossier ne sont pas touchés.
+
+    À n'appeler que hors ligne : un processus serveur peut encore lire une
+    version précédente.
+
+    Returns:
+        list: Noms des fichiers supprimés
+    """
+    supprimes = []
+    for nom in sorted(os.listdir(dossier)):
+        correspondance = FICHIER_VERSION.fullmatch(nom)
+        if correspondance and correspondance.groups() != (version, FORMAT_BASE):
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(dossier, nom))
+                supprimes.append(nom)
+    return supprimes
+
+
+def requete_fts(texte, approchee=False):
+    """
+    Requête FTS5 à partir d'un texte libre : chaque mot est cherché comme préfixe.
+
+    Approchée : un seul des mots suffit, et seuls leurs 3 premiers caractères
+    sont cherchés (tolère une faute de frappe en fin de mot).
+    """
+    from utils.recherche import normaliser_titre
+
+    mots = re.findall(r"\w+", normaliser_titre(texte))
+    if approchee:
+        mots = dict.fromkeys(mot[:3] for mot in mots if len(mot) >= 2)
+        return " OR ".join(f'"{mot}"*' for mot in mots)
+    return " ".join(f'"{mot}"*' for mot in mots)
+
+
+def _morceaux(valeurs, taille=500):
+    valeurs = list(valeurs)
+    for debut in range(0, len(valeurs), taille):
+        yield valeurs[debut : debut + taille]
+
+
+class BaseCatalogue:
+    """
+    Catalogue lu directement dans SQLite, avec l'interface de Catalogue dont
+    se servent les pages : fiches, tirage par cible, recommandations,
+    recherche plein texte et lecture des films.
+    """
+
+    def __init__(self, pool, version=None, dossier_artefacts=None):
+        self.pool = pool
+        self.version = version
+        self.dossier_artefacts = dossier_artefacts  # similaires.npy de la même version, s'il existe
+        self._verrou = threading.Lock()
+        self._fiches = OrderedDict()                # id_tmdb -> fiche, LRU
+        self._nb_lignes = None
+        self._cibles = None
+        self._similaires = None
+        self._sans_similaires_signale = False
+
+    def fermer(self):
+        """
+        Ferme les connexions à la base (version remplacée, voir utils/ressources.py).
+        """
+        self.pool.fermer()
+
+    def __len__(self):
+        if self._nb_lignes is None:
+            with self.pool.connexion() as conn:
+                self._nb_lignes = int(conn.execute("SELECT valeur FROM meta WHERE cle = 'nb_lignes'").fetchone()[0])
+        return self._nb_lignes
+
+    @staticmethod
+    def _film(ligne, noms):
+        film = dict(zip(noms, ligne))
+        for colonne in COLONNES_LISTES:
+            if colonne in film:
+                film[colonne] = json.loads(film[colonne])
+        return film
+
+    def film(self, id_tmdb):
+        """
+        Première ligne d'un film, colonnes listes décodées, ou None.
+
+        Returns:
+            dict
+        """
+        with self.pool.connexion() as conn:
+            ligne = conn.execute(
+                f"SELECT {', '.join(COLONNES)} FROM films WHERE id_tmdb = ? ORDER BY rowid LIMIT 1", (int(id_tmdb),)
+            ).fetchone()
+        return self._film(ligne, COLONNES) if ligne else None
+
+    def fiche(self, id_tmdb):
+        """
+        Fiche d'affichage d'un film (lecture seule), ou None : mêmes clés que Catalogue.fiche.
+        """
+        try:
+            id_tmdb = int(id_tmdb)
+        except (TypeError, ValueError):
+            return None
+        with self._verrou:
+            if id_tmdb in self._fiches:
+                self._fiches.move_to_end(id_tmdb)
+                return self._fiches[id_tmdb]
+
+        film = self.film(id_tmdb)
+        if film is None:
+            return None
+        note = film["note_moyenne"]
+        fiche = MappingProxyType({
+            "id_tmdb": id_tmdb,
+            "title": film["title"],
+            "overview": film["overview"],
+            "note_moyenne": None if note is None else round(note, 1),
+            "lien_photos": film["lien_photos"],
+            "cibles": film["cibles"],
+            "trailers": tuple(film["trailers"]),
+            "name_x": tuple(film["name_x"]),
+        })
+        with self._verrou:
+            self._fiches[id_tmdb] = fiche
+            while len(self._fiches) > TAILLE_CACHE_FICHES:
+                self._fiches.popitem(last=False)
+        return fiche
+
+    def films(self, ids, colonnes=COLONNES_GRILLE):
+        """
+        Films demandés, dans l'ordre donné, sans doublon ni id inconnu.
+
+        Returns:
+            pd.DataFrame
+        """
+        import pandas as pd
+
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        lignes = {}
+        with self.pool.connexion() as conn:
+            for lot in _morceaux(ids):
+                curseur = conn.execute(
+                    f"SELECT {', '.join(colonnes)} FROM films WHERE id_tmdb IN ({', '.join('?' * len(lot))}) "
+                    "ORDER BY rowid", lot,
+                )
+                for ligne in curseur:
+                    lignes.setdefault(ligne[colonnes.index("id_tmdb")], ligne)
+        return pd.DataFrame([lignes[i] for i in ids if i in lignes], columns=list(colonnes))
+
+    @property
+    def cibles(self):
+        """
+        Cibles et nombre de lignes de chacune, dans l'ordre de première
+        apparition (comme Catalogue.index_cibles).
+
+        Returns:
+            list: [(cible, nb)]
+        """
+        if self._cibles is None:
+            with self.pool.connexion() as conn:
+                self._cibles = conn.execute("SELECT nom, nb FROM cibles ORDER BY ordre").fetchall()
+        return self._cibles
+
+    def par_cible(self, cible, limite=20, decalage=0, colonnes=COLONNES_GRILLE):
+        """
+        Films d'une cible par note décroissante (index (cibles, note_moyenne)).
+
+        Returns:
+            pd.DataFrame
+        """
+        import pandas as pd
+
+        with self.pool.connexion() as conn:
+            lignes = conn.execute(
+                f"SELECT {', '.join(colonnes)} FROM films WHERE cibles = ? "
+                "ORDER BY note_moyenne DESC, rowid LIMIT ? OFFSET ?", (cible, int(limite), int(decalage)),
+            ).fetchall()
+        return pd.DataFrame(lignes, columns=list(colonnes))
+
+    def echantillon_par_cible(self, nb_films, graine, nb_cibles=None):
+        """
+        Tirage sans remise de `nb_films` rangs par cible, reproductible pour
+        une même graine : mêmes films que Catalogue.echantillon_par_cible.
+
+        Returns:
+            list: [(cible, rangs)], dans l'ordre de `cibles`
+        """
+        import numpy as np
+
+        rng = np.random.default_rng(graine)
+        return [
+            (cible, rng.choice(nb, size=min(nb_films, nb), replace=False))
+            for cible, nb in self.cibles[:nb_cibles]
+        ]
+
+    def films_par_cible(self, nb_films, graine, nb_cibles=None, colonnes=COLONNES_GRILLE):
+        """
+        Films tirés au hasard pour chaque cible (voir echantillon_par_cible),
+        lus par leur rang dans la cible (index (cibles, rang_cible)).
+
+        Returns:
+            dict: cible -> DataFrame des films tirés
+        """
+        import pandas as pd
+
+        tirage = {}
+        with self.pool.connexion() as conn:
+            for cible, rangs in self.echantillon_par_cible(nb_films, graine, nb_cibles):
+                rangs = rangs.tolist()
+                if not rangs:
+                    tirage[cible] = pd.DataFrame(columns=list(colonnes))
+                    continue
+                lignes = {
+                    ligne[0]: ligne[1:]
+                    for ligne in conn.execute(
+                        f"SELECT rang_cible, {', '.join(colonnes)} FROM films "
+                        f"WHERE cibles = ? AND rang_cible IN ({', '.join('?' * len(rangs))})", [cible, *rangs],
+                    )
+                }
+                tirage[cible] = pd.DataFrame([lignes[r] for r in rangs], columns=list(colonnes))
+        return tirage
+
+    def meilleurs_par_cible(self, nb_films, filtre=None):
+        """
+        Films les mieux notés de chaque cible, comme Catalogue.meilleurs_par_cible,
+        lus par morceaux dans l'index (cibles, note_moyenne).
+
+        Returns:
+            list: [(cible, np.ndarray d'id_tmdb)], dans l'ordre de `cibles`
+        """
+        import numpy as np
+
+        meilleurs = []
+        with self.pool.connexion() as conn:
+            for cible, _ in self.cibles:
+                curseur = conn.execute(
+                    "SELECT id_tmdb FROM films WHERE cibles = ? ORDER BY note_moyenne DESC, rowid", (cible,)
+                )
+                ids = {}
+                while len(ids) < nb_films:
+                    lot = np.array([i for (i,) in curseur.fetchmany(max(nb_films, 100))], dtype=np.int64)
+                    if not len(lot):
+                        break
+                    if filtre is not None:
+                        lot = lot[filtre(lot)]
+                    ids.update(dict.fromkeys(lot.tolist()))
+                curseur.close()
+                meilleurs.append((cible, np.array(list(ids)[:nb_films], dtype=np.int64)))
+        return meilleurs
+
+    def ids_par_titres(self, titres):
+        """
+        id_tmdb des films portant exactement l'un des titres donnés (index sur `title`).
+        """
+        par_titre = {}
+        with self.pool.connexion() as conn:
+            for lot in _morceaux(dict.fromkeys(titres)):
+                curseur = conn.execute(
+                    f"SELECT title, id_tmdb FROM films WHERE title IN ({', '.join('?' * len(lot))}) ORDER BY rowid",
+                    lot,
+                )
+                for titre, id_tmdb in curseur:
+                    par_titre.setdefault(titre, {})[id_tmdb] = None
+        return [id_tmdb for titre in titres for id_tmdb in par_titre.get(titre, ())]
+
+    def recommandations(self, id_tmdb):
+        """
+        id_tmdb des films recommandés pour un film (liste `recommendations` du CSV).
+        """
+        id_tmdb = int(id_tmdb)
+        with self.pool.connexion() as conn:
+            ligne = conn.execute(
+                "SELECT recommendations FROM films WHERE id_tmdb = ? ORDER BY rowid LIMIT 1", (id_tmdb,)
+            ).fetchone()
+        if ligne is None:
+            return []
+        return [i for i in dict.fromkeys(self.ids_par_titres(json.loads(ligne[0]))) if i != id_tmdb]
+
+    def _index_similaires(self):
+        if self._similaires is None:
+            import numpy as np
+
+            chemins = [os.path.join(self.dossier_artefacts or "", f"{nom}.npy") for nom in ("ids", "similaires")]
+            if self.dossier_artefacts and all(os.path.exists(chemin) for chemin in chemins):
+                self._similaires = tuple(np.load(chemin, mmap_mode="r") for chemin in chemins)
+            else:
+                self._similaires = ()
+        return self._similaires
+
+    def similaires(self, id_tmdb, k=None):
+        """
+        Films similaires précalculés hors ligne (similaires.npy des artefacts
+        de la même version), comme Catalogue.similaires ; liste vide sinon.
+        """
+        import numpy as np
+
+        index = self._index_similaires()
+        if not index:
+            if not self._sans_similaires_signale:
+                self._sans_similaires_signale = True
+                logger.warning("Base catalogue %s : films similaires non précalculés "
+                               "(python -m utils.artefacts)", self.version)
+            return []
+        ids_tries, voisins = index
+        i = np.searchsorted(ids_tries, id_tmdb)
+        if i >= len(ids_tries) or ids_tries[i] != id_tmdb:
+            return []
+        ligne = np.asarray(voisins[i, :k])
+        return np.asarray(ids_tries)[ligne[ligne >= 0]].tolist()
+
+    def recommandations_ou_similaires(self, id_tmdb):
+        """
+        Recommandations du CSV d'un film ; si sa liste est vide, films similaires précalculés (page 3).
+        """
+        return self.recommandations(id_tmdb) or self.similaires(id_tmdb)
+
+    def rechercher(self, texte, limite=10, approchee=False):
+        """
+        Recherche plein texte (titre pondéré 10 fois plus que le synopsis), par
+        préfixe de mots ; approchée : voir requete_fts.
+
+        Returns:
+            list: Tuples (titre, score, [id_tmdb]) triés par pertinence, comme IndexRecherche.rechercher
+        """
+        requete = requete_fts(texte, approchee)
+        if not requete:
+            return []
+        with self.pool.connexion() as conn:
+            lignes = conn.execute(
+                "SELECT f.title, f.id_tmdb, bm25(films_fts, 10.0, 1.0) AS rang "
+                "FROM films_fts JOIN films f ON f.rowid = films_fts.rowid "
+                "WHERE films_fts MATCH ? ORDER BY rang LIMIT ?", (requete, int(limite) * 5),
+            ).fetchall()
+        resultats = {}
+        for titre, id_tmdb, rang in lignes:
+            _, ids = resultats.setdefault(titre, (-rang, []))
+            if id_tmdb not in ids:
+                ids.append(id_tmdb)
+        return [(titre, score, ids) for titre, (score, ids) in list(resultats.items())[:limite]]
+
+
+def main():
+    """
+    Construit la base SQLite du catalogue, supprime les versions précédentes
+    et mesure les requêtes des pages (fiche, accueil, recommandations, recherche).
+    """
+    parser = argparse.ArgumentParser(description="Catalogue MovieMind dans SQLite (WAL, FTS5)")
+    parser.add_argument("--csv", default=None, help="CSV du catalogue (défaut : celui de utils/catalogue.py)")
+    parser.add_argument("--dossier", default=DOSSIER_BASES)
+    parser.add_argument("--repetitions", type=int, default=1000)
+    args = parser.parse_args()
+
+    base = ouvrir_base_catalogue(args.csv, args.dossier)
+    for nom in supprimer_anciennes_versions(args.dossier, base.version):
+        print(f"Supprimé : {nom}")
+    with base.pool.connexion() as conn:
+        ids = [i for (i,) in conn.execute("SELECT id_tmdb FROM films ORDER BY random() LIMIT 100")]
+        titres = [t for (t,) in conn.execute("SELECT title FROM films ORDER BY random() LIMIT 100")]
+    cibles = [cible for cible, _ in base.cibles] or [""]
+    print(f"{len(base)} lignes")
+    mesures = {
+        "film(id_tmdb)": lambda i: base.film(ids[i % len(ids)]),
+        "par_cible(20)": lambda i: base.par_cible(cibles[i % len(cibles)], 20, decalage=i % 5 * 20),
+        "films_par_cible(5, 4)": lambda i: base.films_par_cible(5, i, 4),
+        "recommandations": lambda i: base.recommandations(ids[i % len(ids)]),
+        "films(20 id_tmdb)": lambda i: base.films(ids[i % 80 : i % 80 + 20]),
+        "rechercher(préfixe)": lambda i: base.rechercher(titres[i % len(titres)][:4]),
+    }
+    for nom, requete in mesures.items():
+        debut = time.perf_counter()
+        for i in range(args.repetitions):
+            requete(i)
+        print(f"{nom:<22} {(time.perf_counter() - debut) / args.repetitions * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Mesure du démarrage de chaque page
+
+Chaque page est exécutée dans un processus Python neuf (démarrage à froid),
+avec le banc de test de Streamlit (AppTest), et l'on relève :
+
+- imports : temps cumulé des modules importés pendant l'exécution de la page
+  (`python -X importtime`), hors Streamlit lui-même ;
+- premier rendu : durée de la première exécution complète de la page ;
+- modules lourds chargés : LangChain, clients LLM, scikit-learn, rapidfuzz...
+
+Une page qui n'utilise pas l'assistant ne doit charger aucun module de la pile IA.
+
+Utilisation (depuis la racine du projet) :
+    python -m utils.bench_demarrage
+    python -m utils.bench_demarrage login.py pages/main.py --repetitions 3
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PAGES = ["login.py", "pages/main.py", "pages/page_2.py", "pages/page_3.py", "pages/page_4.py"]
+MODULES_LOURDS = [
+    "langchain", "langchain_core", "langchain_groq", "langchain_openai", "openai", "groq",
+    "sklearn", "rapidfuzz", "pyarrow", "pandas", "sqlite3",
+]
+REPERE = "--- debut de la page ---"
+
+_SCRIPT = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+page = sys.argv[1]
+sys.stderr.write({REPERE!r} + "\\n")
+sys.stderr.flush()
+debut = time.perf_counter()
+at = AppTest.from_file(page, default_timeout=120).run()
+duree = time.perf_counter() - debut
+print(json.dumps({{
+    "premier_rendu": duree,
+    "erreurs": [str(e.value) for e in at.exception],
+    "modules": sorted(m for m in {MODULES_LOURDS!r} if m in sys.modules),
+}}))
+"""
+
+
+def mesurer_page(page):
+    """
+    Exécute une page à froid dans un sous-processus.
+
+    Returns:
+        dict: premier_rendu (s), imports (s), erreurs, modules lourds chargés
+    """
+    resultat = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT, page],
+        capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=os.getcwd()),
+    )
+    if resultat.returncode != 0:
+        raise RuntimeError(f"{page} : {resultat.stderr.strip().splitlines()[-1]}")
+    mesures = json.loads(resultat.stdout.strip().splitlines()[-1])
+
+    # Lignes "import time: self [us] | cumulative | module" émises après le repère
+    journal = resultat.stderr.split(REPERE, 1)[-1]
+    mesures["imports"] = sum(
+        int(ligne.split("|")[0].split(":")[1]) for ligne in journal.splitlines()
+        if ligne.startswith("import time:") and ligne.split("|")[0].split(":")[1].strip().isdigit()
+    ) / 1e6
+    return mesures
+
+
+def main():
+    """
+    Mesure le démarrage des pages et affiche un tableau récapitulatif.
+    """
+    parser = argparse.ArgumentParser(description="Temps d'import et de premier rendu des pages MovieMind")
+    parser.add_argument("pages", nargs="*", default=PAGES)
+    parser.add_argument("--repetitions", type=int, default=1,
+                        help="Nombre de mesures par page (la médiane est affichée)")
+    args = parser.parse_args()
+
+    print(f"{'page':<18} {'imports':>9} {'1er rendu':>10}  modules lourds")
+    for page in args.pages:
+        essais = [mesurer_page(page) for _ in range(args.repetitions)]
+        median = sorted(essais, key=lambda m: m["premier_rendu"])[len(essais) // 2]
+        ligne = (f"{page:<18} {median['imports'] * 1000:>7.0f}ms {median['premier_rendu'] * 1000:>8.0f}ms  "
+                 f"{', '.join(median['modules']) or '-'}")
+        if median["erreurs"]:
+            ligne += f"  [erreur : {median['erreurs'][0][:60]}]"
+        print(ligne)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Cache persistant des embeddings
+
+Chaque document est identifié par le hash SHA-256 de son `page_content` et
+du nom du modèle d'embedding. Lors d'une reconstruction de l'index vectoriel,
+seuls les documents nouveaux ou modifiés sont envoyés au modèle.
+
+Le cache est un dossier de lots : chaque lot calculé est écrit immédiatement
+(`lot-*.vecteurs.npy` puis `lot-*.cles.npy`, écriture atomique). Après un
+plantage, la construction reprend là où elle s'était arrêtée : les lots déjà
+écrits ne sont pas recalculés.
+
+En fin de construction, le cache est compacté (`CacheEmbeddings.compacter`) :
+seules les clés des documents de cette construction sont gardées, réécrites
+dans un seul lot. Les documents supprimés ou modifiés du catalogue ne
+s'accumulent donc pas d'une construction à l'autre.
+"""
+
+import contextlib
+import glob
+import hashlib
+import os
+import re
+import time
+
+import numpy as np
+
+CACHE_EMBEDDINGS_DIR = "data/cache_embeddings"
+TAILLE_BLOC_COMPACTAGE = 4096
+
+
+def cle_document(texte, modele):
+    """
+    Clé de cache d'un document : SHA-256 du modèle et du texte.
+    """
+    return hashlib.sha256(f"{modele}\0{texte}".encode("utf-8")).hexdigest()
+
+
+class CacheEmbeddings:
+    """
+    Embeddings déjà calculés pour un modèle, indexés par clé de document.
+    """
+
+    def __init__(self, modele, dossier=CACHE_EMBEDDINGS_DIR):
+        self.modele = modele
+        self.dossier = os.path.join(dossier, re.sub(r"[^\w.-]+", "_", modele))
+        os.makedirs(self.dossier, exist_ok=True)
+        self._lots = []       # vecteurs de chaque lot (mmap)
+        self._index = {}      # clé -> (numéro de lot, ligne)
+        for chemin_cles in self._fichiers_lots():
+            chemin_vecteurs = chemin_cles.replace(".cles.npy", ".vecteurs.npy")
+            self._indexer(np.load(chemin_cles), np.load(chemin_vecteurs, mmap_mode="r"))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, cle):
+        return cle in self._index
+
+    def _indexer(self, cles, vecteurs):
+        numero = len(self._lots)
+        self._lots.append(vecteurs)
+        for ligne, cle in enumerate(cles.tolist()):
+            self._index[cle] = (numero, ligne)
+
+    def manquantes(self, cles):
+        """
+        Positions des clés absentes du cache.
+        """
+        return [i for i, cle in enumerate(cles) if cle not in self._index]
+
+    def obtenir(self, cles):
+        """
+        Vecteurs des clés données (toutes doivent être dans le cache).
+
+        Returns:
+            np.ndarray: Matrice (len(cles), d) float32
+        """
+        return np.vstack([self._lots[n][l] for n, l in (self._index[c] for c in cles)]).astype(np.float32)
+
+    def ajouter(self, cles, vecteurs):
+        """
+        Enregistre immédiatement un lot de vecteurs sur disque.
+        """
+        vecteurs = np.asarray(vecteurs, dtype=np.float32)
+        base = os.path.join(self.dossier, f"lot-{time.time_ns()}-{os.getpid()}")
+        # Les vecteurs d'abord : un fichier de clés n'existe jamais sans ses vecteurs
+        for suffixe, tableau in ((".vecteurs.npy", vecteurs), (".cles.npy", np.asarray(cles, dtype="<U64"))):
+            tmp = f"{base}{suffixe}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, tableau)
+            os.replace(tmp, f"{base}{suffixe}")
+        self._indexer(np.asarray(cles), vecteurs)
+
+    def _fichiers_lots(self):
+        return sorted(glob.glob(os.path.join(self.dossier, "lot-*.cles.npy")))
+
+    def compacter(self, cles):
+        """
+        Ne garde que les clés données (celles de la dernière construction) :
+        leurs vecteurs sont réécrits dans un seul lot, par blocs (la mémoire
+        reste bornée), puis les anciens lots sont supprimés.
+
+        Returns:
+            int: Nombre d'entrées retirées du cache
+        """
+        gardees = [cle for cle in dict.fromkeys(cles) if cle in self._index]
+        anciens = self._fichiers_lots()
+        retirees = len(self._index) - len(gardees)
+        if retirees == 0 and len(anciens) <= 1:
+            return 0
+
+        nouveau = None
+        if gardees:
+            dimension = self._lots[self._index[gardees[0]][0]].shape[1]
+            base = os.path.join(self.dossier, f"lot-{time.time_ns()}-{os.getpid()}")
+            tmp = f"{base}.vecteurs.npy.tmp"
+            vecteurs = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(len(gardees), dimension))
+            for debut in range(0, len(gardees), TAILLE_BLOC_COMPACTAGE):
+                bloc = gardees[debut : debut + TAILLE_BLOC_COMPACTAGE]
+                vecteurs[debut : debut + len(bloc)] = self.obtenir(bloc)
+            vecteurs.flush()
+            del vecteurs
+            os.replace(tmp, f"{base}.vecteurs.npy")
+            with open(f"{base}.cles.npy.tmp", "wb") as f:
+                np.save(f, np.asarray(gardees, dtype="<U64"))
+            os.replace(f"{base}.cles.npy.tmp", f"{base}.cles.npy")
+            nouveau = f"{base}.cles.npy"
+
+        # Le nouveau lot est complet avant toute suppression : après un
+        # plantage, il reste au pire des doublons, relus sans erreur.
+        self._lots, self._index = [], {}
+        for chemin_cles in anciens:
+            for chemin in (chemin_cles, chemin_cles.replace(".cles.npy", ".vecteurs.npy")):
+                with contextlib.suppress(OSError):
+                    os.remove(chemin)
+        if nouveau is not None:
+            self._indexer(np.load(nouveau), np.load(nouveau.replace(".cles.npy", ".vecteurs.npy"), mmap_mode="r"))
+        return retirees
+
+
+def embed_incremental(textes, embeddings, modele, cache=None, taille_lot=256):
+    """
+    Embeddings des textes, en n'appelant le modèle que pour ceux absents du cache.
+
+    Args:
+        textes (list): Contenus des documents (`page_content`)
+        embeddings: Modèle d'embedding (méthode `embed_documents`)
+        modele (str): Nom du modèle, partie de la clé de cache
+        cache (CacheEmbeddings): Cache à utiliser (par défaut celui du modèle)
+        taille_lot (int): Nombre de textes par appel au modèle
+
+    Returns:
+        tuple: (matrice (n, d) float32, nombre de textes envoyés au modèle)
+    """
+    if not getattr(embeddings, "cache", True):
+        # Backend local : recalculer coûte moins cher que relire le cache
+        lots = [embeddings.embed_documents(textes[i : i + taille_lot]) for i in range(0, len(textes), taille_lot)]
+        return (np.vstack(lots) if lots else np.empty((0, 0), np.float32)), len(textes)
+
+    cache = cache if cache is not None else CacheEmbeddings(modele)
+    cles = [cle_document(texte, modele) for texte in textes]
+    # Un même texte présent plusieurs fois n'est calculé qu'une fois
+    manquantes = list(dict.fromkeys(cles[i] for i in cache.manquantes(cles)))
+    textes_par_cle = dict(zip(cles, textes))
+
+    for i in range(0, len(manquantes), taille_lot):
+        lot = manquantes[i : i + taille_lot]
+        cache.ajouter(lot, embeddings.embed_documents([textes_par_cle[c] for c in lot]))
+
+    return cache.obtenir(cles) if cles else np.empty((0, 0), np.float32), len(manquantes)
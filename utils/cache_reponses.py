@@ -0,0 +1,129 @@
+"""
+Cache des réponses de l'assistant
+
+Les réponses du LLM sont partagées entre toutes les sessions du processus
+serveur. La clé d'une réponse est :
+
+1. La question normalisée (minuscules, sans accents ni ponctuation) : deux
+   questions qui ne diffèrent que par la casse ou la ponctuation partagent
+   la même réponse, sans appel au LLM ni au modèle d'embedding.
+
+2. L'empreinte de l'historique de conversation : une question de suivi
+   ("et un autre ?") n'a pas le même sens selon ce qui précède.
+
+Le cache est borné (LRU) et les réponses expirent après `ttl` secondes.
+
+Recherche sémantique (optionnelle, `seuil_semantique` > 0) : en l'absence de
+correspondance exacte, l'embedding de la question est comparé à ceux des
+questions déjà en cache avec le même historique ; au-delà du seuil de
+similarité cosinus, la réponse est réutilisée. C'est la question telle que
+posée qui est encodée, comme le fait ensuite la recherche dans l'index
+pour une première question : le backend OpenAI mémorise cet embedding
+(utils/embeddings.py) et un échec du cache ne coûte pas un second appel.
+Une question de suivi est reformulée par la chaîne avant la recherche :
+son embedding est alors calculé deux fois.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.recherche import normaliser_titre
+
+
+def normaliser_question(question):
+    """
+    Forme canonique d'une question (voir normaliser_titre).
+    """
+    return normaliser_titre(question)
+
+
+def empreinte_historique(historique):
+    """
+    Empreinte d'un historique de conversation [(question, réponse), ...].
+    """
+    if not historique:
+        return ""
+    h = hashlib.sha256()
+    for question, reponse in historique:
+        h.update(f"{normaliser_question(question)}\0{reponse}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+class CacheReponses:
+    """
+    Cache LRU + TTL des réponses, partagé entre les sessions (thread-safe).
+    """
+
+    def __init__(self, capacite=512, ttl=3600, seuil_semantique=0.0):
+        self.capacite = capacite
+        self.ttl = ttl
+        self.seuil_semantique = seuil_semantique
+        self._entrees = OrderedDict()  # (question, empreinte) -> (réponse, expiration, vecteur)
+        self._verrou = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+
+    def __len__(self):
+        return len(self._entrees)
+
+    def _purger(self, maintenant):
+        expirees = [cle for cle, (_, expiration, _) in self._entrees.items() if expiration <= maintenant]
+        for cle in expirees:
+            del self._entrees[cle]
+
+    def obtenir(self, question, historique=None, embeddings=None):
+        """
+        Réponse en cache pour une question et un historique, ou None.
+
+        Args:
+            question (str): Question posée
+            historique (list): Tours précédents [(question, réponse), ...]
+            embeddings: Modèle d'embedding, pour la recherche sémantique (optionnel)
+
+        Returns:
+            tuple: (réponse ou None, vecteur de la question ou None) ; le vecteur
+            calculé pour la recherche sémantique peut être repassé à `ajouter`
+        """
+        cle = (normaliser_question(question), empreinte_historique(historique))
+        maintenant = time.monotonic()
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None and entree[1] > maintenant:
+                self._entrees.move_to_end(cle)
+                self.succes += 1
+                return entree[0], entree[2]
+            self._purger(maintenant)
+            candidats = [(c, e) for c, e in self._entrees.items() if c[1] == cle[1] and e[2] is not None]
+
+        vecteur = None
+        if self.seuil_semantique > 0 and embeddings is not None:
+            vecteur = np.asarray(embeddings.embed_query(question), dtype=np.float32)
+            vecteur /= max(np.linalg.norm(vecteur), 1e-12)
+            if candidats:
+                similarites = np.stack([e[2] for _, e in candidats]) @ vecteur
+                meilleur = int(np.argmax(similarites))
+                if similarites[meilleur] >= self.seuil_semantique:
+                    with self._verrou:
+                        if candidats[meilleur][0] in self._entrees:
+                            self._entrees.move_to_end(candidats[meilleur][0])
+                        self.succes += 1
+                    return candidats[meilleur][1][0], vecteur
+
+        with self._verrou:
+            self.echecs += 1
+        return None, vecteur
+
+    def ajouter(self, question, historique, reponse, vecteur=None):
+        """
+        Enregistre une réponse ; l'entrée la moins récemment utilisée est évincée si le cache est plein.
+        """
+        cle = (normaliser_question(question), empreinte_historique(historique))
+        with self._verrou:
+            self._entrees[cle] = (reponse, time.monotonic() + self.ttl, vecteur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.capacite:
+                self._entrees.popitem(last=False)
@@ -0,0 +1,549 @@
+"""
+Catalogue partagé des films
+
+Le fichier CSV du catalogue n'est lu qu'une seule fois par processus serveur :
+toutes les sessions Streamlit partagent le même objet `Catalogue`.
+
+1. Artefacts : le CSV est converti en un dossier d'artefacts versionné
+   (voir utils/artefacts.py), projeté en mémoire au démarrage (mmap).
+
+2. Colonnes listes : les colonnes `recommendations`, `trailers` et `name_x`
+   sont stockées dans le CSV sous forme de texte ("['a', 'b']"). Elles sont
+   analysées une seule fois à l'ingestion et conservées à plat (valeurs +
+   offsets) ; une ligne mal formée est signalée une fois, à l'ingestion.
+
+3. Version : la version du catalogue est le hash SHA-256 du CSV. Les
+   artefacts ne sont reconstruits que si la date de modification puis le
+   contenu du CSV changent.
+
+4. Index : id_tmdb -> position de ligne, titre -> id_tmdb et cible ->
+   positions de ligne, pour résoudre résultats, recommandations et page
+   d'accueil en O(k) au lieu de filtrer tout le DataFrame. Les films
+   similaires calculés sur le contenu (utils/similaires.py), précalculés
+   hors ligne, complètent les recommandations du CSV.
+
+5. Lecture seule : les sessions reçoivent une copie du DataFrame partagé
+   dont les colonnes Arrow (immuables) partagent les tampons du catalogue ;
+   seuls les codes des colonnes catégorielles sont copiés. Une session ne
+   peut donc pas modifier le catalogue commun.
+   Une session ne mémorise que l'id_tmdb du film sélectionné ; sa fiche
+   (`Catalogue.fiche`) est résolue à l'affichage, avec un petit cache LRU
+   par catalogue, donc toujours à jour de la version courante.
+
+6. Représentation compacte : `cibles` et les colonnes texte très répétées
+   (affiches, titres d'un film présent dans plusieurs cibles) sont codées par
+   dictionnaire (Categorical), de même que les valeurs des colonnes listes
+   (noms des acteurs) ; les colonnes numériques sont réduites au plus petit
+   type suffisant (int32, float32...).
+
+Rapport mémoire (octets par film, CSV brut puis catalogue compact) :
+    python -m utils.catalogue
+"""
+
+import ast
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+CSV_PATH = "data/recommendation_dataset.csv"
+COLONNES_LISTES = ("recommendations", "trailers", "name_x")
+COLONNES_CATEGORIES = ("cibles",)
+# Une colonne texte est codée par dictionnaire si elle a au plus
+# SEUIL_DICTIONNAIRE valeurs distinctes par ligne.
+SEUIL_DICTIONNAIRE = 0.5
+TAILLE_CACHE_FICHES = 256
+
+logger = logging.getLogger(__name__)
+
+
+class ColonneListe:
+    """
+    Colonne liste stockée à plat : la liste de la ligne i est
+    valeurs[offsets[i]:offsets[i + 1]]. Les valeurs répétées (noms des
+    acteurs) sont codées par dictionnaire.
+    """
+
+    def __init__(self, offsets, valeurs):
+        self.offsets = offsets    # np.ndarray d'entiers, longueur n + 1
+        self.valeurs = valeurs    # pa.Array de chaînes
+
+    @classmethod
+    def depuis_listes(cls, listes):
+        offsets = np.zeros(len(listes) + 1, dtype=np.int32)
+        offsets[1:] = np.cumsum([len(liste) for liste in listes])
+        valeurs = pa.array([v for liste in listes for v in liste], type=pa.string())
+        if len(valeurs) and pc.count_distinct(valeurs).as_py() <= SEUIL_DICTIONNAIRE * len(valeurs):
+            valeurs = valeurs.dictionary_encode()
+        return cls(offsets, valeurs)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        debut, fin = int(self.offsets[position]), int(self.offsets[position + 1])
+        return self.valeurs[debut:fin].to_pylist()
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.valeurs.nbytes
+
+
+class Catalogue:
+    """
+    Catalogue des films chargé une fois par processus et partagé entre sessions.
+    """
+
+    def __init__(self, df, version, listes=None, anomalies=None, derives=None, dossier=None):
+        self._df = df
+        self.version = version
+        self.listes = listes or {}        # colonne -> ColonneListe
+        self.anomalies = anomalies or []
+        self.dossier = dossier            # dossier d'artefacts d'origine
+        self._derives = dict(derives or {})
+        self._verrou = threading.RLock()
+        self._fiches = OrderedDict()      # id_tmdb -> fiche, LRU
+        self._sans_similaires_signale = False
+
+    @property
+    def df(self):
+        """
+        Copie du DataFrame partagé : les tableaux Arrow ne sont pas recopiés
+        (ils sont immuables), une modification ne touche que la copie.
+        """
+        return self._df.copy()
+
+    def __len__(self):
+        return len(self._df)
+
+    def _derive(self, nom, construire):
+        """
+        Structure dérivée du catalogue, construite une seule fois par version
+        (même si plusieurs sessions la demandent en même temps), ou déjà
+        chargée depuis les artefacts.
+        """
+        if nom not in self._derives:
+            with self._verrou:
+                if nom not in self._derives:
+                    self._derives[nom] = construire()
+        return self._derives[nom]
+
+    @property
+    def index_ids(self):
+        """
+        id_tmdb distincts triés et position de leur première ligne dans le catalogue.
+        """
+        def construire():
+            ids = self._df["id_tmdb"].to_numpy(dtype=np.int64)
+            ids_tries, positions = np.unique(ids, return_index=True)
+            return ids_tries, positions
+
+        return self._derive("index_ids", construire)
+
+    @property
+    def index_titres(self):
+        """
+        Titre exact -> id_tmdb distincts portant ce titre.
+        """
+        def construire():
+            paires = self._df[["title", "id_tmdb"]].drop_duplicates()
+            return paires.groupby("title", sort=False, observed=True)["id_tmdb"].apply(list).to_dict()
+
+        return self._derive("index_titres", construire)
+
+    def positions(self, ids):
+        """
+        Positions de ligne des id_tmdb donnés (-1 pour un id inconnu).
+        """
+        ids_tries, positions = self.index_ids
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids_tries) == 0:
+            return np.full(len(ids), -1, dtype=np.int64)
+        i = np.minimum(np.searchsorted(ids_tries, ids), len(ids_tries) - 1)
+        return np.where(ids_tries[i] == ids, positions[i], -1)
+
+    def films(self, ids):
+        """
+        Lignes du catalogue pour les id_tmdb donnés, dans l'ordre demandé,
+        sans doublon ni id inconnu.
+        """
+        positions = self.positions(ids)
+        positions = pd.unique(positions[positions >= 0])
+        return self._df.iloc[positions]
+
+    def liste(self, colonne, id_tmdb):
+        """
+        Valeurs d'une colonne liste (`trailers`, `name_x`, ...) pour un film.
+        """
+        position = self.positions([id_tmdb])[0]
+        if position < 0 or colonne not in self.listes:
+            return []
+        return self.listes[colonne][position]
+
+    def fiche(self, id_tmdb):
+        """
+        Fiche d'affichage d'un film (lecture seule), ou None si l'id_tmdb
+        n'est pas dans cette version du catalogue.
+
+        Returns:
+            Mapping: id_tmdb, title, overview, note_moyenne (arrondie), lien_photos,
+            cibles, trailers, name_x
+        """
+        try:
+            id_tmdb = int(id_tmdb)
+        except (TypeError, ValueError):
+            return None
+        with self._verrou:
+            if id_tmdb in self._fiches:
+                self._fiches.move_to_end(id_tmdb)
+                return self._fiches[id_tmdb]
+
+        position = self.positions([id_tmdb])[0]
+        if position < 0:
+            return None
+        ligne = self._df.iloc[position]
+        note = ligne.get("note_moyenne")
+        fiche = MappingProxyType({
+            "id_tmdb": id_tmdb,
+            "title": str(ligne["title"]),
+            "overview": "" if pd.isna(ligne.get("overview")) else str(ligne["overview"]),
+            "note_moyenne": None if pd.isna(note) else round(float(note), 1),
+            "lien_photos": "" if pd.isna(ligne.get("lien_photos")) else str(ligne["lien_photos"]),
+            "cibles": "" if pd.isna(ligne.get("cibles")) else str(ligne["cibles"]),
+            "trailers": tuple(self.listes["trailers"][position]) if "trailers" in self.listes else (),
+            "name_x": tuple(self.listes["name_x"][position]) if "name_x" in self.listes else (),
+        })
+        with self._verrou:
+            self._fiches[id_tmdb] = fiche
+            while len(self._fiches) > TAILLE_CACHE_FICHES:
+                self._fiches.popitem(last=False)
+        return fiche
+
+    def ids_par_titres(self, titres):
+        """
+        id_tmdb des films portant exactement l'un des titres donnés.
+        """
+        index = self.index_titres
+        return [id_tmdb for titre in titres for id_tmdb in index.get(titre, [])]
+
+    @property
+    def index_recommandations(self):
+        """
+        Recommandations du CSV résolues en id_tmdb, à plat : pour le i-ème
+        id de `index_ids`, ids[offsets[i]:offsets[i + 1]].
+        """
+        def construire():
+            ids_tries, positions = self.index_ids
+            colonne = self.listes.get("recommendations")
+            resolus = []
+            for id_tmdb, position in zip(ids_tries.tolist(), positions):
+                titres = colonne[position] if colonne is not None else []
+                resolus.append([i for i in dict.fromkeys(self.ids_par_titres(titres)) if i != id_tmdb])
+            offsets = np.zeros(len(resolus) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(r) for r in resolus])
+            return offsets, np.array([i for r in resolus for i in r], dtype=np.int64)
+
+        return self._derive("index_recommandations", construire)
+
+    def recommandations(self, id_tmdb):
+        """
+        id_tmdb des films recommandés pour un film (liste `recommendations` du CSV).
+        """
+        ids_tries, _ = self.index_ids
+        i = np.searchsorted(ids_tries, id_tmdb)
+        if i >= len(ids_tries) or ids_tries[i] != id_tmdb:
+            return []
+        offsets, ids = self.index_recommandations
+        return ids[offsets[i] : offsets[i + 1]].tolist()
+
+    @property
+    def index_cibles(self):
+        """
+        Positions de ligne par cible, à plat : les films de la cible noms[i]
+        sont aux positions[offsets[i]:offsets[i + 1]]. Cibles dans l'ordre de
+        première apparition ; les lignes sans cible sont ignorées.
+        """
+        def construire():
+            cibles = self._df["cibles"].astype(object).where(self._df["cibles"].notna(), "")
+            codes, noms = pd.factorize(cibles.to_numpy(), sort=False)
+            valides = np.flatnonzero(noms != "")
+            rang = np.full(len(noms), -1, dtype=np.int64)
+            rang[valides] = np.arange(len(valides))
+            codes = rang[codes]
+            garder = np.flatnonzero(codes >= 0)
+            ordre = np.argsort(codes[garder], kind="stable")
+            offsets = np.zeros(len(valides) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum(np.bincount(codes[garder], minlength=len(valides)))
+            return np.asarray(noms[valides], dtype=str), offsets, garder[ordre]
+
+        return self._derive("index_cibles", construire)
+
+    def echantillon_par_cible(self, nb_films, graine, nb_cibles=None):
+        """
+        Tirage sans remise de `nb_films` positions par cible (toutes les
+        positions pour une cible plus petite), reproductible pour une même graine.
+
+        Returns:
+            list: [(cible, positions)], dans l'ordre de `index_cibles`
+        """
+        noms, offsets, positions = self.index_cibles
+        rng = np.random.default_rng(graine)
+        tirage = []
+        for i, cible in enumerate(noms[:nb_cibles].tolist()):
+            bloc = positions[offsets[i] : offsets[i + 1]]
+            tirage.append((cible, rng.choice(bloc, size=min(nb_films, len(bloc)), replace=False)))
+        return tirage
+
+    def films_par_cible(self, nb_films, graine, nb_cibles=None):
+        """
+        Films tirés au hasard pour chaque cible (voir echantillon_par_cible).
+
+        Returns:
+            dict: cible -> DataFrame des films tirés
+        """
+        return {
+            cible: self._df.iloc[positions]
+            for cible, positions in self.echantillon_par_cible(nb_films, graine, nb_cibles)
+        }
+
+    def meilleurs_par_cible(self, nb_films, filtre=None):
+        """
+        Films les mieux notés de chaque cible (id_tmdb distincts, note
+        décroissante, ordre des lignes à note égale), au plus `nb_films` par
+        cible parmi ceux que retient `filtre` (tableau d'id_tmdb -> masque).
+
+        Returns:
+            list: [(cible, np.ndarray d'id_tmdb)], dans l'ordre de `index_cibles`
+        """
+        noms, offsets, positions = self.index_cibles
+        ids_lignes = self._df["id_tmdb"].to_numpy(dtype=np.int64)
+        notes = (self._df["note_moyenne"].to_numpy(dtype=np.float32, na_value=np.nan)
+                 if "note_moyenne" in self._df else None)
+        meilleurs = []
+        for i, cible in enumerate(noms.tolist()):
+            bloc = np.asarray(positions[offsets[i] : offsets[i + 1]])
+            if notes is not None:
+                bloc = bloc[np.argsort(-np.nan_to_num(notes[bloc], nan=-1.0), kind="stable")]
+            ids = pd.unique(ids_lignes[bloc])
+            if filtre is not None:
+                ids = ids[filtre(ids)]
+            meilleurs.append((cible, ids[:nb_films]))
+        return meilleurs
+
+    @property
+    def index_similaires(self):
+        """
+        Voisins de chaque film calculés sur le contenu : pour le i-ème id de
+        `index_ids`, positions (dans index_ids) de ses voisins, -1 en fin de ligne.
+
+        Calcul en O(N²) : réservé à la construction hors ligne des artefacts
+        (python -m utils.artefacts). Pendant une requête, voir `similaires`.
+        """
+        from utils.similaires import construire_voisins
+
+        return self._derive("index_similaires", lambda: construire_voisins(self)[0])
+
+    def similaires(self, id_tmdb, k=None):
+        """
+        id_tmdb des films les plus proches d'un film par le contenu (synopsis,
+        distribution, cibles, note), du plus proche au plus éloigné.
+
+        Seulement s'ils ont été précalculés hors ligne (artefacts) : sinon
+        liste vide, sans lancer le calcul (avertissement une fois par version).
+        """
+        if "index_similaires" not in self._derives:
+            if not self._sans_similaires_signale:
+                self._sans_similaires_signale = True
+                logger.warning("Catalogue %s : films similaires non précalculés "
+                               "(python -m utils.artefacts)", self.version)
+            return []
+        ids_tries, _ = self.index_ids
+        i = np.searchsorted(ids_tries, id_tmdb)
+        if i >= len(ids_tries) or ids_tries[i] != id_tmdb:
+            return []
+        voisins = self.index_similaires[i, :k]
+        return ids_tries[voisins[voisins >= 0]].tolist()
+
+    def recommandations_ou_similaires(self, id_tmdb):
+        """
+        Recommandations du CSV d'un film ; si sa liste est vide, films
+        similaires précalculés sur le contenu (page 3).
+        """
+        return self.recommandations(id_tmdb) or self.similaires(id_tmdb)
+
+    @property
+    def index_recherche(self):
+        """
+        Index de recherche floue sur les titres (voir utils/recherche.py).
+        """
+        from utils.recherche import IndexRecherche
+
+        return self._derive(
+            "index_recherche",
+            lambda: IndexRecherche.construire(self._df["title"], self._df["id_tmdb"]),
+        )
+
+
+def signature_fichier(path):
+    """
+    Signature bon marché d'un fichier : chemin absolu, date de modification et taille.
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def hash_fichier(path, taille_bloc=1 << 20):
+    """
+    Calcule le hash SHA-256 d'un fichier en le lisant par blocs.
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b""):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+def lire_csv(csv_path=CSV_PATH):
+    """
+    Lit le CSV source du catalogue.
+    """
+    return pd.read_csv(csv_path)
+
+
+def parser_liste(valeur):
+    """
+    Convertit une cellule texte "['a', 'b']" en liste de chaînes.
+
+    Raises:
+        ValueError: Si la cellule n'est pas une liste littérale valide
+    """
+    if valeur is None or (isinstance(valeur, float) and pd.isna(valeur)):
+        return []
+    if isinstance(valeur, (list, tuple)):
+        return [str(v) for v in valeur]
+    try:
+        liste = ast.literal_eval(valeur)
+    except (ValueError, SyntaxError) as e:
+        raise ValueError(f"liste illisible : {str(valeur)[:60]!r}") from e
+    if not isinstance(liste, (list, tuple)):
+        raise ValueError(f"liste attendue, obtenu {type(liste).__name__}")
+    return [str(v) for v in liste]
+
+
+def preparer_catalogue(df):
+    """
+    Étape d'ingestion : analyse une fois les colonnes listes du CSV et
+    remplace les textes manquants par des chaînes vides.
+
+    Les cellules listes mal formées sont remplacées par une liste vide.
+
+    Returns:
+        tuple: (DataFrame des colonnes scalaires, {colonne: ColonneListe}, anomalies)
+    """
+    anomalies = []
+    listes = {}
+    for colonne in COLONNES_LISTES:
+        if colonne not in df.columns:
+            continue
+        valeurs = []
+        for position, valeur in enumerate(df[colonne].tolist()):
+            try:
+                valeurs.append(parser_liste(valeur))
+            except ValueError as e:
+                anomalies.append((position, colonne, str(e)))
+                valeurs.append([])
+        listes[colonne] = ColonneListe.depuis_listes(valeurs)
+
+    for position, colonne, erreur in anomalies:
+        logger.warning("Catalogue : ligne %s, colonne '%s' : %s", position, colonne, erreur)
+
+    df = df.drop(columns=list(listes))
+    textes = [colonne for colonne in df.columns if _est_texte(df[colonne])]
+    df[textes] = df[textes].fillna("")
+    return compacter(df), listes, anomalies
+
+
+def _est_texte(serie):
+    """
+    Colonne de chaînes : dtype object (pandas 2) ou str (pandas 3).
+    """
+    return pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+
+
+def compacter(df):
+    """
+    Réduit l'empreinte mémoire des colonnes scalaires : entiers et flottants
+    au plus petit type suffisant, `cibles` et textes répétés en Categorical.
+    """
+    df = df.copy()
+    for colonne in df.columns:
+        serie = df[colonne]
+        if pd.api.types.is_integer_dtype(serie):
+            df[colonne] = pd.to_numeric(serie, downcast="integer")
+        elif pd.api.types.is_float_dtype(serie):
+            df[colonne] = serie.astype(np.float32)
+        elif _est_texte(serie) and (
+            colonne in COLONNES_CATEGORIES or serie.nunique() <= SEUIL_DICTIONNAIRE * len(serie)
+        ):
+            df[colonne] = serie.astype("category")
+    return df
+
+
+def memoire_catalogue(df, listes=None):
+    """
+    Octets occupés par chaque colonne (chaînes Python comprises).
+
+    Returns:
+        dict: colonne -> octets
+    """
+    octets = df.memory_usage(index=False, deep=True).to_dict()
+    for colonne, liste in (listes or {}).items():
+        octets[colonne] = liste.nbytes
+    return octets
+
+
+def get_catalogue(csv_path=CSV_PATH):
+    """
+    Retourne le catalogue partagé, rechargé uniquement si le CSV a changé.
+    Le catalogue du CSV par défaut appartient au registre des ressources du
+    processus (utils/ressources.py) ; un autre CSV est chargé sans cache.
+
+    Raises:
+        FileNotFoundError: Si le CSV du catalogue est introuvable
+    """
+    if csv_path == CSV_PATH:
+        from utils.ressources import get_registre
+
+        return get_registre().obtenir("catalogue")
+    from utils.artefacts import charger_ou_construire
+
+    return charger_ou_construire(csv_path)
+
+
+def afficher_rapport_memoire(csv_path=CSV_PATH):
+    """
+    Compare les octets par film du CSV chargé tel quel et du catalogue compact.
+    """
+    brut = lire_csv(csv_path)
+    catalogue = get_catalogue(csv_path)
+    avant = memoire_catalogue(brut)
+    apres = memoire_catalogue(catalogue._df, catalogue.listes)
+    n_avant, n_apres = max(len(brut), 1), max(len(catalogue), 1)
+
+    print(f"{len(brut)} lignes — octets par film")
+    print(f"{'colonne':<16} {'CSV brut':>10} {'compact':>10}  type")
+    for colonne in avant:
+        type_ = catalogue.listes[colonne].valeurs.type if colonne in catalogue.listes else catalogue._df[colonne].dtype
+        print(f"{colonne:<16} {avant[colonne] / n_avant:>10.1f} {apres.get(colonne, 0) / n_apres:>10.1f}  {type_}")
+    print(f"{'total':<16} {sum(avant.values()) / n_avant:>10.1f} {sum(apres.values()) / n_apres:>10.1f}")
+
+
+if __name__ == "__main__":
+    afficher_rapport_memoire()
@@ -1,69 +1,112 @@
-from langchain_groq import ChatGroq
 # Import des bibliothèques nécessaires
-from langchain_groq import ChatGroq
-from langchain_openai import OpenAIEmbeddings
-from langchain.memory import ConversationBufferMemory
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.prompts import PromptTemplate
 from langchain.chains.conversational_retrieval.base import ConversationalRetrievalChain
 from dotenv import load_dotenv
-import streamlit as st
-import os
-from utils.vectorestore import load_vectorstore  # Simplification de l'import
+import time
+from utils.config import MEMOIRE_TOKENS, MEMOIRE_TOURS, CONTEXTE_TOKENS_DOCUMENT, IVF_SONDES
+from utils.ressources import get_registre
+from utils.memoire import MemoireConversation
+from utils.contexte import ConstructeurContexte, RetrieverContexte
 
 # Chargement des variables d'environnement (clés API, etc.)
 load_dotenv()
 
 # Initialisation du modèle d'embedding
-@st.cache_resource  # Cache la ressource pour éviter de la recharger à chaque requête
 def get_embeddings():
     """
-    Initialise le modèle d'embedding d'OpenAI.
+    Backend d'embedding configuré (MOVIEMIND_EMBEDDINGS, voir utils/embeddings.py),
+    partagé par tout le processus (voir utils/ressources.py).
     
     Les embeddings sont des représentations vectorielles du texte qui permettent
     de mesurer la similarité sémantique entre différents textes.
     
     Returns:
-        OpenAIEmbeddings: Instance du modèle d'embedding configuré
+        Embeddings: Backend "openai" (text-embedding-3-small) ou "local" (TF haché, hors ligne)
     """
-    openai_api_key = st.secrets["OPENAI_API_KEY"]
-    
-    if not openai_api_key:
-        raise ValueError("OPENAI_API_KEY non trouvée dans les variables d'environnement")
-    return OpenAIEmbeddings(
-        api_key=openai_api_key,
-        model="text-embedding-3-small"  # Modèle plus léger et économique
-    )
+    return get_registre().obtenir("embeddings")
 
 # Initialisation du modèle de langage (LLM)
-@st.cache_resource
 def get_llm():
     """
-    Initialise le modèle de langage Grok.
+    Modèle de langage servi par Groq, partagé par tout le processus.
     
-    Grok est un modèle de langage développé par xAI,
-    offrant des performances de haut niveau pour la génération de texte.
+    Le modèle Llama 3.3 70B est interrogé via l'API Groq, en mode streaming :
+    les tokens sont transmis au fur et à mesure de leur génération. Le client
+    HTTP (connexions keep-alive) est lui aussi partagé.
     
     Returns:
-        ChatOpenAI: Instance du modèle de langage configuré
+        ChatGroq: Instance du modèle de langage configuré
+    """
+    return get_registre().obtenir("llm")
+
+# Affichage progressif de la réponse
+class AffichageFlux(BaseCallbackHandler):
     """
-    gorq_api_key = st.secrets["GROQ_API_KEY"]
-    if not groq_api_key:
-        raise ValueError("GROQ_API_KEY non trouvée dans les variables d'environnement")
+    Callback LangChain qui affiche la réponse pendant sa génération.
     
-    return ChatOpenAI(
-        api_key=groq_api_key,
-        temperature=0.7,  # Contrôle la créativité des réponses (0=conservateur, 1=créatif)
-         model="llama-3.3-70b-versatile",
-        
-    )
+    1. Dès la fin de la recherche, les titres des films retrouvés sont affichés.
+    2. Ensuite, chaque token du LLM est ajouté à la réponse affichée. Les tokens
+       émis avant la recherche (reformulation de la question à partir de
+       l'historique) ne sont pas affichés.
+    
+    L'affichage est rafraîchi au plus toutes les `intervalle` secondes pour ne
+    pas renvoyer tout le texte au navigateur à chaque token.
+    """
+
+    def __init__(self, zone_films, zone_reponse, intervalle=0.05):
+        self.zone_films = zone_films
+        self.zone_reponse = zone_reponse
+        self.intervalle = intervalle
+        self.titres = []
+        self.texte = ""
+        self._generation = False
+        self._dernier_affichage = 0.0
+
+    def on_retriever_end(self, documents, **kwargs):
+        self.titres = [doc.metadata.get("title") for doc in documents if doc.metadata.get("title")]
+        if self.titres:
+            self.zone_films.markdown("🎞️ **Films trouvés :** " + ", ".join(self.titres))
+        self._generation = True
+
+    def on_llm_new_token(self, token, **kwargs):
+        if not self._generation:
+            return
+        self.texte += token
+        maintenant = time.monotonic()
+        if maintenant - self._dernier_affichage >= self.intervalle:
+            self.zone_reponse.markdown(self.texte + "▌")
+            self._dernier_affichage = maintenant
 
 # Chargement de la base de données vectorielle
-@st.cache_resource
 def get_vectorstore():
     """
-    Charge la base de données vectorielle FAISS
+    Index vectoriel NumPy (voir utils/index_vectoriel.py), partagé par tout le processus.
     """
-    return load_vectorstore()
+    return get_registre().obtenir("vectorstore")
+
+# Chaîne de conversation
+def get_chaine():
+    """
+    Chaîne de conversation partagée : sans état, l'historique de chaque session
+    lui est passé à l'appel. None si l'index vectoriel n'existe pas.
+    """
+    return get_registre().obtenir("chaine")
+
+# Cache des réponses, partagé par toutes les sessions du processus
+def get_cache_reponses():
+    """
+    Cache LRU + TTL des réponses de l'assistant (voir utils/cache_reponses.py),
+    partagé par tout le processus (voir utils/ressources.py).
+    """
+    return get_registre().obtenir("cache_reponses")
+
+# Mémoire de conversation d'une session
+def nouvelle_memoire():
+    """
+    Mémoire bornée (fenêtre glissante + résumé, voir utils/memoire.py) d'une session.
+    """
+    return MemoireConversation(budget_tokens=MEMOIRE_TOKENS, nb_tours_max=MEMOIRE_TOURS)
 
 # Création de la chaîne de conversation
 def get_conversation_chain(vectorstore):
@@ -71,9 +114,11 @@ def get_conversation_chain(vectorstore):
     Configure la chaîne de conversation qui combine recherche et dialogue.
     
     Cette fonction:
-    1. Initialise la mémoire pour garder le contexte de la conversation
-    2. Crée un template de prompt qui guide le comportement de l'assistant
-    3. Configure la chaîne de conversation qui utilise le LLM et la recherche
+    1. Crée un template de prompt qui guide le comportement de l'assistant
+    2. Configure la chaîne de conversation qui utilise le LLM et la recherche
+    
+    La chaîne n'a pas de mémoire propre : l'historique (borné, voir
+    utils/memoire.py) lui est passé à chaque appel dans `chat_history`.
     
     Args:
         vectorstore: Base de données vectorielle pour la recherche
@@ -81,12 +126,6 @@ def get_conversation_chain(vectorstore):
     Returns:
         ConversationalRetrievalChain: Chaîne de conversation configurée
     """
-    # Initialisation de la mémoire pour le contexte
-    memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=True
-    )
-    
     # Création du template de prompt
     template = """Tu es un assistant de recommandation de films amical,
                  compétent et créatif. Ta mission est de fournir des recommandations de films détaillées,
@@ -136,8 +175,18 @@ Assistant : [Ta réponse ici]"""
     # Configuration de la chaîne de conversation
     conversation_chain = ConversationalRetrievalChain.from_llm(
         llm=get_llm(),
-        retriever=vectorstore.as_retriever(search_kwargs={"k": 3}),  # Récupère les 3 documents les plus pertinents
-        memory=memory,
+        # Récupère les 3 films les plus pertinents (BM25 + vecteurs, filtrés par cible et note),
+        # dédoublonnés et compactés avant d'être insérés dans le prompt ; un film
+        # retrouvé seul est complété par ses voisins précalculés ; si l'index a
+        # un IVF, seuls les groupes sondés sont comparés à la question
+        retriever=RetrieverContexte(
+            retriever=vectorstore.as_retriever(search_kwargs={"k": 6, "nb_sondes": IVF_SONDES}),
+            constructeur=ConstructeurContexte(
+                nb_documents=3,
+                tokens_par_document=CONTEXTE_TOKENS_DOCUMENT,
+                voisins=vectorstore.documents_similaires if vectorstore.graphe is not None else None,
+            ),
+        ),
         combine_docs_chain_kwargs={"prompt": prompt}
     )
     return conversation_chain
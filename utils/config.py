@@ -0,0 +1,42 @@
+"""
+Configuration de l'application
+
+Les réglages sont lus dans les variables d'environnement (ou le fichier .env),
+avec des valeurs par défaut raisonnables :
+
+- MOVIEMIND_EMBEDDINGS : backend d'embedding, "openai" ou "local"
+- MOVIEMIND_TAILLE_LOT_EMBEDDINGS : nombre de documents par appel au modèle d'embedding
+- MOVIEMIND_IVF_LISTES : nombre de groupes de l'index vectoriel approximatif (IVF)
+  construit avec l'index (0 : recherche exacte seulement)
+- MOVIEMIND_IVF_SONDES : nombre de groupes IVF sondés par question (si l'index en a)
+- MOVIEMIND_CACHE_REPONSES_TAILLE : nombre de réponses de l'assistant gardées en cache
+- MOVIEMIND_CACHE_REPONSES_TTL : durée de vie d'une réponse en cache, en secondes
+- MOVIEMIND_CACHE_REPONSES_SEUIL : similarité cosinus au-delà de laquelle une question
+  proche réutilise une réponse en cache (0 : recherche sémantique désactivée)
+- MOVIEMIND_MEMOIRE_TOKENS : budget de tokens de l'historique transmis au LLM
+- MOVIEMIND_MEMOIRE_TOURS : nombre de tours récents transmis tels quels
+- MOVIEMIND_CONTEXTE_TOKENS_DOCUMENT : budget de tokens de chaque film inséré dans le prompt
+- MOVIEMIND_BASE_SQLITE : base SQLite de l'application ("Ma Liste" des utilisateurs)
+- MOVIEMIND_CATALOGUE_BACKEND : "memoire" (catalogue chargé en mémoire) ou "sqlite"
+  (toutes les pages lisent une base indexée construite à partir du CSV, avec
+  recherche plein texte FTS5 ; les artefacts du catalogue ne sont pas chargés)
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDINGS_BACKEND = os.getenv("MOVIEMIND_EMBEDDINGS", "openai")
+TAILLE_LOT_EMBEDDINGS = int(os.getenv("MOVIEMIND_TAILLE_LOT_EMBEDDINGS", "256"))
+IVF_LISTES = int(os.getenv("MOVIEMIND_IVF_LISTES", "0"))
+IVF_SONDES = int(os.getenv("MOVIEMIND_IVF_SONDES", "8"))
+CACHE_REPONSES_TAILLE = int(os.getenv("MOVIEMIND_CACHE_REPONSES_TAILLE", "512"))
+CACHE_REPONSES_TTL = float(os.getenv("MOVIEMIND_CACHE_REPONSES_TTL", "3600"))
+CACHE_REPONSES_SEUIL = float(os.getenv("MOVIEMIND_CACHE_REPONSES_SEUIL", "0"))
+MEMOIRE_TOKENS = int(os.getenv("MOVIEMIND_MEMOIRE_TOKENS", "1500"))
+MEMOIRE_TOURS = int(os.getenv("MOVIEMIND_MEMOIRE_TOURS", "6"))
+CONTEXTE_TOKENS_DOCUMENT = int(os.getenv("MOVIEMIND_CONTEXTE_TOKENS_DOCUMENT", "150"))
+BASE_SQLITE = os.getenv("MOVIEMIND_BASE_SQLITE", "data/moviemind.sqlite3")
+CATALOGUE_BACKEND = os.getenv("MOVIEMIND_CATALOGUE_BACKEND", "memoire")
@@ -0,0 +1,143 @@
+"""
+Construction du contexte envoyé au LLM
+
+Les documents de l'index vectoriel contiennent le synopsis complet et toute
+la liste de recommandations du CSV ; les insérer tels quels dans `{context}`
+alourdit chaque prompt. Avant d'être transmis à la chaîne, les documents
+retrouvés sont :
+
+1. Dédoublonnés : un même film (id_tmdb) présent sur plusieurs lignes du
+   catalogue (une par cible) n'apparaît qu'une fois.
+
+2. Réécrits de façon compacte à partir des métadonnées : titre, note,
+   public, synopsis.
+
+3. Bornés : chaque document respecte un budget de tokens ; le synopsis est
+   coupé à la dernière phrase (ou au dernier mot) qui tient dans le budget.
+
+4. Allégés : la liste de recommandations n'est gardée (et raccourcie) que si
+   la question porte sur des films similaires.
+
+5. Élargis : si la recherche ne ramène qu'un seul film, les films voisins
+   précalculés (utils/voisins.py) complètent le contexte.
+
+Chaque document garde dans ses métadonnées sa taille avant et après
+(`tokens_origine`, `tokens`) : `MesurePrompt` en déduit les tokens économisés.
+"""
+
+import re
+from typing import Any, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from utils.memoire import CARACTERES_PAR_TOKEN, compter_tokens
+
+MOTIFS_RECOMMANDATIONS = re.compile(
+    r"recommand|similaire|ressembl|semblable|comme\s|même\s(genre|style)|dans le genre|du genre de|pareil",
+    re.IGNORECASE,
+)
+
+
+def tronquer(texte, nb_tokens):
+    """
+    Coupe un texte pour qu'il tienne dans `nb_tokens`, en fin de phrase ou de mot.
+    """
+    limite = nb_tokens * CARACTERES_PAR_TOKEN
+    if len(texte) <= limite:
+        return texte
+    coupe = texte[:limite]
+    fin_phrase = max(coupe.rfind(". "), coupe.rfind("! "), coupe.rfind("? "))
+    if fin_phrase >= limite // 2:
+        return coupe[: fin_phrase + 1]
+    return coupe[: coupe.rfind(" ")].rstrip(" ,;:") + "…" if " " in coupe else coupe
+
+
+def recommandations_document(document):
+    """
+    Titres recommandés d'un document (ligne `systeme de recommendation` du contenu).
+    """
+    trouve = re.search(r"systeme de recommendation:\s*\[(.*?)\]", document.page_content)
+    return re.findall(r"'([^']+)'|\"([^\"]+)\"", trouve.group(1)) if trouve else []
+
+
+class ConstructeurContexte:
+    """
+    Dédoublonne, réécrit et borne les documents retrouvés avant leur insertion dans le prompt.
+    """
+
+    def __init__(self, nb_documents=3, tokens_par_document=150, nb_recommandations=5, voisins=None):
+        self.nb_documents = nb_documents
+        self.tokens_par_document = tokens_par_document
+        self.nb_recommandations = nb_recommandations
+        self.voisins = voisins    # id_tmdb, k -> documents des films proches (optionnel)
+
+    def besoin_recommandations(self, question):
+        return bool(MOTIFS_RECOMMANDATIONS.search(question or ""))
+
+    def compacter(self, document, avec_recommandations=False):
+        """
+        Document réécrit à partir de ses métadonnées, dans le budget de tokens.
+        """
+        meta = document.metadata
+        lignes = [f"Titre : {meta.get('title')}"]
+        try:
+            note = float(meta.get("note_moyenne"))
+        except (TypeError, ValueError):
+            note = None
+        if note is not None and note == note:
+            lignes.append(f"Note : {note:.1f}/10")
+        if isinstance(meta.get("cibles"), str) and meta["cibles"]:
+            lignes.append(f"Public : {meta['cibles']}")
+        if avec_recommandations:
+            titres = [a or b for a, b in recommandations_document(document)][: self.nb_recommandations]
+            if titres:
+                lignes.append("Films similaires : " + ", ".join(titres))
+
+        entete = "\n".join(lignes)
+        synopsis = meta.get("Description")
+        if isinstance(synopsis, str) and synopsis:
+            reste = self.tokens_par_document - compter_tokens(entete) - 3
+            if reste > 0:
+                entete += "\nSynopsis : " + tronquer(synopsis, reste)
+
+        metadonnees = dict(meta, tokens_origine=compter_tokens(document.page_content), tokens=compter_tokens(entete))
+        return Document(page_content=entete, metadata=metadonnees)
+
+    def construire(self, documents, question=None):
+        """
+        Returns:
+            list: Au plus `nb_documents` documents compacts, un par film
+        """
+        avec_recommandations = self.besoin_recommandations(question)
+        vus = set()
+        resultat = []
+        if self.voisins is not None:
+            films = {d.metadata["id_tmdb"] for d in documents if "id_tmdb" in d.metadata}
+            if len(films) == 1:
+                documents = list(documents) + self.voisins(films.pop(), self.nb_documents - 1)
+        for document in documents:
+            cle = document.metadata.get("id_tmdb", document.page_content)
+            if cle in vus:
+                continue
+            vus.add(cle)
+            resultat.append(self.compacter(document, avec_recommandations))
+            if len(resultat) == self.nb_documents:
+                break
+        return resultat
+
+
+class RetrieverContexte(BaseRetriever):
+    """
+    Retriever LangChain qui applique un ConstructeurContexte aux documents d'un autre retriever.
+    """
+
+    retriever: Any
+    constructeur: Any
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return self.constructeur.construire(documents, query)
@@ -0,0 +1,209 @@
+"""
+Backends d'embedding interchangeables
+
+Chaque backend expose l'interface LangChain `Embeddings` (embed_documents,
+embed_query) ainsi que :
+
+- `nom` : identifiant du backend ("openai", "local")
+- `modele` : nom exact du modèle, enregistré dans l'index vectoriel
+- `cache` : faut-il mettre les embeddings en cache disque (utils/cache_embeddings.py)
+
+Backends disponibles :
+
+1. "openai" : OpenAIEmbeddings (appel réseau, nécessite OPENAI_API_KEY).
+   Les embeddings des dernières questions sont mémorisés : la recherche
+   sémantique du cache des réponses puis la recherche dans l'index ne
+   paient qu'un appel pour la même question.
+
+2. "local" : TF-IDF haché (HashingVectorizer de scikit-learn, unigrammes et
+   bigrammes, tf sous-linéaire, IDF lissée, normalisation L2). L'IDF est
+   calculée en flux sur le corpus au moment de la construction de l'index
+   (`ajuster`) et enregistrée à côté de lui (idf_local.npy) : les requêtes
+   sont pondérées avec la même IDF. Aucun réseau ni GPU : des milliers
+   d'embeddings par seconde sur CPU, pour construire ou tester l'index
+   sans accès à l'API.
+
+   Limites : c'est un modèle lexical. Il ne rapproche que des textes qui
+   partagent des mots (aucun synonyme, aucune traduction, aucun sens), et
+   le hachage sur `dimension` colonnes confond des termes différents
+   (collisions d'autant plus fréquentes que le vocabulaire est grand). Le
+   rappel de l'assistant est nettement inférieur à celui d'OpenAI : ce
+   backend sert au développement, aux tests et au fonctionnement hors ligne.
+
+Le backend est choisi par MOVIEMIND_EMBEDDINGS (voir utils/config.py).
+L'index vectoriel enregistre le backend et le modèle qui l'ont construit :
+un index incompatible avec la configuration est refusé au chargement.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.config import EMBEDDINGS_BACKEND
+
+MODELE_OPENAI = "text-embedding-3-small"
+# 2048 colonnes : moins de collisions qu'en 512, pour une matrice de taille
+# comparable à celle d'OpenAI (1536 dimensions)
+DIMENSION_LOCALE = 2048
+FICHIER_IDF = "idf_local.npy"
+
+
+class EmbeddingsOpenAI(Embeddings):
+    """
+    Embeddings OpenAI (text-embedding-3-small).
+    """
+
+    nom = "openai"
+    cache = True
+
+    def __init__(self, api_key=None, modele=MODELE_OPENAI, http_client=None, taille_memo=256):
+        from langchain_openai import OpenAIEmbeddings
+
+        self.modele = modele
+        self.taille_memo = taille_memo
+        self._memo = OrderedDict()  # question -> vecteur, LRU
+        self._verrou = threading.Lock()
+        options = {"model": modele, "http_client": http_client}
+        if api_key:
+            options["api_key"] = api_key
+        self._client = OpenAIEmbeddings(**options)
+
+    def embed_documents(self, texts):
+        return np.asarray(self._client.embed_documents(texts), dtype=np.float32)
+
+    def embed_query(self, text):
+        """
+        Embedding d'une question, mémorisé pour les `taille_memo` dernières
+        (une copie est renvoyée : l'appelant peut la normaliser sur place).
+        """
+        with self._verrou:
+            vecteur = self._memo.get(text)
+            if vecteur is not None:
+                self._memo.move_to_end(text)
+                return vecteur.copy()
+        vecteur = np.asarray(self._client.embed_query(text), dtype=np.float32)
+        with self._verrou:
+            self._memo[text] = vecteur
+            while len(self._memo) > self.taille_memo:
+                self._memo.popitem(last=False)
+        return vecteur.copy()
+
+
+class EmbeddingsLocaux(Embeddings):
+    """
+    Embeddings locaux : TF-IDF haché, calculé en processus sans appel réseau.
+    Sans IDF (`ajuster` ou `charger_idf` non appelés), TF sous-linéaire seul.
+    """
+
+    nom = "local"
+    cache = False
+
+    def __init__(self, dimension=DIMENSION_LOCALE, idf=None):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.dimension = dimension
+        self.idf = None
+        self.modele = f"hashing-tf-{dimension}-v2"
+        self._vectoriseur = HashingVectorizer(
+            n_features=dimension,
+            ngram_range=(1, 2),
+            strip_accents="unicode",
+            lowercase=True,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float32,
+        )
+        if idf is not None:
+            self._fixer_idf(idf)
+
+    def _fixer_idf(self, idf):
+        self.idf = np.asarray(idf, dtype=np.float32)
+        # Le modèle enregistré dans l'index identifie aussi l'IDF utilisée
+        empreinte = hashlib.sha256(self.idf.tobytes()).hexdigest()[:12]
+        self.modele = f"hashing-tfidf-{self.dimension}-v2-{empreinte}"
+
+    def ajuster(self, textes, taille_lot=1000):
+        """
+        Calcule l'IDF lissée, log((1 + n) / (1 + df)) + 1, sur un corpus lu en flux.
+        """
+        textes = iter(textes)
+        frequences = np.zeros(self.dimension, dtype=np.int64)
+        nb_documents = 0
+        while lot := list(islice(textes, taille_lot)):
+            matrice = self._vectoriseur.transform(lot)
+            matrice.sum_duplicates()
+            frequences += matrice.getnnz(axis=0)
+            nb_documents += len(lot)
+        self._fixer_idf(np.log((1 + nb_documents) / (1 + frequences)) + 1)
+        return self
+
+    def sauvegarder_idf(self, path):
+        if self.idf is not None:
+            np.save(os.path.join(path, FICHIER_IDF), self.idf)
+
+    def charger_idf(self, path):
+        """
+        Reprend l'IDF enregistrée avec un index vectoriel (si elle existe).
+        """
+        chemin = os.path.join(path, FICHIER_IDF)
+        if os.path.exists(chemin):
+            self._fixer_idf(np.load(chemin))
+        return self
+
+    def embed_documents(self, texts):
+        matrice = self._vectoriseur.transform(texts)
+        matrice.data = np.log1p(matrice.data)
+        if self.idf is not None:
+            matrice.data *= self.idf[matrice.indices]
+        vecteurs = matrice.toarray()
+        normes = np.linalg.norm(vecteurs, axis=1, keepdims=True)
+        return vecteurs / np.maximum(normes, 1e-12)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+BACKENDS = {
+    EmbeddingsOpenAI.nom: EmbeddingsOpenAI,
+    EmbeddingsLocaux.nom: EmbeddingsLocaux,
+}
+
+
+def creer_embeddings(backend=None, **options):
+    """
+    Instancie le backend d'embedding configuré.
+
+    Raises:
+        ValueError: Si le backend est inconnu
+    """
+    backend = backend or EMBEDDINGS_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend d'embedding inconnu : '{backend}' (disponibles : {', '.join(BACKENDS)})")
+    return BACKENDS[backend](**options)
+
+
+def verifier_compatibilite(description, embeddings):
+    """
+    Vérifie qu'un index a été construit avec le même backend et le même modèle
+    que ceux utilisés pour les requêtes.
+
+    Args:
+        description (dict): Contenu de index.json
+        embeddings: Backend utilisé pour les requêtes
+
+    Raises:
+        ValueError: En cas d'incompatibilité
+    """
+    attendu = (getattr(embeddings, "nom", None), getattr(embeddings, "modele", None))
+    construit = (description.get("backend"), description.get("modele"))
+    if construit != attendu:
+        raise ValueError(
+            f"Index vectoriel construit avec {construit[0]}/{construit[1]}, "
+            f"incompatible avec le backend configuré {attendu[0]}/{attendu[1]}. "
+            "Reconstruisez-le avec `python -m utils.artefacts`."
+        )
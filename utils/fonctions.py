@@ -1,124 +1,253 @@
 import streamlit as st
-import pandas as pd
 import os
-from fuzzywuzzy import process
-import sqlite3
+from contextlib import ExitStack, contextmanager
 
-import streamlit as st
+# Les modules lourds (pandas, catalogue, LangChain, clients LLM, sqlite3) ne
+# sont importés qu'à leur premier usage : la page de connexion, qui n'utilise
+# que load_css, s'affiche sans les charger.
+
+def get_catalogue():
+    """
+    Catalogue partagé, importé au premier usage : en mémoire (utils/catalogue.py)
+    ou, avec MOVIEMIND_CATALOGUE_BACKEND=sqlite, lu dans la base SQLite
+    (utils/base_sqlite.py) sans charger les artefacts. Même interface pour
+    les pages : fiche, films_par_cible, recommandations_ou_similaires, films.
+    """
+    from utils.ressources import catalogue_actif
+
+    return catalogue_actif()
+
+def _echapper(colonne):
+    """
+    Échappement HTML d'une colonne de texte, en une passe par caractère spécial.
+    """
+    colonne = colonne.astype(object).where(colonne.notna(), "").astype(str)
+    for caractere, entite in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;")):
+        colonne = colonne.str.replace(caractere, entite, regex=False)
+    return colonne
+
+
+def html_grille(df_films, nb_colonnes=5, gras=False):
+    """
+    HTML d'une grille de films (affiche + titre), construit en une fois
+    à partir des seules colonnes 'lien_photos' et 'title'.
+
+    Returns:
+        str: Un bloc <div class="grille-films"> contenant une carte par film
+    """
+    if df_films.empty:
+        return ""
+    titres = _echapper(df_films["title"])
+    liens = _echapper(df_films["lien_photos"])
+    legende = ("<p><strong>" + titres + "</strong></p>") if gras else ("<p>" + titres + "</p>")
+    images = ('<img src="' + liens + '" alt="' + titres + '" loading="lazy" />').where(
+        liens != "", '<div class="image-indisponible">Image indisponible.</div>'
+    )
+    cartes = '<div class="carte-film">' + images + legende + "</div>"
+    return (
+        f'<div class="grille-films" style="grid-template-columns: repeat({nb_colonnes}, 1fr);">'
+        + "".join(cartes.tolist())
+        + "</div>"
+    )
+
+
+def afficher_grille(df_films, nb_colonnes=5, par_page=None, key="grille", gras=False):
+    """
+    Affiche une grille de films en un seul élément Streamlit.
+
+    Avec `par_page`, seule la page courante est envoyée au navigateur
+    (navigation précédent / suivant) : la taille du message reste bornée
+    quel que soit le nombre de films.
+
+    Returns:
+        pd.DataFrame: Films effectivement affichés
+    """
+    if par_page:
+        debut, fin = paginer(len(df_films), par_page=par_page, key=key)
+        df_films = df_films.iloc[debut:fin]
+    st.markdown(html_grille(df_films, nb_colonnes, gras), unsafe_allow_html=True)
+    return df_films
 
-def afficher_films_sans_boutons(df_films, nb_colonnes=5):
+
+def afficher_films_sans_boutons(df_films, nb_colonnes=5, par_page=None, key="grille"):
     """
     Affiche les films en plusieurs lignes, nb_colonnes par ligne,
-    SANS bouton (uniquement image + titre). Cette version utilise
-    un conteneur HTML + classe CSS pour un rendu plus stylé.
-    """
-    for i in range(0, len(df_films), nb_colonnes):
-        subset = df_films.iloc[i : i + nb_colonnes]
-        
-        # Toujours nb_colonnes (ex: 5)
-        cols = st.columns(nb_colonnes)
-
-        for j, (index, film) in enumerate(subset.iterrows()):
-            with cols[j]:
-                lien_photo = film.get("lien_photos", None)
-                titre = film.get("title", None)
-                cibles = film.get("cible" , None)
-
-                if lien_photo:
-                    # On injecte directement du HTML + classe CSS
-                    st.markdown( f"""
-                        <div class="custom-image">
-                            <img src="{lien_photo}" alt="{titre}" />
-                            <p>{titre}</p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
-                else:
-                    st.warning("Image indisponible.")
+    SANS bouton (uniquement image + titre), dans un seul bloc HTML.
+    """
+    afficher_grille(df_films, nb_colonnes, par_page=par_page, key=key)
 
 
-def afficher_films_par_cible(df_films, nb_colonnes=5, nb_cibles=4,  nb_films_par_cible=5):
+def afficher_films_par_cible(films_par_cible, nb_colonnes=5):
     """
     Affiche des films organisés par catégories (cibles) avec des sections bien séparées.
+    Toutes les sections sont envoyées dans un seul bloc HTML.
 
     Args:
-        df_films (pd.DataFrame): DataFrame contenant les films avec 'lien_photos', 'title', et 'cibles'.
+        films_par_cible (dict): cible -> DataFrame des films ('lien_photos', 'title'),
+            par exemple le résultat de get_random_movies.
         nb_colonnes (int): Nombre de colonnes par ligne pour l'affichage.
-        nb_cibles (int): Nombre de cibles à sélectionner.
-        nb_films_par_cible (int): Nombre de films à afficher pour chaque cible.
     """
-    # Étape 1 : Sélectionner les cibles disponibles
-    cibles_disponibles = df_films['cibles'].dropna().unique().tolist()[:nb_cibles]
-    
-    # Étape 2 : Filtrer et afficher les films pour chaque cible
-    for cible in cibles_disponibles:
-        st.markdown(f"<h3 style='margin-top: 2em;'>{cible}</h3>", unsafe_allow_html=True)
-        
-        # Récupérer les films pour cette cible
-        films_cible = df_films[df_films['cibles'] == cible].head(nb_films_par_cible)
-        
-        # Diviser en colonnes
-        rows = [films_cible.iloc[i : i + nb_colonnes] for i in range(0, len(films_cible), nb_colonnes)]
-        for row in rows:
-            cols = st.columns(nb_colonnes)
-            for col, (_, film) in zip(cols, row.iterrows()):
-                lien_photo = film.get("lien_photos", None)
-                titre = film.get("title", "Titre indisponible")
-                cible = film.get("cibles", "Cible inconnue")
-                
-                with col:
-                    st.markdown(
-                        f"""
-                        <div class="custom-image" style="text-align: center; margin-bottom: 1.5em;">
-                            <img src="{lien_photo}" alt="{titre}" />
-                            <p><strong>{titre}</strong></p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
+    import pandas as pd
+
+    cibles = _echapper(pd.Series(list(films_par_cible), dtype=object))
+    sections = []
+    for cible, df_films in zip(cibles, films_par_cible.values()):
+        sections.append(f"<h3 style='margin-top: 2em;'>{cible}</h3>")
+        sections.append(html_grille(df_films, nb_colonnes, gras=True))
+    st.markdown("".join(sections), unsafe_allow_html=True)
+
+
+def _choisir_film(key, ids, ouvrir):
+    position = st.session_state.get(key)
+    if position is None:
+        return
+    selectionner_film(ids[position])
+    # Le choix est effacé : il ne désigne pas un film de la grille suivante
+    st.session_state[key] = None
+    if ouvrir:
+        st.session_state["ouvrir_film"] = True
 
-def afficher_films_avec_boutons(df_films, nb_colonnes=5, prefix="reco"):
+
+def choisir_film(df_films, key, page="pages/page_3.py"):
     """
-    Affiche les films en plusieurs lignes, nb_colonnes par ligne,
-    AVEC un bouton. En cliquant, on stocke le film sélectionné
-    dans la session et on passe en page 2.
-    """
-    for i in range(0, len(df_films), nb_colonnes):    
-        subset = df_films.iloc[i : i + nb_colonnes]
-        cols = st.columns(nb_colonnes)
-        for j, (index, film) in enumerate(subset.iterrows()):
-            with cols[j]:
-                lien_photo = film.get("lien_photos", None)
-                titre = film.get("title", None)
-                cibles = film.get("cible" , None)
-                if lien_photo:
-                    st.image(lien_photo, caption=titre, use_container_width=True)
-                else:
-                    st.warning("Image indisponible.")
-
-                # Bouton pour aller sur la page 2
-                btn_key = f"{prefix}_{i}_{j}"
-                if st.button(f"Voir '{titre}'", key=btn_key):
-                    st.session_state["selected_film"] = film.to_dict()
-                    # Redirection vers la page 2
-                    st.switch_page("pages/page_3.py")
-                    st.switch_page("pages/page_3.py")
-            
-
-def get_random_movies(df, count=20):
-    
-    """Retourne un échantillon aléatoire de films."""
-    return df.groupby("cibles").sample(n=count)
+    Titres cliquables sous une grille de films (un seul widget st.pills) :
+    un clic mémorise l'id_tmdb du film dans la session puis ouvre `page`
+    (avec page=None, on reste sur la page : le fragment appelant se
+    réexécute avec le nouveau film). Aucun rechargement du navigateur :
+    la session (conversation, "Ma Liste", pagination) est conservée.
+
+    La grille reste un seul bloc HTML et un seul widget est ajouté, quel
+    que soit le nombre de films affichés.
+    """
+    if df_films.empty:
+        return
+    ids = df_films["id_tmdb"].tolist()
+    titres = df_films["title"].astype(str).tolist()
+    st.pills(
+        "Voir un film", range(len(ids)), key=key, format_func=titres.__getitem__,
+        on_change=_choisir_film, args=(key, ids, page is not None),
+    )
+    # st.switch_page n'est pas permis dans un callback
+    if page is not None and st.session_state.pop("ouvrir_film", False):
+        st.switch_page(page)
+
+
+def get_random_movies(count=20, nb_cibles=None):
+    """
+    Échantillon aléatoire de `count` films par cible (moins si la cible est
+    plus petite), tiré avec la graine de la session : la sélection reste la
+    même d'une réexécution à l'autre et change d'une session à l'autre.
+
+    Returns:
+        dict: cible -> DataFrame des films tirés
+    """
+    if "graine_accueil" not in st.session_state:
+        st.session_state["graine_accueil"] = int.from_bytes(os.urandom(8), "little")
+    return get_catalogue().films_par_cible(count, st.session_state["graine_accueil"], nb_cibles)
+
+
+def selectionner_film(id_tmdb):
+    """
+    Mémorise l'id_tmdb du film sélectionné dans la session (jamais la ligne
+    du catalogue elle-même).
+    """
+    st.session_state["selected_film_id"] = int(id_tmdb)
+
+
+def film_selectionne():
+    """
+    Fiche du film sélectionné, résolue dans la version courante du catalogue
+    (voir Catalogue.fiche), ou None.
+    """
+    id_tmdb = st.session_state.get("selected_film_id")
+    return get_catalogue().fiche(id_tmdb) if id_tmdb is not None else None
 
 
-def fuzzy_search(query, titles):
+def fuzzy_search(query, limit=10):
     """
-    Recherche floue via fuzzywuzzy.process.extract.
-    On ne garde que ceux dont le score >= 70.
+    Recherche floue dans l'index de titres du catalogue partagé.
+    On ne garde que les titres dont le score >= 70.
+    Avec MOVIEMIND_CATALOGUE_BACKEND=sqlite, recherche plein texte (titre et
+    synopsis, par préfixe de mots) dans la base SQLite du catalogue.
+
+    Returns:
+        list: Tuples (titre, score, [id_tmdb]) triés par score décroissant
+    """
+    from utils.config import CATALOGUE_BACKEND
+
+    if CATALOGUE_BACKEND == "sqlite":
+        return get_catalogue().rechercher(query, limite=limit)
+    return get_catalogue().index_recherche.rechercher(query, limite=limit, seuil=70)
+
+
+def titres_approchants(query, limit=3):
+    """
+    Titres approchants d'une recherche sans résultat (point de départ des
+    suggestions) : index de trigrammes avec un seuil bas, ou avec le backend
+    sqlite, recherche FTS5 approchée (un des mots, par ses 3 premiers caractères).
+
+    Returns:
+        list: Tuples (titre, score, [id_tmdb])
     """
-    matches = process.extract(query, titles, limit=10)
-    return [m for m in matches if m[1] >= 70]
+    from utils.config import CATALOGUE_BACKEND
+
+    if CATALOGUE_BACKEND == "sqlite":
+        return get_catalogue().rechercher(query, limite=limit, approchee=True)
+    return get_catalogue().index_recherche.rechercher(query, limite=limit, seuil=40)
+
+
+def films_trouves(ids):
+    """
+    Films des id_tmdb donnés (résultats de fuzzy_search), dans l'ordre, lus
+    dans le même backend que la recherche.
+
+    Returns:
+        pd.DataFrame
+    """
+    return get_catalogue().films(ids)
+
+
+def plus_comme_ca(ids, k=10):
+    """
+    Films proches des films donnés, lus dans le graphe des voisins précalculé
+    à partir des embeddings (voir utils/voisins.py) ; aucun calcul de similarité.
+
+    Returns:
+        pd.DataFrame: Films du catalogue (vide si le graphe n'est pas calculé)
+    """
+    from utils.ressources import get_registre
+
+    graphe = get_registre().obtenir("graphe_voisins")
+    voisins = graphe.plus_comme_ceux_ci(ids, k) if graphe is not None else []
+    return get_catalogue().films(voisins)
+
+
+def _changer_page(key, pas):
+    st.session_state[key] += pas
+
+
+def paginer(nb_elements, par_page=20, key="page"):
+    """
+    Affiche une navigation page précédente / suivante et retourne
+    les bornes (debut, fin) des éléments de la page courante.
+    """
+    nb_pages = max(1, -(-nb_elements // par_page))
+    page = min(st.session_state.get(key, 0), nb_pages - 1)
+    st.session_state[key] = page
+
+    if nb_pages > 1:
+        col_prec, col_info, col_suiv = st.columns([1, 2, 1])
+        with col_prec:
+            st.button("← Précédents", key=f"{key}_prec", disabled=page == 0,
+                      on_click=_changer_page, args=(key, -1))
+        with col_info:
+            st.markdown(f"<p style='text-align: center;'>Page {page + 1} / {nb_pages}</p>",
+                        unsafe_allow_html=True)
+        with col_suiv:
+            st.button("Suivants →", key=f"{key}_suiv", disabled=page >= nb_pages - 1,
+                      on_click=_changer_page, args=(key, 1))
+
+    return page * par_page, min((page + 1) * par_page, nb_elements)
 
 
 def load_css(file_name):
@@ -132,81 +261,232 @@ def load_css(file_name):
     else:
         st.error(f"Le fichier CSS '{file_name}' est introuvable.")
 
+def catalogue_disponible():
+    """
+    Vrai si le catalogue contient des films. Ne copie pas le DataFrame :
+    à préférer à load_movies().empty à chaque réexécution d'une page.
+    """
+    try:
+        return len(get_catalogue()) > 0
+    except FileNotFoundError:
+        st.error("Le fichier de données est introuvable. Vérifiez le chemin.")
+        return False
+
 def load_movies():
+    """
+    Retourne une copie du catalogue des films (DataFrame), partagé entre
+    toutes les sessions et rechargé uniquement si le CSV change (voir
+    utils/catalogue.py). Charge le catalogue en mémoire quel que soit le
+    backend. Pour savoir seulement s'il y a des films : catalogue_disponible().
+    """
+    from utils.catalogue import get_catalogue as catalogue_en_memoire
+
     try:
-        return pd.read_csv("data/recommendation_dataset.csv")  
+        return catalogue_en_memoire().df
     except FileNotFoundError:
+        import pandas as pd
+
         st.error("Le fichier de données est introuvable. Vérifiez le chemin.")
         return pd.DataFrame()
     
-def connect_to_db(db_path="data/chroma.sqlite3"):
+@contextmanager
+def connect_to_db(db_path=None):
     """
-    Connecte à la base SQLite et retourne l'objet connexion.
+    Connexion SQLite le temps du bloc `with` :
+    `with connect_to_db() as conn:`.
+
+    Sans db_path : base de l'application (MOVIEMIND_BASE_SQLITE), connexion
+    empruntée au pool partagé par toutes les sessions. Avec db_path : une
+    connexion dédiée à ce fichier, fermée en fin de bloc.
+    Fournit None (après un message d'erreur) si la base est inaccessible.
     """
-    try:
-        conn = sqlite3.connect(db_path)
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Erreur lors de la connexion à la base de données : {e}")
+    import sqlite3
+    from contextlib import closing
+    from utils.ressources import get_registre
+
+    with ExitStack() as pile:
+        try:
+            if db_path is None:
+                conn = pile.enter_context(get_registre().obtenir("base_app").connexion())
+            else:
+                conn = pile.enter_context(closing(sqlite3.connect(db_path, timeout=5)))
+        except (sqlite3.Error, OSError, TimeoutError) as e:
+            st.error(f"Erreur lors de la connexion à la base de données : {e}")
+            conn = None
+        yield conn
+
+def utilisateur_courant():
+    """
+    Identifiant de l'utilisateur connecté. Sans connexion, un identifiant
+    "invite-<uuid>" propre à la session : deux visiteurs anonymes ne
+    partagent pas la même "Ma Liste" (elle est perdue avec la session).
+    """
+    if st.session_state.get("username"):
+        return st.session_state["username"]
+    if "invite" not in st.session_state:
+        import uuid
+
+        st.session_state["invite"] = f"invite-{uuid.uuid4().hex}"
+    return st.session_state["invite"]
+
+def ma_liste_ids():
+    """
+    id_tmdb de "Ma Liste" de l'utilisateur courant, du plus récent au plus ancien.
+    """
+    from utils import ma_liste
+
+    with connect_to_db() as conn:
+        if conn is None:
+            return []
+        return ma_liste.lister(conn, utilisateur_courant())
+
+def basculer_ma_liste(id_tmdb):
+    """
+    Callback de bouton : ajoute le film à "Ma Liste", ou l'en retire s'il y est déjà.
+    """
+    from utils import ma_liste
+
+    with connect_to_db() as conn:
+        if conn is None:
+            return
+        if int(id_tmdb) in ma_liste.lister(conn, utilisateur_courant()):
+            ma_liste.retirer(conn, utilisateur_courant(), id_tmdb)
+        else:
+            ma_liste.ajouter(conn, utilisateur_courant(), id_tmdb)
+
+def get_films_pour_vous(count=5, nb_cibles=None, ids_liste=None):
+    """
+    Page d'accueil personnalisée : pour chaque cible, les films les plus
+    proches du profil de "Ma Liste" (voir utils/ma_liste.py).
+
+    Returns:
+        dict: cible -> DataFrame des films classés, ou None (liste vide,
+        index vectoriel absent) : on affiche alors le tirage aléatoire
+    """
+    from utils.ressources import get_registre
+
+    ids_liste = ma_liste_ids() if ids_liste is None else ids_liste
+    if not ids_liste:
         return None
+    pools = get_registre().obtenir("pools_accueil")
+    classement = pools.classer(ids_liste, count, nb_cibles) if pools is not None else None
+    if not classement:
+        return None
+    catalogue = get_catalogue()
+    return {cible: catalogue.films(ids) for cible, ids in classement.items()}
+
+def _reinitialiser_conversation():
+    st.session_state.memoire = None
+    st.session_state.mesures_prompt = []
+    st.session_state.derniere_question = None
+    st.session_state.derniers_films = []
+    st.session_state.user_input = ""
+
 
+@st.fragment
 def call_chatbot():
-    from utils.chatbot import get_embeddings, get_conversation_chain, get_vectorstore
+    """
+    Assistant de la sidebar, à appeler dans `with st.sidebar:`.
+
+    C'est un fragment Streamlit : une question ou un clic dans l'assistant ne
+    réexécute que lui, pas la page (grilles, catalogue) qui l'entoure.
+    """
+    st.title("Chatbot 🤖")
     
-    # Tout le contenu de la sidebar
-    with st.sidebar:
-        st.title("Chatbot 🤖")
-        
-        # Initialisation des variables de session
-        if "conversation" not in st.session_state:
-            st.session_state.conversation = None
-        if "chat_history" not in st.session_state:
-            st.session_state.chat_history = []
-
-        # Interface de chat
-        st.markdown("""
-        ### 👋 Bienvenue dans votre assistant de film
-        Vous n'avez pas d'idée ? Nous sommes là pour vous proposer un film !
-        """)
-
-        # Champ de saisie utilisateur
-        user_input = st.text_input(
-            "Que souhaitez-vous comme film ?",
-            key="user_input", 
-            placeholder="Posez-moi des questions sur les films"
+    # Initialisation des variables de session (les ressources lourdes sont
+    # partagées par le processus, voir utils/ressources.py)
+    if "memoire" not in st.session_state:
+        st.session_state.memoire = None
+    if "mesures_prompt" not in st.session_state:
+        st.session_state.mesures_prompt = []
+    if "derniere_question" not in st.session_state:
+        st.session_state.derniere_question = None
+    if "derniers_films" not in st.session_state:
+        st.session_state.derniers_films = []
+
+    # Interface de chat
+    st.markdown("""
+    ### 👋 Bienvenue dans votre assistant de film
+    Vous n'avez pas d'idée ? Nous sommes là pour vous proposer un film !
+    """)
+
+    # Champ de saisie utilisateur
+    user_input = st.text_input(
+        "Que souhaitez-vous comme film ?",
+        key="user_input", 
+        placeholder="Posez-moi des questions sur les films"
+    )
+    
+    if user_input:
+        # L'assistant (LangChain, clients LLM) n'est chargé qu'à la première question
+        from utils.chatbot import (
+            AffichageFlux, get_cache_reponses, get_chaine, get_embeddings, nouvelle_memoire,
         )
-        
-        if user_input:
-            try:
-                # Chargement de la base de données vectorielle
-                vectorstore = get_vectorstore()
-                if st.session_state.conversation is None:
-                    st.session_state.conversation = get_conversation_chain(vectorstore)
-                
-                # Traitement de la requête utilisateur
-                with st.spinner('Recherche du film parfait...'):
-                    response = st.session_state.conversation.invoke({
-                        "question": user_input,
-                        "chat_history": st.session_state.chat_history
-                    })
-                    
-                    # Mise à jour de l'historique
-                    st.session_state.chat_history.append((user_input, response["answer"]))
-                    
-                    # Affichage de la réponse
-                    st.markdown('<div class="chat-message assistant-message">', unsafe_allow_html=True)
-                    st.markdown(response["answer"])
-                    st.markdown('</div>', unsafe_allow_html=True)
-            except Exception as e:
-                st.error(f"Erreur : {e}")
-
-        # Bouton pour réinitialiser la conversation
-        if st.button("Réinitialiser la conversation"):
-            # Réinitialisation des variables de session
-            st.session_state.conversation = None
-            st.session_state.chat_history = []
-            # Rafraîchissement de la page
-            st.rerun()
+        from utils.memoire import MesurePrompt
+        from utils.cache_reponses import normaliser_question
+
+        if st.session_state.memoire is None:
+            st.session_state.memoire = nouvelle_memoire()
+
+        # Zones remplies au fil de la génération : films retrouvés, puis réponse
+        zone_films = st.empty()
+        st.markdown('<div class="chat-message assistant-message">', unsafe_allow_html=True)
+        zone_reponse = st.empty()
+        st.markdown('</div>', unsafe_allow_html=True)
+        try:
+            # Le champ garde sa valeur à chaque rerun : une question déjà
+            # traitée n'est pas renvoyée au LLM, on réaffiche sa réponse
+            if normaliser_question(user_input) != st.session_state.derniere_question:
+                memoire = st.session_state.memoire
+                historique = memoire.paires()
+                cache = get_cache_reponses()
+                reponse, vecteur = cache.obtenir(
+                    user_input, historique, get_embeddings() if cache.seuil_semantique else None
+                )
+
+                st.session_state.derniers_films = []
+                if reponse is None:
+                    # Chaîne partagée (index vectoriel, LLM et client HTTP construits une fois)
+                    conversation = get_chaine()
+                    if conversation is None:
+                        raise FileNotFoundError(
+                            "Index vectoriel introuvable : lancez `python -m utils.artefacts`."
+                        )
+
+                    # Traitement de la requête utilisateur, réponse affichée en flux
+                    zone_reponse.caption('Recherche du film parfait...')
+                    flux = AffichageFlux(zone_films, zone_reponse)
+                    mesure = MesurePrompt()
+                    response = conversation.invoke(
+                        {"question": user_input, "chat_history": memoire.messages()},
+                        config={"callbacks": [flux, mesure]},
+                    )
+                    reponse = response["answer"]
+                    st.session_state.derniers_films = flux.titres
+                    st.session_state.mesures_prompt.append(mesure.rapport(memoire, user_input))
+                    cache.ajouter(user_input, historique, reponse, vecteur)
+
+                # Mise à jour de l'historique (fenêtre + résumé, sous budget de tokens)
+                memoire.ajouter(user_input, reponse)
+                st.session_state.derniere_question = normaliser_question(user_input)
+
+            # Affichage de la réponse complète
+            if st.session_state.derniers_films:
+                zone_films.markdown("🎞️ **Films trouvés :** " + ", ".join(st.session_state.derniers_films))
+            zone_reponse.markdown(st.session_state.memoire.derniere_reponse)
+            mesures = st.session_state.mesures_prompt
+            if mesures and mesures[-1]["tour"] == len(st.session_state.memoire):
+                derniere = mesures[-1]
+                st.caption(
+                    f"Prompt : ~{derniere['tokens_prompts']} tokens "
+                    f"(historique : ~{derniere['tokens_historique']}, contexte : ~{derniere['tokens_contexte']}, "
+                    f"{derniere['tokens_economises']} économisés)"
+                )
+        except Exception as e:
+            st.error(f"Erreur : {e}")
+
+    # Bouton pour réinitialiser la conversation (le rerun ne concerne que l'assistant)
+    st.button("Réinitialiser la conversation", on_click=_reinitialiser_conversation)
 
 
 
@@ -0,0 +1,298 @@
+"""
+Recherche hybride lexicale + vectorielle pour l'assistant
+
+La recherche purement vectorielle ne sait pas exploiter les colonnes
+structurées du catalogue (`cibles`, `note_moyenne`) ni les mots exacts
+d'un titre. Ce module ajoute :
+
+1. BM25 sur titre + synopsis : les termes sont hachés (HashingVectorizer,
+   sans vocabulaire à stocker) et les poids BM25 de chaque couple
+   (terme, document) sont précalculés dans une matrice creuse CSC stockée
+   en .npy. Le score d'une requête est la somme de quelques colonnes.
+
+2. Pré-filtres : la cible et la note minimale, repérées dans la question ou
+   passées explicitement, sont appliquées par masques booléens avant tout
+   calcul de score. BM25 ne somme que les coefficients des documents
+   retenus ; pour les vecteurs, un filtre étroit ne multiplie que les lignes
+   retenues, un filtre large multiplie toute la matrice projetée (sans copie)
+   puis sélectionne les lignes retenues. Si l'index vectoriel a un index
+   IVF et que `nb_sondes` est donné, seuls les documents des groupes sondés
+   (et retenus par les filtres) sont comparés à la requête.
+
+3. Fusion : les classements BM25 et vectoriel sont combinés par
+   Reciprocal Rank Fusion (somme des 1 / (k_rrf + rang)).
+"""
+
+import os
+import re
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from scipy import sparse
+
+from utils.recherche import normaliser_titre
+
+NB_TERMES_HACHES = 2 ** 20
+NOTE_BIEN_NOTE = 7.0
+
+
+def texte_bm25(metadonnees):
+    """
+    Texte indexé par BM25 pour un document : titre et synopsis.
+    """
+    return " ".join(v for v in (metadonnees.get("title"), metadonnees.get("Description")) if isinstance(v, str))
+
+
+def _vectoriseur():
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(
+        n_features=NB_TERMES_HACHES,
+        strip_accents="unicode",
+        lowercase=True,
+        alternate_sign=False,
+        norm=None,
+        dtype=np.float32,
+    )
+
+
+class ConstructeurBM25:
+    """
+    Accumule les fréquences de termes lot par lot, puis calcule les poids BM25.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._vectoriseur = _vectoriseur()
+        self._lots = []
+
+    def ajouter(self, textes):
+        self._lots.append(self._vectoriseur.transform(textes).tocsr())
+
+    def terminer(self):
+        """
+        Returns:
+            IndexBM25: Index dont chaque coefficient est le poids BM25 du terme dans le document
+        """
+        tf = sparse.vstack(self._lots).tocsr() if self._lots else sparse.csr_matrix((0, NB_TERMES_HACHES))
+        nb_docs = tf.shape[0]
+        longueurs = np.asarray(tf.sum(axis=1)).ravel()
+        moyenne = longueurs.mean() if nb_docs else 1.0
+
+        df = np.bincount(tf.indices, minlength=NB_TERMES_HACHES)
+        idf = np.log1p((nb_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        # Poids BM25 de chaque coefficient non nul, ligne par ligne
+        lignes = np.repeat(np.arange(nb_docs), np.diff(tf.indptr))
+        norme = self.k1 * (1 - self.b + self.b * longueurs[lignes] / max(moyenne, 1e-9))
+        poids = tf.copy()
+        poids.data = (idf[tf.indices] * tf.data * (self.k1 + 1) / (tf.data + norme)).astype(np.float32)
+        return IndexBM25(poids.tocsc())
+
+
+class IndexBM25:
+    """
+    Matrice creuse (documents x termes hachés) des poids BM25, au format CSC.
+    """
+
+    FICHIERS = ("data", "indices", "indptr")
+
+    def __init__(self, poids):
+        self.poids = poids
+        self._vectoriseur = _vectoriseur()
+
+    def termes(self, requete):
+        """
+        Colonnes (termes hachés) présentes dans la requête.
+        """
+        return np.unique(self._vectoriseur.transform([requete]).indices)
+
+    def scores(self, requete, candidats=None):
+        """
+        Score BM25 de la requête pour chaque document, ou seulement pour les
+        candidats (indices triés) : on ne parcourt que les colonnes des termes
+        de la requête, et seuls leurs coefficients tombant sur un candidat
+        sont sommés.
+        """
+        termes = self.termes(requete)
+        indptr = self.poids.indptr
+        lignes = [self.poids.indices[indptr[t] : indptr[t + 1]] for t in termes]
+        poids = [self.poids.data[indptr[t] : indptr[t + 1]] for t in termes]
+        lignes = np.concatenate(lignes) if lignes else np.empty(0, dtype=np.int64)
+        poids = np.concatenate(poids) if poids else np.empty(0, dtype=np.float32)
+        if candidats is None:
+            return np.bincount(lignes, weights=poids, minlength=self.poids.shape[0]).astype(np.float32)
+
+        rangs = np.minimum(np.searchsorted(candidats, lignes), max(len(candidats) - 1, 0))
+        garder = candidats[rangs] == lignes if len(candidats) else np.zeros(len(lignes), dtype=bool)
+        return np.bincount(rangs[garder], weights=poids[garder], minlength=len(candidats)).astype(np.float32)
+
+    def save(self, path):
+        for nom in self.FICHIERS:
+            np.save(os.path.join(path, f"bm25_{nom}.npy"), getattr(self.poids, nom))
+        np.save(os.path.join(path, "bm25_forme.npy"), np.asarray(self.poids.shape, dtype=np.int64))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Charge l'index BM25 d'un dossier, ou None s'il n'existe pas.
+        """
+        if not os.path.exists(os.path.join(path, "bm25_forme.npy")):
+            return None
+        data, indices, indptr = (
+            np.load(os.path.join(path, f"bm25_{nom}.npy"), mmap_mode="r") for nom in cls.FICHIERS
+        )
+        forme = tuple(np.load(os.path.join(path, "bm25_forme.npy")))
+        return cls(sparse.csc_matrix((data, indices, indptr), shape=forme))
+
+
+class Filtres:
+    """
+    Masques de pré-filtrage sur les métadonnées de l'index vectoriel.
+    """
+
+    def __init__(self, metadonnees):
+        self.masques_cibles = {}
+        if "cibles" in metadonnees:
+            codes, valeurs = pd.factorize(metadonnees["cibles"].astype(object))
+            self.masques_cibles = {
+                valeur: codes == code for code, valeur in enumerate(valeurs) if isinstance(valeur, str) and valeur
+            }
+        if "note_moyenne" in metadonnees:
+            notes = pd.to_numeric(metadonnees["note_moyenne"].astype(object), errors="coerce")
+            self.notes = notes.to_numpy(dtype=np.float32, na_value=np.nan)
+        else:
+            self.notes = np.full(len(metadonnees), np.nan, dtype=np.float32)
+        self._cibles_normalisees = {normaliser_titre(c): c for c in self.masques_cibles}
+
+    def extraire(self, question):
+        """
+        Repère dans une question une cible connue et une note minimale.
+
+        Returns:
+            dict: {"cible": str ou None, "note_min": float ou None}
+        """
+        texte = normaliser_titre(question)
+        mots = set(texte.split())
+        cible = None
+        for normalisee, originale in self._cibles_normalisees.items():
+            singulier = normalisee[:-1] if normalisee.endswith("s") else normalisee
+            if normalisee and (f" {normalisee} " in f" {texte} " or singulier in mots):
+                cible = originale
+                break
+
+        note_min = None
+        trouve = re.search(r"\bnot(?:e|es|é|ée|és|ées)\b\D{0,20}?(\d+(?:[.,]\d+)?)", question.lower())
+        if trouve and float(trouve.group(1).replace(",", ".")) <= 10:
+            note_min = float(trouve.group(1).replace(",", "."))
+        elif re.search(r"\b(bien|mieux|tr[eè]s bien) not[ée]|\bmeilleur", question.lower()):
+            note_min = NOTE_BIEN_NOTE
+        return {"cible": cible, "note_min": note_min}
+
+    def masque(self, cible=None, note_min=None):
+        """
+        Masque booléen des documents respectant les filtres (None si aucun filtre).
+        """
+        masque = None
+        if cible is not None and cible in self.masques_cibles:
+            masque = self.masques_cibles[cible]
+        if note_min is not None:
+            masque_note = self.notes >= note_min
+            masque = masque_note if masque is None else masque & masque_note
+        return masque
+
+
+def fusion_rrf(classements, k_rrf=60):
+    """
+    Reciprocal Rank Fusion de plusieurs classements (tableaux d'indices, meilleur d'abord).
+
+    Returns:
+        tuple: (indices triés par score fusionné, scores)
+    """
+    tous = np.unique(np.concatenate(classements)) if classements else np.empty(0, np.int64)
+    scores = np.zeros(len(tous), dtype=np.float32)
+    for classement in classements:
+        rangs = np.arange(1, len(classement) + 1, dtype=np.float32)
+        scores[np.searchsorted(tous, classement)] += 1.0 / (k_rrf + rangs)
+    ordre = np.argsort(-scores, kind="stable")
+    return tous[ordre], scores[ordre]
+
+
+def _meilleurs(scores, n):
+    n = min(n, len(scores))
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    meilleurs = np.argpartition(-scores, n - 1)[:n]
+    return meilleurs[np.argsort(-scores[meilleurs], kind="stable")]
+
+
+class RetrieverHybride(BaseRetriever):
+    """
+    Retriever LangChain : pré-filtres, BM25 et similarité vectorielle fusionnés par RRF.
+    """
+
+    index: Any
+    k: int = 3
+    nb_candidats: int = 50
+    k_rrf: int = 60
+    cible: Optional[str] = None
+    note_min: Optional[float] = None
+    filtres_auto: bool = True
+    # Recherche vectorielle approximative (index IVF) : nombre de groupes sondés
+    nb_sondes: Optional[int] = None
+    # Au-delà de cette fraction du catalogue, les candidats ne sont pas
+    # recopiés pour le produit vectoriel
+    fraction_copie: float = 0.25
+
+    def rechercher(self, query, cible=None, note_min=None):
+        """
+        Returns:
+            tuple: (indices de documents, scores fusionnés), meilleurs d'abord
+        """
+        index = self.index
+        masque = index.filtres.masque(cible, note_min)
+        candidats = np.flatnonzero(masque) if masque is not None else None
+        if candidats is not None and len(candidats) == 0:
+            candidats = None  # filtres trop stricts : on cherche dans tout le catalogue
+
+        requete = np.asarray(index.embeddings.embed_query(query), dtype=np.float32)
+        requete /= max(np.linalg.norm(requete), 1e-12)
+        if self.nb_sondes and index.ivf is not None:
+            # IVF : seuls les documents des groupes sondés, retenus par les filtres
+            lignes = index.lignes_sondees(requete, self.nb_sondes)
+            if candidats is not None:
+                lignes = np.intersect1d(lignes, candidats, assume_unique=True)
+            meilleurs = lignes[_meilleurs(index.vecteurs[lignes] @ requete, self.nb_candidats)]
+            classement = meilleurs if candidats is None else np.searchsorted(candidats, meilleurs)
+        elif candidats is None:
+            classement = _meilleurs(index.vecteurs @ requete, self.nb_candidats)
+        elif len(candidats) > self.fraction_copie * len(index.vecteurs):
+            # Filtre large : un produit sur toute la matrice projetée (lecture
+            # séquentielle, sans copie) puis la sélection des candidats
+            classement = _meilleurs((index.vecteurs @ requete)[candidats], self.nb_candidats)
+        else:
+            classement = _meilleurs(index.vecteurs[candidats] @ requete, self.nb_candidats)
+        classements = [classement]
+        if index.bm25 is not None:
+            scores_bm25 = index.bm25.scores(query, candidats)
+            meilleurs = _meilleurs(scores_bm25, self.nb_candidats)
+            classements.append(meilleurs[scores_bm25[meilleurs] > 0])
+
+        positions, scores = fusion_rrf(classements, self.k_rrf)
+        if candidats is not None:
+            positions = candidats[positions]
+        return positions, scores
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        filtres = self.index.filtres.extraire(query) if self.filtres_auto else {}
+        cible = self.cible or filtres.get("cible")
+        note_min = self.note_min if self.note_min is not None else filtres.get("note_min")
+        positions, scores = self.rechercher(query, cible, note_min)
+        return self.index.documents(positions[: self.k], scores[: self.k])
@@ -0,0 +1,446 @@
+"""
+Index vectoriel NumPy pour l'assistant de films
+
+Remplace DocArrayInMemorySearch et le fichier index.pkl :
+
+1. Stockage : une matrice float32 contiguë (un vecteur normalisé par document)
+   et une table de métadonnées compacte (Arrow IPC), toutes deux projetées en
+   mémoire au chargement. Aucun pickle.
+
+2. Recherche exacte : un seul produit matriciel requêtes x documents, suivi
+   d'un argpartition pour extraire les k meilleurs scores (similarité cosinus).
+
+3. Recherche approximative (optionnelle) : index IVF. Les vecteurs sont
+   regroupés par k-means ; une requête ne compare que les documents des
+   `nb_sondes` groupes les plus proches. Utile pour les gros catalogues :
+   construit par `python -m utils.artefacts --ivf-listes N` (ou
+   MOVIEMIND_IVF_LISTES), utilisé par les retrievers via `nb_sondes`.
+
+4. Écriture en flux : `EcrivainIndex` ajoute les vecteurs et métadonnées lot
+   par lot sur disque, sans jamais garder tout le catalogue en mémoire.
+
+5. LangChain : `as_retriever()` fournit un retriever compatible avec
+   ConversationalRetrievalChain. Si l'index BM25 est présent, c'est le
+   retriever hybride de utils/hybride.py (BM25 + vecteurs + pré-filtres).
+
+6. Voisins : si le graphe des plus proches voisins a été calculé
+   (utils/voisins.py), `documents_similaires()` donne les documents des
+   films proches d'un film, par simple lecture de tableau.
+"""
+
+import copy
+import json
+import os
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from scipy import sparse
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from utils.embeddings import verifier_compatibilite
+from utils.hybride import ConstructeurBM25, Filtres, IndexBM25, RetrieverHybride, texte_bm25
+from utils.voisins import GrapheVoisins
+
+
+def normaliser(vecteurs):
+    """
+    Normalise des vecteurs (lignes) en norme L2, en float32.
+    """
+    vecteurs = np.asarray(vecteurs, dtype=np.float32)
+    normes = np.linalg.norm(vecteurs, axis=-1, keepdims=True)
+    return vecteurs / np.maximum(normes, 1e-12)
+
+
+def top_k(scores, k):
+    """
+    Indices et valeurs des k plus grands scores de chaque ligne, triés.
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        vide = np.empty((scores.shape[0], 0))
+        return vide.astype(np.int64), vide.astype(np.float32)
+    if k < scores.shape[1]:
+        indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    valeurs = np.take_along_axis(scores, indices, axis=1)
+    ordre = np.argsort(-valeurs, axis=1)
+    return np.take_along_axis(indices, ordre, axis=1), np.take_along_axis(valeurs, ordre, axis=1)
+
+
+class IndexVectoriel:
+    """
+    Matrice d'embeddings float32 + métadonnées, avec recherche top-k vectorisée.
+    """
+
+    FICHIERS_IVF = ("centroides", "offsets", "valeurs")
+
+    def __init__(self, vecteurs, metadonnees, embeddings=None, modele=None, ivf=None, backend=None,
+                 bm25=None, graphe=None):
+        self.vecteurs = vecteurs          # (n, d) float32, lignes normalisées
+        self.metadonnees = metadonnees    # DataFrame : page_content + métadonnées
+        self.embeddings = embeddings      # modèle d'embedding des requêtes
+        self.modele = modele              # modèle et backend ayant construit l'index
+        self.backend = backend
+        self.ivf = ivf                    # (centroides, offsets, valeurs) ou None
+        self.bm25 = bm25                  # IndexBM25 sur titre + synopsis, ou None
+        self.graphe = graphe              # GrapheVoisins entre films, ou None
+        self._filtres = None
+
+    def __len__(self):
+        return len(self.vecteurs)
+
+    @classmethod
+    def from_documents(cls, documents, embeddings, taille_lot=256, modele=None):
+        """
+        Calcule les embeddings des documents par lots et construit l'index.
+        """
+        textes = [doc.page_content for doc in documents]
+        lots = [
+            embeddings.embed_documents(textes[i : i + taille_lot])
+            for i in range(0, len(textes), taille_lot)
+        ]
+        vecteurs = np.vstack(lots) if lots else np.empty((0, 0), np.float32)
+        return cls.depuis_vecteurs(vecteurs, documents, embeddings, modele)
+
+    @classmethod
+    def depuis_vecteurs(cls, vecteurs, documents, embeddings=None, modele=None):
+        """
+        Construit l'index à partir d'embeddings déjà calculés (un par document).
+        """
+        metadonnees = pd.DataFrame([doc.metadata for doc in documents])
+        metadonnees["page_content"] = [doc.page_content for doc in documents]
+        bm25 = ConstructeurBM25()
+        bm25.ajouter([texte_bm25(doc.metadata) for doc in documents])
+        return cls(normaliser(vecteurs), metadonnees, embeddings,
+                   modele or getattr(embeddings, "modele", None),
+                   backend=getattr(embeddings, "nom", None), bm25=bm25.terminer())
+
+    @property
+    def filtres(self):
+        """
+        Masques de pré-filtrage (cibles, note minimale), calculés au premier usage.
+        """
+        if self._filtres is None:
+            self._filtres = Filtres(self.metadonnees)
+        return self._filtres
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+    def rechercher(self, requetes, k=3):
+        """
+        Recherche exacte des k documents les plus proches, pour un lot de requêtes.
+
+        Args:
+            requetes: Vecteurs de requête, forme (d,) ou (m, d)
+            k (int): Nombre de documents par requête
+
+        Returns:
+            tuple: (indices (m, k), scores (m, k))
+        """
+        requetes = normaliser(np.atleast_2d(requetes))
+        return top_k(requetes @ self.vecteurs.T, k)
+
+    def construire_ivf(self, nb_listes=None, iterations=10, graine=0, taille_bloc=65536):
+        """
+        Construit l'index approximatif IVF (k-means sphérique sur les vecteurs).
+
+        Raises:
+            ValueError: Si l'index est vide ou a moins de documents que de groupes
+        """
+        n = len(self.vecteurs)
+        nb_listes = nb_listes or max(1, int(np.sqrt(n)))
+        if n < nb_listes or n == 0:
+            raise ValueError(f"Index IVF impossible : {n} documents pour {nb_listes} groupes")
+        rng = np.random.default_rng(graine)
+        centroides = self.vecteurs[rng.choice(n, nb_listes, replace=False)].copy()
+
+        for _ in range(iterations):
+            affectation = self._affecter(centroides, taille_bloc)
+            # Somme des vecteurs de chaque groupe : matrice d'appartenance creuse x vecteurs
+            appartenance = sparse.csr_matrix(
+                (np.ones(n, dtype=np.float32), (affectation, np.arange(n))),
+                shape=(nb_listes, n),
+            )
+            sommes = np.asarray(appartenance @ self.vecteurs, dtype=np.float32)
+            vides = ~sommes.any(axis=1)
+            sommes[vides] = centroides[vides]
+            centroides = normaliser(sommes)
+
+        affectation = self._affecter(centroides, taille_bloc)
+        valeurs = np.argsort(affectation, kind="stable").astype(np.int64)
+        offsets = np.zeros(nb_listes + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(affectation, minlength=nb_listes))
+        self.ivf = (centroides, offsets, valeurs)
+        return self
+
+    def _affecter(self, centroides, taille_bloc):
+        return np.concatenate([
+            np.argmax(self.vecteurs[i : i + taille_bloc] @ centroides.T, axis=1)
+            for i in range(0, len(self.vecteurs), taille_bloc)
+        ])
+
+    def lignes_sondees(self, requete, nb_sondes=8):
+        """
+        Indices triés des documents des `nb_sondes` groupes IVF les plus proches
+        d'une requête normalisée (forme (d,)).
+        """
+        centroides, offsets, valeurs = self.ivf
+        listes, _ = top_k((centroides @ requete)[None, :], nb_sondes)
+        return np.sort(np.concatenate([valeurs[offsets[l] : offsets[l + 1]] for l in listes[0]]))
+
+    def rechercher_approx(self, requetes, k=3, nb_sondes=8):
+        """
+        Recherche approximative via l'index IVF (exacte si l'IVF n'est pas construit).
+
+        Returns:
+            tuple: (indices (m, k), scores (m, k)), -1 / -inf si moins de k candidats
+        """
+        if self.ivf is None:
+            return self.rechercher(requetes, k)
+        requetes = normaliser(np.atleast_2d(requetes))
+
+        indices = np.full((len(requetes), k), -1, dtype=np.int64)
+        scores = np.full((len(requetes), k), -np.inf, dtype=np.float32)
+        for q, requete in enumerate(requetes):
+            candidats = self.lignes_sondees(requete, nb_sondes)
+            meilleurs, valeurs_q = top_k((self.vecteurs[candidats] @ requete)[None, :], k)
+            indices[q, : meilleurs.shape[1]] = candidats[meilleurs[0]]
+            scores[q, : meilleurs.shape[1]] = valeurs_q[0]
+        return indices, scores
+
+    def documents(self, indices, scores=None):
+        """
+        Documents LangChain correspondant à des indices de lignes.
+        """
+        documents = []
+        for rang, i in enumerate(indices):
+            if i < 0:
+                continue
+            ligne = self.metadonnees.iloc[int(i)].to_dict()
+            contenu = ligne.pop("page_content")
+            if scores is not None:
+                ligne["score"] = float(scores[rang])
+            documents.append(Document(page_content=contenu, metadata=ligne))
+        return documents
+
+    def documents_similaires(self, id_tmdb, k=3):
+        """
+        Documents des k films les plus proches d'un film (graphe précalculé),
+        ou liste vide sans graphe.
+        """
+        if self.graphe is None:
+            return []
+        positions, scores = self.graphe.voisins_positions(id_tmdb, k)
+        return self.documents(self.graphe.lignes[positions], scores)
+
+    def similarity_search(self, query, k=3, nb_sondes=None):
+        """
+        Recherche des k documents les plus proches d'une question en texte.
+        """
+        requete = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        if nb_sondes:
+            indices, scores = self.rechercher_approx(requete, k, nb_sondes)
+        else:
+            indices, scores = self.rechercher(requete, k)
+        return self.documents(indices[0], scores[0])
+
+    def as_retriever(self, search_kwargs=None, hybride=None, **kwargs):
+        """
+        Retriever LangChain branché sur cet index : hybride par défaut si l'index BM25 existe.
+        """
+        if hybride is None:
+            hybride = self.bm25 is not None
+        classe = RetrieverHybride if hybride else RetrieverVectoriel
+        return classe(index=self, **(search_kwargs or {}), **kwargs)
+
+    # ------------------------------------------------------------------
+    # Sauvegarde / chargement (sans pickle)
+    # ------------------------------------------------------------------
+    def save_local(self, path):
+        """
+        Sauvegarde l'index : vecteurs.npy, metadonnees.arrow, ivf_*.npy, bm25_*.npy, graphe_*.npy,
+        idf_local.npy (backend local), index.json.
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vecteurs.npy"), np.ascontiguousarray(self.vecteurs))
+        table = pa.Table.from_pandas(self.metadonnees, preserve_index=False)
+        with pa.OSFile(os.path.join(path, "metadonnees.arrow"), "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        if self.ivf is not None:
+            self.sauvegarder_ivf(path)
+        if self.bm25 is not None:
+            self.bm25.save(path)
+        if self.graphe is not None:
+            self.graphe.save(path)
+        if hasattr(self.embeddings, "sauvegarder_idf"):
+            self.embeddings.sauvegarder_idf(path)
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "backend": self.backend,
+                "modele": self.modele,
+                "nb_documents": len(self.vecteurs),
+                "dimension": int(self.vecteurs.shape[1]) if self.vecteurs.ndim == 2 else 0,
+                "ivf": self.ivf is not None,
+            }, f, indent=2)
+
+    def sauvegarder_ivf(self, path):
+        """
+        Écrit les tableaux de l'index IVF (ivf_*.npy) dans le dossier de l'index.
+        """
+        for nom, tableau in zip(self.FICHIERS_IVF, self.ivf):
+            np.save(os.path.join(path, f"ivf_{nom}.npy"), np.ascontiguousarray(tableau))
+
+    @classmethod
+    def load_local(cls, path, embeddings=None):
+        """
+        Charge un index sauvegardé ; matrice et métadonnées sont projetées en mémoire (mmap).
+
+        Raises:
+            FileNotFoundError: Si l'index n'existe pas
+            ValueError: Si l'index a été construit avec un autre backend que `embeddings`
+        """
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+            description = json.load(f)
+        if embeddings is not None:
+            if hasattr(embeddings, "charger_idf"):
+                # Copie propre à cet index : l'IDF d'une autre version ne
+                # modifie pas le modèle partagé par les sessions en cours
+                embeddings = copy.copy(embeddings).charger_idf(path)
+            verifier_compatibilite(description, embeddings)
+        vecteurs = np.load(os.path.join(path, "vecteurs.npy"), mmap_mode="r")
+        table = ipc.open_file(pa.memory_map(os.path.join(path, "metadonnees.arrow"), "r")).read_all()
+        metadonnees = table.to_pandas(types_mapper=pd.ArrowDtype)
+        ivf = None
+        if description.get("ivf"):
+            ivf = tuple(
+                np.load(os.path.join(path, f"ivf_{nom}.npy"), mmap_mode="r")
+                for nom in cls.FICHIERS_IVF
+            )
+        return cls(vecteurs, metadonnees, embeddings, description.get("modele"), ivf,
+                   backend=description.get("backend"), bm25=IndexBM25.load(path),
+                   graphe=GrapheVoisins.load(path))
+
+
+def construire_ivf_pour_index(path, nb_listes=None):
+    """
+    Construit et enregistre l'index IVF d'un index vectoriel sauvegardé
+    (dossier `path`), puis le déclare dans index.json. Un index qui a moins
+    de documents que de groupes est laissé sans IVF (recherche exacte).
+    """
+    debut = time.perf_counter()
+    index = IndexVectoriel.load_local(path)
+    if len(index) == 0 or len(index) < (nb_listes or 1):
+        print(f"Index IVF : {len(index)} documents pour {nb_listes} groupes, recherche exacte conservée")
+        return index
+    index.construire_ivf(nb_listes)
+    index.sauvegarder_ivf(path)
+    chemin = os.path.join(path, "index.json")
+    with open(chemin, encoding="utf-8") as f:
+        description = json.load(f)
+    description["ivf"] = True
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(description, f, indent=2)
+    print(f"Index IVF : {len(index.ivf[0])} groupes, {time.perf_counter() - debut:.1f} s")
+    return index
+
+
+class EcrivainIndex:
+    """
+    Écrit un index vectoriel sur disque lot par lot.
+
+    Les vecteurs sont ajoutés à un fichier brut puis convertis en vecteurs.npy
+    à la fin ; les métadonnées sont écrites en lots Arrow et les fréquences de
+    termes accumulées pour l'index BM25 (creuses). La mémoire utilisée par les
+    vecteurs est bornée par la taille d'un lot, pas par celle du catalogue.
+    """
+
+    def __init__(self, path, modele=None, backend=None):
+        self.path = path
+        self.modele = modele
+        self.backend = backend
+        self.nb_documents = 0
+        self.dimension = None
+        os.makedirs(path, exist_ok=True)
+        self._brut = open(os.path.join(path, "vecteurs.f32.tmp"), "wb")
+        self._sink = None
+        self._writer = None
+        self._schema = None
+        self._bm25 = ConstructeurBM25()
+
+    def ajouter(self, vecteurs, documents):
+        """
+        Ajoute un lot de documents et leurs embeddings.
+        """
+        vecteurs = normaliser(vecteurs)
+        if self.dimension is None:
+            self.dimension = vecteurs.shape[1]
+        self._brut.write(np.ascontiguousarray(vecteurs).tobytes())
+
+        metadonnees = [dict(doc.metadata, page_content=doc.page_content) for doc in documents]
+        if self._writer is None:
+            table = pa.Table.from_pylist(metadonnees)
+            # Colonnes entièrement vides dans le premier lot : typées en texte
+            self._schema = pa.schema([
+                pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema
+            ])
+            self._sink = pa.OSFile(os.path.join(self.path, "metadonnees.arrow"), "wb")
+            self._writer = ipc.new_file(self._sink, self._schema)
+        self._writer.write_table(pa.Table.from_pylist(metadonnees, schema=self._schema))
+        self._bm25.ajouter([texte_bm25(doc.metadata) for doc in documents])
+        self.nb_documents += len(documents)
+
+    def terminer(self, taille_bloc=65536):
+        """
+        Finalise l'index : vecteurs.npy (copié par blocs depuis le fichier brut), bm25_*.npy et index.json.
+        """
+        self._brut.close()
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+        chemin_brut = os.path.join(self.path, "vecteurs.f32.tmp")
+        forme = (self.nb_documents, self.dimension or 0)
+        sortie = np.lib.format.open_memmap(
+            os.path.join(self.path, "vecteurs.npy"), mode="w+", dtype=np.float32, shape=forme
+        )
+        if self.nb_documents:
+            brut = np.memmap(chemin_brut, dtype=np.float32, mode="r", shape=forme)
+            for i in range(0, self.nb_documents, taille_bloc):
+                sortie[i : i + taille_bloc] = brut[i : i + taille_bloc]
+            del brut
+        sortie.flush()
+        del sortie
+        os.remove(chemin_brut)
+        self._bm25.terminer().save(self.path)
+
+        with open(os.path.join(self.path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "backend": self.backend,
+                "modele": self.modele,
+                "nb_documents": self.nb_documents,
+                "dimension": forme[1],
+                "ivf": False,
+            }, f, indent=2)
+
+
+class RetrieverVectoriel(BaseRetriever):
+    """
+    Retriever LangChain au-dessus d'un IndexVectoriel.
+    """
+
+    index: Any
+    k: int = 3
+    nb_sondes: Optional[int] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.index.similarity_search(query, k=self.k, nb_sondes=self.nb_sondes)
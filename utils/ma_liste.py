@@ -0,0 +1,132 @@
+"""
+"Ma Liste" et page d'accueil personnalisée
+
+1. Ma Liste : les films mis de côté par chaque utilisateur sont enregistrés
+   dans SQLite (table `ma_liste`, une ligne par couple utilisateur / film),
+   donc conservés d'une session et d'un redémarrage à l'autre.
+
+2. Profil : moyenne normalisée des embeddings (index vectoriel) des films
+   de la liste d'un utilisateur.
+
+3. Classement : pour chaque cible, un réservoir de candidats est préparé une
+   fois par version du catalogue et de l'index vectoriel (les `taille_pool`
+   films les mieux notés de la cible), avec leurs vecteurs empilés dans une
+   seule matrice contiguë. Classer la page d'accueil d'un utilisateur se
+   réduit à un produit matrice-vecteur (réservoirs x profil) puis à un
+   top-k par cible : aussi rapide que le tirage aléatoire.
+"""
+
+import time
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ma_liste (
+    utilisateur TEXT NOT NULL,
+    id_tmdb INTEGER NOT NULL,
+    ajoute_le REAL NOT NULL,
+    PRIMARY KEY (utilisateur, id_tmdb)
+) WITHOUT ROWID
+"""
+TAILLE_POOL = 300
+
+
+def creer_schema(conn):
+    conn.execute(SCHEMA)
+
+
+def lister(conn, utilisateur):
+    """
+    id_tmdb de la liste d'un utilisateur, du plus récent au plus ancien.
+    """
+    lignes = conn.execute(
+        "SELECT id_tmdb FROM ma_liste WHERE utilisateur = ? ORDER BY ajoute_le DESC", (utilisateur,)
+    )
+    return [id_tmdb for (id_tmdb,) in lignes]
+
+
+def ajouter(conn, utilisateur, id_tmdb):
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO ma_liste (utilisateur, id_tmdb, ajoute_le) VALUES (?, ?, ?)",
+            (utilisateur, int(id_tmdb), time.time()),
+        )
+
+
+def retirer(conn, utilisateur, id_tmdb):
+    with conn:
+        conn.execute("DELETE FROM ma_liste WHERE utilisateur = ? AND id_tmdb = ?", (utilisateur, int(id_tmdb)))
+
+
+class PoolsAccueil:
+    """
+    Réservoirs de candidats par cible et leurs vecteurs, pour classer la page d'accueil.
+    """
+
+    def __init__(self, noms, offsets, ids, vecteurs, graphe, vecteurs_index):
+        self.noms = noms                    # cibles, dans l'ordre de Catalogue.index_cibles
+        self.offsets = offsets              # réservoir de noms[i] : lignes offsets[i]:offsets[i + 1]
+        self.ids = ids                      # id_tmdb de chaque candidat
+        self.vecteurs = vecteurs            # (nb_candidats, d) float32 contigu, lignes normalisées
+        self.graphe = graphe                # GrapheVoisins : id_tmdb -> ligne de l'index vectoriel
+        self.vecteurs_index = vecteurs_index
+
+    @classmethod
+    def construire(cls, catalogue, graphe, vecteurs_index, taille_pool=TAILLE_POOL):
+        """
+        Args:
+            catalogue: Catalogue partagé, ou BaseCatalogue (backend sqlite)
+            graphe: GrapheVoisins (utils/voisins.py), pour retrouver le vecteur d'un film
+            vecteurs_index: Matrice de l'index vectoriel (projetée en mémoire)
+        """
+        def dans_index(ids):
+            # Seuls les films présents dans l'index vectoriel peuvent être classés
+            if not len(graphe.ids):
+                return np.zeros(len(ids), dtype=bool)
+            j = np.minimum(np.searchsorted(graphe.ids, ids), len(graphe.ids) - 1)
+            return graphe.ids[j] == ids
+
+        noms, ids, offsets = [], [], [0]
+        for cible, candidats in catalogue.meilleurs_par_cible(taille_pool, filtre=dans_index):
+            noms.append(cible)
+            ids.append(candidats)
+            offsets.append(offsets[-1] + len(candidats))
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+        lignes = np.asarray(graphe.lignes)[np.searchsorted(graphe.ids, ids)]
+        vecteurs = np.ascontiguousarray(vecteurs_index[lignes], dtype=np.float32)
+        return cls(noms, np.array(offsets, dtype=np.int64), ids, vecteurs, graphe, vecteurs_index)
+
+    def profil(self, ids_liste):
+        """
+        Vecteur profil (normalisé) d'une liste de films, ou None si aucun n'a de vecteur.
+        """
+        lignes = [self.graphe.lignes[i] for i in map(self.graphe.position, ids_liste) if i is not None]
+        if not lignes:
+            return None
+        profil = np.asarray(self.vecteurs_index[lignes], dtype=np.float32).mean(axis=0)
+        return profil / max(float(np.linalg.norm(profil)), 1e-12)
+
+    def classer(self, ids_liste, nb_films=5, nb_cibles=None):
+        """
+        Meilleurs candidats de chaque cible pour le profil de la liste, hors films déjà dans la liste.
+
+        Returns:
+            dict: cible -> [id_tmdb] classés, ou None sans profil
+        """
+        profil = self.profil(ids_liste)
+        if profil is None:
+            return None
+        scores = self.vecteurs @ profil
+        scores[np.isin(self.ids, np.asarray(list(ids_liste), dtype=np.int64))] = -np.inf
+
+        classement = {}
+        for i, cible in enumerate(self.noms[:nb_cibles]):
+            debut, fin = int(self.offsets[i]), int(self.offsets[i + 1])
+            bloc = scores[debut:fin]
+            n = min(nb_films, int(np.isfinite(bloc).sum()))
+            if n == 0:
+                continue
+            meilleurs = np.argpartition(-bloc, n - 1)[:n]
+            meilleurs = meilleurs[np.argsort(-bloc[meilleurs], kind="stable")]
+            classement[cible] = self.ids[debut + meilleurs].tolist()
+        return classement
@@ -0,0 +1,160 @@
+"""
+Mémoire de conversation bornée pour l'assistant
+
+L'historique complet de la session n'est plus renvoyé au LLM à chaque tour.
+La mémoire d'une session (seule source de vérité, dans st.session_state) se
+compose de :
+
+1. Une fenêtre glissante des derniers tours (question, réponse), transmis
+   tels quels.
+
+2. Un résumé extractif des tours plus anciens : pour chaque tour sorti de la
+   fenêtre, la question et les films proposés (titres `### 🎬` de la réponse),
+   ou à défaut la première phrase de la réponse. Aucun appel au LLM.
+
+Le tout est plafonné par un budget de tokens : les tours les plus anciens
+quittent la fenêtre, puis les lignes les plus anciennes du résumé sont
+oubliées, jusqu'à respecter le budget.
+
+Les tokens sont estimés (≈ 4 caractères par token) : l'ordre de grandeur
+suffit pour borner le prompt, sans dépendre du tokenizer du modèle.
+
+`MesurePrompt` relève la taille réelle des prompts envoyés au LLM à chaque tour.
+"""
+
+import logging
+import math
+import re
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+logger = logging.getLogger(__name__)
+
+CARACTERES_PAR_TOKEN = 4
+
+
+def compter_tokens(texte):
+    """
+    Estimation du nombre de tokens d'un texte.
+    """
+    return math.ceil(len(texte) / CARACTERES_PAR_TOKEN) if texte else 0
+
+
+def resumer_tour(question, reponse, longueur_max=200):
+    """
+    Résumé extractif d'un tour : la question et les films proposés.
+    """
+    films = re.findall(r"^#+\s*🎬\s*(.+?)\s*$", reponse, flags=re.MULTILINE)
+    if films:
+        retenu = "films proposés : " + ", ".join(films)
+    else:
+        premiere_phrase = re.split(r"(?<=[.!?])\s", reponse.strip(), maxsplit=1)[0]
+        retenu = premiere_phrase
+    ligne = f"- Question : {question.strip()} → {retenu}"
+    return ligne if len(ligne) <= longueur_max else ligne[: longueur_max - 1] + "…"
+
+
+class MemoireConversation:
+    """
+    Fenêtre glissante des derniers tours + résumé des plus anciens, sous un budget de tokens.
+    """
+
+    def __init__(self, budget_tokens=1500, nb_tours_max=6, part_resume=0.3):
+        self.budget_tokens = budget_tokens
+        self.nb_tours_max = nb_tours_max
+        self.budget_resume = int(budget_tokens * part_resume)
+        self.tours = []       # [(question, réponse)], du plus ancien au plus récent
+        self.resume = []      # lignes du résumé des tours sortis de la fenêtre
+        self.nb_tours = 0     # nombre total de tours de la session
+
+    def __len__(self):
+        return self.nb_tours
+
+    @property
+    def derniere_reponse(self):
+        return self.tours[-1][1] if self.tours else None
+
+    def tokens(self):
+        """
+        Tokens estimés de l'historique transmis au LLM (résumé + fenêtre).
+        """
+        return sum(compter_tokens(l) for l in self.resume) + sum(
+            compter_tokens(q) + compter_tokens(r) for q, r in self.tours
+        )
+
+    def ajouter(self, question, reponse):
+        """
+        Ajoute un tour puis compacte la mémoire pour respecter la fenêtre et le budget.
+        """
+        self.tours.append((question, reponse))
+        self.nb_tours += 1
+        # Le dernier tour reste toujours dans la fenêtre (questions de suivi)
+        while len(self.tours) > 1 and (len(self.tours) > self.nb_tours_max or self.tokens() > self.budget_tokens):
+            self.resume.append(resumer_tour(*self.tours.pop(0)))
+        while self.resume and (
+            sum(compter_tokens(l) for l in self.resume) > self.budget_resume or self.tokens() > self.budget_tokens
+        ):
+            self.resume.pop(0)
+
+    def messages(self):
+        """
+        Historique au format messages LangChain, à passer en `chat_history`.
+        """
+        messages = []
+        if self.resume:
+            messages.append(SystemMessage(content="Résumé des échanges précédents :\n" + "\n".join(self.resume)))
+        for question, reponse in self.tours:
+            messages.append(HumanMessage(content=question))
+            messages.append(AIMessage(content=reponse))
+        return messages
+
+    def paires(self):
+        """
+        Historique sous forme de paires (question, réponse), résumé compris (empreinte du cache).
+        """
+        return ([("résumé", "\n".join(self.resume))] if self.resume else []) + list(self.tours)
+
+
+class MesurePrompt(BaseCallbackHandler):
+    """
+    Callback LangChain qui mesure les prompts envoyés au LLM pendant un tour.
+    """
+
+    def __init__(self):
+        self.appels = []
+        self.tokens_contexte = 0
+        self.tokens_economises = 0
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.appels.extend(compter_tokens(p) for p in prompts)
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        for liste in messages:
+            self.appels.append(sum(compter_tokens(str(m.content)) for m in liste))
+
+    def on_retriever_end(self, documents, **kwargs):
+        # Documents compactés par utils/contexte.py : taille avant / après
+        for document in documents:
+            if "tokens" in document.metadata:
+                self.tokens_contexte += document.metadata["tokens"]
+                self.tokens_economises += document.metadata["tokens_origine"] - document.metadata["tokens"]
+
+    def rapport(self, memoire, question):
+        """
+        Mesures du tour en cours (avant `memoire.ajouter`) : tokens de l'historique,
+        de la question, du contexte et des prompts envoyés.
+        """
+        mesures = {
+            "tour": memoire.nb_tours + 1,
+            "tokens_historique": memoire.tokens(),
+            "tours_fenetre": len(memoire.tours),
+            "lignes_resume": len(memoire.resume),
+            "tokens_question": compter_tokens(question),
+            "tokens_contexte": self.tokens_contexte,
+            "tokens_economises": self.tokens_economises,
+            "appels_llm": len(self.appels),
+            "tokens_prompts": sum(self.appels),
+        }
+        logger.info("Taille des prompts : %s", mesures)
+        return mesures
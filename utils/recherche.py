@@ -0,0 +1,187 @@
+"""
+Index de recherche floue sur les titres de films
+
+Au lieu de comparer la requête à chaque titre du catalogue (parcours linéaire
+de fuzzywuzzy), on construit une fois par version du catalogue :
+
+1. Normalisation : titres en minuscules, sans accents ni ponctuation,
+   puis dédoublonnés (un titre normalisé -> ses id_tmdb).
+
+2. Index inversé de n-grammes : chaque trigramme de caractères pointe vers
+   les titres qui le contiennent (tableaux triés, recherche par searchsorted).
+
+3. Présélection puis score : les titres qui partagent le plus de trigrammes
+   (pondérés par leur rareté) forment une courte liste, notée en lot par
+   rapidfuzz. Le coût d'une requête dépend de la longueur des listes de ses
+   trigrammes et de la taille de la présélection, pas du nombre de titres
+   du catalogue.
+"""
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+TAILLE_NGRAMME = 3
+
+
+def normaliser_titre(titre):
+    """
+    Met un titre sous forme canonique : minuscules, sans accents ni ponctuation.
+    """
+    texte = unicodedata.normalize("NFKD", str(titre))
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    return re.sub(r"[\W_]+", " ", texte.lower()).strip()
+
+
+def ngrammes(texte, n=TAILLE_NGRAMME):
+    """
+    Ensemble des n-grammes de caractères d'un texte normalisé.
+
+    Le texte est entouré d'espaces pour que les débuts de mots et les
+    requêtes courtes produisent aussi des n-grammes.
+    """
+    texte = f"{' ' * (n - 1)}{texte} "
+    return {texte[i : i + n] for i in range(len(texte) - n + 1)}
+
+
+class IndexRecherche:
+    """
+    Index inversé de trigrammes sur les titres normalisés et dédoublonnés.
+    """
+
+    def __init__(self, titres, titres_normalises, ids_offsets, ids_valeurs,
+                 grammes, grammes_offsets, postings):
+        # Un élément par titre normalisé unique (tableaux de chaînes Arrow)
+        self.titres = titres                        # titre affiché
+        self.titres_normalises = titres_normalises  # titre normalisé
+        self.ids_offsets = ids_offsets              # id_tmdb du titre i : ids_valeurs[ids_offsets[i]:ids_offsets[i+1]]
+        self.ids_valeurs = ids_valeurs
+        # Index inversé : titres contenant grammes[g] : postings[grammes_offsets[g]:grammes_offsets[g+1]]
+        self.grammes = grammes
+        self.grammes_offsets = grammes_offsets
+        self.postings = postings
+        nb_documents = np.diff(grammes_offsets)
+        self.idf = np.log1p(len(titres) / np.maximum(nb_documents, 1)).astype(np.float32)
+
+    @classmethod
+    def construire(cls, titres, ids):
+        """
+        Construit l'index à partir des colonnes `title` et `id_tmdb` du catalogue.
+
+        Args:
+            titres: Titres des films (une entrée par ligne du catalogue)
+            ids: id_tmdb correspondants
+        """
+        titres = pd.Series(titres, dtype=object).fillna("").astype(str).to_numpy()
+        ids = np.asarray(ids, dtype=np.int64)
+
+        normalises = np.array([normaliser_titre(t) for t in titres], dtype=object)
+        codes, uniques = pd.factorize(normalises)
+        premiers = pd.Series(np.arange(len(codes))).groupby(codes).first().to_numpy()
+
+        # Titre normalisé -> id_tmdb distincts, stockés à plat avec des offsets
+        paires = pd.DataFrame({"code": codes, "id": ids}).drop_duplicates()
+        paires = paires.sort_values("code", kind="stable")
+        ids_offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+        ids_offsets[1:] = np.cumsum(np.bincount(paires["code"].to_numpy(), minlength=len(uniques)))
+
+        # Index inversé trigramme -> titres
+        liste_grammes, liste_titres = [], []
+        for i, titre in enumerate(uniques):
+            for gramme in ngrammes(titre):
+                liste_grammes.append(gramme)
+                liste_titres.append(i)
+        liste_grammes = np.array(liste_grammes, dtype=f"<U{TAILLE_NGRAMME}")
+        ordre = np.argsort(liste_grammes, kind="stable")
+        grammes, comptes = np.unique(liste_grammes[ordre], return_counts=True)
+        grammes_offsets = np.zeros(len(grammes) + 1, dtype=np.int64)
+        grammes_offsets[1:] = np.cumsum(comptes)
+
+        return cls(
+            titres=pa.array(titres[premiers], type=pa.string()),
+            titres_normalises=pa.array(uniques, type=pa.string()),
+            ids_offsets=ids_offsets,
+            ids_valeurs=paires["id"].to_numpy(dtype=np.int64),
+            grammes=grammes,
+            grammes_offsets=grammes_offsets,
+            postings=np.asarray(liste_titres, dtype=np.int32)[ordre],
+        )
+
+    def __len__(self):
+        return len(self.titres)
+
+    def ids(self, i):
+        """
+        id_tmdb des films portant le titre normalisé d'indice i.
+        """
+        return self.ids_valeurs[self.ids_offsets[i] : self.ids_offsets[i + 1]].tolist()
+
+    def candidats(self, requete_normalisee, taille=200):
+        """
+        Présélectionne les titres partageant le plus de trigrammes avec la requête.
+
+        Returns:
+            np.ndarray: Indices des titres candidats
+        """
+        grammes = np.array(sorted(ngrammes(requete_normalisee)), dtype=f"<U{TAILLE_NGRAMME}")
+        if len(self.grammes) == 0:
+            return np.empty(0, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.grammes, grammes), len(self.grammes) - 1)
+        trouves = positions[self.grammes[positions] == grammes]
+        if len(trouves) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        debuts = self.grammes_offsets[trouves]
+        fins = self.grammes_offsets[trouves + 1]
+        titres = np.concatenate([self.postings[d:f] for d, f in zip(debuts, fins)])
+        poids = np.repeat(self.idf[trouves], fins - debuts)
+        # Scores des seuls titres touchés par les listes de la requête, jamais
+        # d'un tableau de la taille du catalogue
+        touches, inverse = np.unique(titres, return_inverse=True)
+        scores = np.bincount(inverse, weights=poids)
+
+        taille = min(taille, len(touches))
+        meilleurs = np.argpartition(-scores, taille - 1)[:taille]
+        return touches[meilleurs].astype(np.int64)
+
+    def rechercher(self, requete, limite=10, seuil=70, taille_candidats=200):
+        """
+        Recherche floue d'un titre.
+
+        Args:
+            requete (str): Texte saisi par l'utilisateur
+            limite (int): Nombre maximal de titres retournés
+            seuil (int): Score minimal (0-100) pour garder un titre
+            taille_candidats (int): Taille de la présélection par trigrammes
+
+        Returns:
+            list: Tuples (titre, score, [id_tmdb]) triés par score décroissant
+        """
+        requete_normalisee = normaliser_titre(requete)
+        if not requete_normalisee:
+            return []
+
+        candidats = self.candidats(requete_normalisee, taille_candidats)
+        if len(candidats) == 0:
+            return []
+
+        # Score en lot (rapidfuzz, implémenté en C) sur la seule présélection ;
+        # importé à la première recherche, pas au chargement des pages
+        from rapidfuzz import fuzz, process
+
+        matches = process.extract(
+            requete_normalisee,
+            self.titres_normalises.take(pa.array(candidats)).to_pylist(),
+            scorer=fuzz.WRatio,
+            processor=None,
+            limit=limite,
+            score_cutoff=seuil,
+        )
+        resultats = []
+        for _, score, j in matches:
+            i = int(candidats[j])
+            resultats.append((self.titres[i].as_py(), score, self.ids(i)))
+        return resultats
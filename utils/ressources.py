@@ -0,0 +1,402 @@
+"""
+Registre des ressources partagées du processus
+
+Les objets lourds (catalogue, modèle d'embedding, index vectoriel, graphe
+des voisins, réservoirs de la page d'accueil, pools de connexions SQLite,
+client HTTP, LLM, chaîne de conversation, cache des réponses) sont construits
+une seule fois par processus serveur, au premier usage, puis partagés par
+toutes les sessions.
+Une session ne garde dans st.session_state que ses données propres (mémoire
+de conversation, page courante...) : la mémoire du serveur reste stable
+quand le nombre de sessions augmente.
+
+1. Construction paresseuse et thread-safe : chaque ressource a son verrou ;
+   deux sessions qui la demandent en même temps n'en construisent qu'une.
+
+2. Version : une ressource peut déclarer une fonction de version (signature
+   du CSV, dossier d'artefacts courant...) ; elle est reconstruite quand la
+   version change. Une ressource qui tient des fichiers ou des connexions
+   ouverts (pools SQLite) déclare aussi une fonction de fermeture, appelée
+   sur l'ancienne instance quand elle est remplacée ou oubliée.
+
+3. Rapport mémoire : pour chaque ressource, durée de construction,
+   variation de la mémoire résidente du processus pendant la construction
+   et taille des tableaux NumPy qu'elle contient (privés ou projetés depuis
+   un fichier, donc partagés entre processus).
+
+Utilisation :
+    python -m utils.ressources                      # catalogue, embeddings, index vectoriel
+    python -m utils.ressources catalogue vectorstore
+"""
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+
+def memoire_residente():
+    """
+    Mémoire résidente du processus en octets (Linux), ou None.
+    """
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def taille_tableaux(objet, profondeur=3, _vus=None):
+    """
+    Octets des tableaux NumPy et DataFrames contenus dans un objet (attributs, tuples, dict).
+
+    Returns:
+        dict: {"prives": octets en mémoire, "projetes": octets projetés depuis un fichier}
+    """
+    _vus = set() if _vus is None else _vus
+    tailles = {"prives": 0, "projetes": 0}
+    if id(objet) in _vus or profondeur < 0:
+        return tailles
+    _vus.add(id(objet))
+
+    if isinstance(objet, np.ndarray):
+        tailles["projetes" if isinstance(objet, np.memmap) else "prives"] += objet.nbytes
+        return tailles
+    if hasattr(objet, "memory_usage"):  # DataFrame
+        tailles["prives"] += int(objet.memory_usage(index=True, deep=False).sum())
+        return tailles
+    if isinstance(objet, dict):
+        enfants = objet.values()
+    elif isinstance(objet, (list, tuple)):
+        enfants = objet
+    elif hasattr(objet, "__dict__"):
+        enfants = vars(objet).values()
+    else:
+        return tailles
+    for enfant in enfants:
+        for cle, octets in taille_tableaux(enfant, profondeur - 1, _vus).items():
+            tailles[cle] += octets
+    return tailles
+
+
+class Registre:
+    """
+    Ressources partagées, construites au premier usage.
+    """
+
+    def __init__(self):
+        self._fabriques = {}   # nom -> (fabrique, version)
+        self._fermetures = {}  # nom -> fermeture de l'instance remplacée
+        self._instances = {}   # nom -> (version, objet)
+        self._mesures = {}     # nom -> mesures de la dernière construction
+        self._verrous = {}
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, nom, fabrique, version=None, fermer=None):
+        """
+        Déclare une ressource : `fabrique()` la construit, `version()` (optionnelle)
+        l'invalide et `fermer(objet)` (optionnelle) libère une instance remplacée ou oubliée.
+        """
+        with self._verrou:
+            self._fabriques[nom] = (fabrique, version)
+            if fermer is not None:
+                self._fermetures[nom] = fermer
+            self._verrous.setdefault(nom, threading.RLock())
+
+    def obtenir(self, nom):
+        """
+        Ressource partagée `nom`, construite si besoin.
+
+        Raises:
+            KeyError: Si la ressource n'est pas enregistrée
+        """
+        fabrique, version = self._fabriques[nom]
+        cle = version() if version else None
+        instance = self._instances.get(nom)
+        if instance is not None and instance[0] == cle:
+            return instance[1]
+
+        with self._verrous[nom]:
+            instance = self._instances.get(nom)
+            if instance is not None and instance[0] == cle:
+                return instance[1]
+            rss_avant = memoire_residente()
+            debut = time.perf_counter()
+            objet = fabrique()
+            rss_apres = memoire_residente()
+            self._instances[nom] = (cle, objet)
+            if instance is not None:
+                self._fermer(nom, instance[1])
+            self._mesures[nom] = {
+                "secondes": time.perf_counter() - debut,
+                "rss_construction": None if rss_avant is None else rss_apres - rss_avant,
+                "version": cle,
+            }
+            logger.info("Ressource '%s' construite en %.2f s", nom, self._mesures[nom]["secondes"])
+            return objet
+
+    def construite(self, nom):
+        return nom in self._instances
+
+    def oublier(self, nom=None):
+        """
+        Retire une ressource (ou toutes) : elle sera reconstruite au prochain usage.
+        """
+        with self._verrou:
+            retirees = []
+            for cle in [nom] if nom else list(self._instances):
+                instance = self._instances.pop(cle, None)
+                self._mesures.pop(cle, None)
+                if instance is not None:
+                    retirees.append((cle, instance[1]))
+        for cle, objet in retirees:
+            self._fermer(cle, objet)
+
+    def _fermer(self, nom, objet):
+        fermer = self._fermetures.get(nom)
+        if fermer is None:
+            return
+        try:
+            fermer(objet)
+        except Exception:
+            logger.exception("Fermeture de la ressource '%s' impossible", nom)
+
+    def rapport(self):
+        """
+        Mémoire utilisée par chaque ressource.
+
+        Returns:
+            list: Un dict par ressource enregistrée (nom, construite, secondes,
+            rss_construction, tableaux_prives, tableaux_projetes), plus la
+            mémoire résidente totale du processus sous le nom "processus".
+            La durée et la variation de RSS d'une ressource incluent celles des
+            ressources construites pour elle (la chaîne inclut l'index vectoriel).
+        """
+        lignes = []
+        for nom in self._fabriques:
+            ligne = {"nom": nom, "construite": nom in self._instances}
+            if ligne["construite"]:
+                tailles = taille_tableaux(self._instances[nom][1])
+                ligne.update(self._mesures.get(nom, {}))
+                ligne.update(tableaux_prives=tailles["prives"], tableaux_projetes=tailles["projetes"])
+            lignes.append(ligne)
+        lignes.append({"nom": "processus", "construite": True, "rss": memoire_residente()})
+        return lignes
+
+
+# ----------------------------------------------------------------------
+# Ressources de MovieMind
+# ----------------------------------------------------------------------
+def _client_http():
+    import httpx
+
+    # Connexions réutilisées (keep-alive) entre les tours et les sessions
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        timeout=httpx.Timeout(60.0, connect=10.0),
+    )
+
+
+def _embeddings():
+    from utils.config import EMBEDDINGS_BACKEND
+    from utils.embeddings import creer_embeddings
+
+    if EMBEDDINGS_BACKEND != "openai":
+        # Backend local : même IDF que l'index vectoriel courant
+        embeddings = creer_embeddings(EMBEDDINGS_BACKEND)
+        if hasattr(embeddings, "charger_idf"):
+            embeddings.charger_idf(_dossier_vectorstore())
+        return embeddings
+    openai_api_key = st.secrets["OPENAI_API_KEY"]
+    if not openai_api_key:
+        raise ValueError("OPENAI_API_KEY non trouvée dans les variables d'environnement")
+    return creer_embeddings("openai", api_key=openai_api_key, http_client=get_registre().obtenir("client_http"))
+
+
+def _vectorstore():
+    from utils.vectorestore import load_vectorstore
+
+    return load_vectorstore(embeddings=get_registre().obtenir("embeddings"))
+
+
+_courant = {"signature": None, "dossier": None}
+
+
+def _version_vectorstore():
+    """
+    Dossier d'artefacts courant. Le fichier COURANT n'est relu que si sa
+    signature (inode, date, taille) a changé : un simple stat par appel.
+    """
+    from utils.artefacts import ARTEFACTS_DIR, FICHIER_COURANT, dossier_courant
+
+    try:
+        stat = os.stat(os.path.join(ARTEFACTS_DIR, FICHIER_COURANT))
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        signature = None
+    if signature is None or signature != _courant["signature"]:
+        _courant.update(signature=signature, dossier=dossier_courant())
+    return _courant["dossier"]
+
+
+def _dossier_vectorstore():
+    courant = _version_vectorstore()
+    return os.path.join(courant, "vectorstore") if courant else "data/vectorstore"
+
+
+def _graphe_voisins():
+    from utils.voisins import GrapheVoisins
+
+    return GrapheVoisins.load(_dossier_vectorstore())
+
+
+def _pools_accueil():
+    from utils.ma_liste import PoolsAccueil
+
+    registre = get_registre()
+    graphe = registre.obtenir("graphe_voisins")
+    chemin = os.path.join(_dossier_vectorstore(), "vecteurs.npy")
+    if graphe is None or not os.path.exists(chemin):
+        return None
+    return PoolsAccueil.construire(catalogue_actif(), graphe, np.load(chemin, mmap_mode="r"))
+
+
+def _version_pools_accueil():
+    return _version_catalogue(), _version_vectorstore()
+
+
+def _base_app():
+    from utils import ma_liste
+    from utils.base_sqlite import PoolConnexions
+    from utils.config import BASE_SQLITE
+
+    os.makedirs(os.path.dirname(BASE_SQLITE) or ".", exist_ok=True)
+    pool = PoolConnexions(BASE_SQLITE)
+    # Schéma créé une fois par processus, pas à chaque lecture de "Ma Liste"
+    with pool.connexion() as conn:
+        ma_liste.creer_schema(conn)
+    return pool
+
+
+def _base_catalogue():
+    from utils.base_sqlite import ouvrir_base_catalogue
+
+    return ouvrir_base_catalogue()
+
+
+def _llm():
+    from langchain_groq import ChatGroq
+
+    groq_api_key = st.secrets["GROQ_API_KEY"]
+    if not groq_api_key:
+        raise ValueError("GROQ_API_KEY non trouvée dans les variables d'environnement")
+    return ChatGroq(
+        api_key=groq_api_key,
+        temperature=0.7,  # Contrôle la créativité des réponses (0=conservateur, 1=créatif)
+        model="llama-3.3-70b-versatile",
+        streaming=True,
+        http_client=get_registre().obtenir("client_http"),
+    )
+
+
+def _cache_reponses():
+    from utils.cache_reponses import CacheReponses
+    from utils.config import CACHE_REPONSES_SEUIL, CACHE_REPONSES_TAILLE, CACHE_REPONSES_TTL
+
+    return CacheReponses(CACHE_REPONSES_TAILLE, CACHE_REPONSES_TTL, CACHE_REPONSES_SEUIL)
+
+
+def _chaine():
+    from utils.chatbot import get_conversation_chain
+
+    vectorstore = get_registre().obtenir("vectorstore")
+    return get_conversation_chain(vectorstore) if vectorstore is not None else None
+
+
+def _version_catalogue():
+    from utils.catalogue import CSV_PATH, signature_fichier
+
+    return signature_fichier(CSV_PATH)
+
+
+def _catalogue():
+    from utils.artefacts import charger_ou_construire
+    from utils.catalogue import CSV_PATH
+
+    return charger_ou_construire(CSV_PATH)
+
+
+def catalogue_actif():
+    """
+    Catalogue du backend configuré : artefacts en mémoire ("catalogue") ou
+    base SQLite ("base_catalogue", MOVIEMIND_CATALOGUE_BACKEND=sqlite).
+    Un seul des deux est construit dans le processus.
+    """
+    from utils.config import CATALOGUE_BACKEND
+
+    return get_registre().obtenir("base_catalogue" if CATALOGUE_BACKEND == "sqlite" else "catalogue")
+
+
+@st.cache_resource
+def get_registre():
+    """
+    Registre unique du processus, avec les ressources de l'application.
+    """
+    registre = Registre()
+    registre.enregistrer("catalogue", _catalogue, version=_version_catalogue)
+    registre.enregistrer("client_http", _client_http)
+    # Versionné comme l'index vectoriel : le backend local porte l'IDF de l'index courant
+    registre.enregistrer("embeddings", _embeddings, version=_version_vectorstore)
+    registre.enregistrer("vectorstore", _vectorstore, version=_version_vectorstore)
+    registre.enregistrer("graphe_voisins", _graphe_voisins, version=_version_vectorstore)
+    registre.enregistrer("pools_accueil", _pools_accueil, version=_version_pools_accueil)
+    # Connexions fermées quand la base est remplacée (nouvelle version du CSV)
+    # ou oubliée : les fichiers des anciennes versions peuvent être supprimés
+    registre.enregistrer("base_app", _base_app, fermer=lambda pool: pool.fermer())
+    registre.enregistrer("base_catalogue", _base_catalogue, version=_version_catalogue,
+                         fermer=lambda base: base.fermer())
+    registre.enregistrer("llm", _llm)
+    registre.enregistrer("chaine", _chaine, version=_version_vectorstore)
+    # Vidé avec l'index : les réponses et les vecteurs des questions en dépendent
+    registre.enregistrer("cache_reponses", _cache_reponses, version=_version_vectorstore)
+    return registre
+
+
+def afficher_rapport(rapport):
+    """
+    Affiche le rapport mémoire du registre sous forme de tableau texte.
+    """
+    mo = lambda octets: "-" if octets is None else f"{octets / 2**20:.1f} Mo"
+    print(f"{'ressource':<12} {'construction':>12} {'RSS':>10} {'privé':>10} {'projeté':>10}")
+    for ligne in rapport:
+        if ligne["nom"] == "processus":
+            print(f"{'processus':<12} {'':>12} {mo(ligne['rss']):>10}")
+        elif ligne["construite"]:
+            print(f"{ligne['nom']:<12} {ligne['secondes']:>11.2f}s {mo(ligne['rss_construction']):>10} "
+                  f"{mo(ligne['tableaux_prives']):>10} {mo(ligne['tableaux_projetes']):>10}")
+        else:
+            print(f"{ligne['nom']:<12} {'non construite':>12}")
+
+
+def main():
+    """
+    Construit les ressources demandées et affiche la mémoire utilisée par chacune.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rapport mémoire des ressources partagées de MovieMind")
+    parser.add_argument("ressources", nargs="*", default=["catalogue", "embeddings", "vectorstore"])
+    args = parser.parse_args()
+    registre = get_registre()
+    for nom in args.ressources:
+        registre.obtenir(nom)
+    afficher_rapport(registre.rapport())
+
+
+if __name__ == "__main__":
+    main()
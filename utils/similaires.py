@@ -0,0 +1,168 @@
+"""
+Films similaires calculés à partir du contenu du catalogue
+
+La liste `recommendations` du CSV est figée, résolue par titre, et vide pour
+une partie des films. Ce module calcule hors ligne, pour chaque film
+(id_tmdb distinct), ses `k` plus proches voisins selon :
+
+1. Synopsis : similarité cosinus TF-IDF sur `overview`.
+2. Distribution : acteurs communs (`name_x`), cosinus sur des vecteurs binaires.
+3. Public : cibles communes (un film peut figurer sous plusieurs cibles).
+4. Note : 1 - |écart des notes| / 10 (0 si l'une des notes manque).
+
+Les trois premières composantes sont des matrices creuses normalisées,
+juxtaposées avec la racine de leur poids : un seul produit X_bloc · Xᵀ
+donne leur somme pondérée. Le calcul se fait par blocs de films dont la
+matrice de scores dense tient dans `memoire_bloc` octets : la mémoire reste
+bornée quelle que soit la taille du catalogue.
+
+Résultat : un tableau (nb_films, k) d'entiers int32, la ligne i donnant les
+voisins du i-ème id de `Catalogue.index_ids` (positions dans ce même index,
+-1 si moins de k voisins), et les scores correspondants en float32.
+"""
+
+import logging
+import time
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+NB_VOISINS = 10
+POIDS = {"synopsis": 0.5, "distribution": 0.25, "cibles": 0.15, "note": 0.1}
+MEMOIRE_BLOC = 64 * 2**20
+
+
+def _normaliser_lignes(matrice):
+    normes = np.sqrt(np.asarray(matrice.multiply(matrice).sum(axis=1)).ravel())
+    normes[normes == 0] = 1.0
+    return sparse.diags((1.0 / normes).astype(np.float32)) @ matrice
+
+
+def _binaire(lignes, colonnes, forme):
+    matrice = sparse.csr_matrix(
+        (np.ones(len(lignes), dtype=np.float32), (lignes, colonnes)), shape=forme
+    )
+    matrice.data[:] = 1.0  # doublons (même acteur cité deux fois)
+    return _normaliser_lignes(matrice)
+
+
+def matrice_synopsis(synopsis):
+    """
+    TF-IDF des synopsis, lignes normalisées (L2).
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectoriseur = TfidfVectorizer(
+        strip_accents="unicode", lowercase=True, sublinear_tf=True,
+        max_df=0.5, max_features=100_000, dtype=np.float32,
+    )
+    try:
+        return vectoriseur.fit_transform(synopsis).tocsr()
+    except ValueError:  # vocabulaire vide (catalogue sans synopsis)
+        return sparse.csr_matrix((len(synopsis), 0), dtype=np.float32)
+
+
+def matrice_distribution(colonne, positions):
+    """
+    Film x acteur, binaire normalisée, à partir de la colonne liste `name_x`.
+    """
+    import pyarrow as pa
+    import pandas as pd
+
+    valeurs = colonne.valeurs
+    if pa.types.is_dictionary(valeurs.type):
+        codes, nb_acteurs = np.asarray(valeurs.indices), len(valeurs.dictionary)
+    else:
+        codes, uniques = pd.factorize(np.asarray(valeurs.to_pylist(), dtype=object))
+        nb_acteurs = len(uniques)
+    debuts = np.asarray(colonne.offsets[positions], dtype=np.int64)
+    longueurs = np.asarray(colonne.offsets[positions + 1], dtype=np.int64) - debuts
+    lignes = np.repeat(np.arange(len(positions)), longueurs)
+    selection = np.repeat(debuts - np.concatenate(([0], np.cumsum(longueurs)[:-1])), longueurs)
+    selection += np.arange(len(lignes))
+    return _binaire(lignes, codes[selection], (len(positions), nb_acteurs))
+
+
+def matrice_cibles(cibles, films, nb_films):
+    """
+    Film x cible, binaire normalisée ; `films` donne le film (indice dans
+    index_ids) de chaque ligne du catalogue.
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(np.asarray(cibles, dtype=object))
+    valides = codes >= 0
+    return _binaire(films[valides], codes[valides], (nb_films, len(uniques)))
+
+
+def _top_k(scores, k):
+    """
+    Indices et scores des k meilleurs de chaque ligne, triés par score décroissant.
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((len(scores), 0), dtype=np.int64), np.empty((len(scores), 0), dtype=np.float32)
+    meilleurs = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    valeurs = np.take_along_axis(scores, meilleurs, axis=1)
+    ordre = np.argsort(-valeurs, axis=1, kind="stable")
+    return np.take_along_axis(meilleurs, ordre, axis=1), np.take_along_axis(valeurs, ordre, axis=1)
+
+
+def construire_voisins(catalogue, k=NB_VOISINS, poids=None, memoire_bloc=MEMOIRE_BLOC):
+    """
+    Calcule les k voisins de chaque film du catalogue.
+
+    Returns:
+        tuple: (voisins int32 (nb_films, k), scores float32 (nb_films, k)),
+        lignes dans l'ordre de `catalogue.index_ids`
+    """
+    poids = dict(POIDS, **(poids or {}))
+    debut = time.perf_counter()
+    df = catalogue._df
+    ids, positions = catalogue.index_ids
+    positions = np.asarray(positions, dtype=np.int64)
+    nb_films = len(ids)
+    voisins = np.full((nb_films, k), -1, dtype=np.int32)
+    scores = np.zeros((nb_films, k), dtype=np.float32)
+    if nb_films < 2 or k == 0:
+        return voisins, scores
+
+    blocs = []
+    if "overview" in df.columns and poids["synopsis"] > 0:
+        synopsis = df["overview"].iloc[positions].astype(object).where(lambda s: s.notna(), "").astype(str)
+        blocs.append(np.sqrt(poids["synopsis"]) * matrice_synopsis(synopsis.tolist()))
+    if "name_x" in catalogue.listes and poids["distribution"] > 0:
+        blocs.append(np.sqrt(poids["distribution"]) * matrice_distribution(catalogue.listes["name_x"], positions))
+    if "cibles" in df.columns and poids["cibles"] > 0:
+        films = np.searchsorted(ids, df["id_tmdb"].to_numpy(dtype=np.int64))
+        cibles = df["cibles"].astype(object).where(df["cibles"].notna(), None).to_numpy()
+        blocs.append(np.sqrt(poids["cibles"]) * matrice_cibles(cibles, films, nb_films))
+    x = sparse.hstack(blocs, format="csr", dtype=np.float32) if blocs else None
+    xt = x.T.tocsc() if x is not None else None
+
+    notes = None
+    if "note_moyenne" in df.columns and poids["note"] > 0:
+        notes = df["note_moyenne"].iloc[positions].to_numpy(dtype=np.float32, na_value=np.nan)
+
+    taille_bloc = max(1, memoire_bloc // (4 * nb_films))
+    for debut_bloc in range(0, nb_films, taille_bloc):
+        fin_bloc = min(debut_bloc + taille_bloc, nb_films)
+        if x is not None:
+            bloc = (x[debut_bloc:fin_bloc] @ xt).toarray()
+        else:
+            bloc = np.zeros((fin_bloc - debut_bloc, nb_films), dtype=np.float32)
+        if notes is not None:
+            proximite = 1.0 - np.abs(notes[debut_bloc:fin_bloc, None] - notes[None, :]) / 10.0
+            bloc += poids["note"] * np.nan_to_num(proximite, nan=0.0)
+        # Un film n'est pas son propre voisin
+        bloc[np.arange(fin_bloc - debut_bloc), np.arange(debut_bloc, fin_bloc)] = -np.inf
+        meilleurs, valeurs = _top_k(bloc, k)
+        valides = np.isfinite(valeurs) & (valeurs > 0)
+        voisins[debut_bloc:fin_bloc, : meilleurs.shape[1]] = np.where(valides, meilleurs, -1)
+        scores[debut_bloc:fin_bloc, : meilleurs.shape[1]] = np.where(valides, valeurs, 0.0)
+
+    logger.info("Voisins de %s films calculés en %.1f s (blocs de %s)",
+                nb_films, time.perf_counter() - debut, taille_bloc)
+    return voisins, scores
@@ -15,82 +15,154 @@ utilisable par notre assistant culinaire. Il utilise plusieurs concepts clés :
 """
 
 import pandas as pd
-from langchain_community.vectorstores import DocArrayInMemorySearch
-from langchain_openai import OpenAIEmbeddings
-from langchain.schema import Document
-from typing import List
+from langchain_core.documents import Document
+from typing import Iterator, List
+from itertools import islice
 import os
-from dotenv import load_dotenv
-import pickle
+from utils.config import IVF_LISTES, TAILLE_LOT_EMBEDDINGS as TAILLE_LOT
+from utils.embeddings import creer_embeddings
+from utils.index_vectoriel import EcrivainIndex, IndexVectoriel, construire_ivf_pour_index
+from utils.cache_embeddings import CacheEmbeddings, cle_document, embed_incremental
+from utils.voisins import construire_pour_index
 
-load_dotenv()
-
-def create_vectorstore(texts):
+def create_vectorstore(documents, embeddings=None, taille_lot=TAILLE_LOT, cache=None):
     """
-    Crée un vectorstore DocArrayInMemorySearch à partir des textes donnés
+    Crée l'index vectoriel NumPy (utils/index_vectoriel.py) à partir des documents donnés.
+
+    Les embeddings sont mis en cache par hash de `page_content` (utils/cache_embeddings.py) :
+    seuls les documents nouveaux ou modifiés sont envoyés au modèle, par lots de `taille_lot`.
     """
-    embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
-    vectorstore = DocArrayInMemorySearch.from_texts(texts, embeddings)
-    return vectorstore
+    embeddings = embeddings or creer_embeddings()
+    if hasattr(embeddings, "ajuster"):
+        embeddings.ajuster(doc.page_content for doc in documents)
+    vecteurs, nb_calcules = embed_incremental(
+        [doc.page_content for doc in documents], embeddings, embeddings.modele,
+        cache=cache, taille_lot=taille_lot,
+    )
+    print(f"Embeddings : {nb_calcules} calculés, {len(documents) - nb_calcules} lus depuis le cache")
+    return IndexVectoriel.depuis_vecteurs(vecteurs, documents, embeddings)
 
 def save_vectorstore(vectorstore, path="data/vectorstore"):
     """
     Sauvegarde le vectorstore
     """
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.makedirs(path, exist_ok=True)
     vectorstore.save_local(path)
 
-def load_vectorstore(path="data/vectorstore"):
+def load_vectorstore(path=None, embeddings=None):
     """
-    Charge le vectorstore depuis un fichier
+    Charge le vectorstore depuis un dossier (matrice .npy + métadonnées Arrow, sans pickle).
+    Par défaut : celui des artefacts courants (utils/artefacts.py), sinon data/vectorstore.
+
+    Raises:
+        ValueError: Si l'index a été construit avec un autre backend d'embedding
     """
+    if path is None:
+        from utils.artefacts import dossier_courant
+
+        courant = dossier_courant()
+        path = os.path.join(courant, "vectorstore") if courant else "data/vectorstore"
     try:
-        embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
-        return FAISS.load_local(
-            path, 
-            embeddings,
-            allow_dangerous_deserialization=True  # Ce paramètre permet la désérialisation non sécurisée des données. À utiliser uniquement avec des fichiers de confiance car il peut y avoir des risques de sécurité
-        )
+        return IndexVectoriel.load_local(path, embeddings or creer_embeddings())
     except FileNotFoundError:
         return None
 
-def create_documents_from_csv(csv_path: str) -> List[Document]:
+def iter_documents_csv(csv_path: str, taille_morceau: int = 1000) -> Iterator[Document]:
     """
-    Crée une liste de documents à partir d'un fichier CSV
+    Génère les documents du CSV un par un, en lisant le fichier par morceaux
+    de `taille_morceau` lignes (le catalogue n'est jamais chargé en entier).
     """
-    try:
-        df = pd.read_csv('data/recommendation_dataset.csv')
-        documents = []
-        
-        for _, row in df.iterrows():
+    for morceau in pd.read_csv(csv_path, chunksize=taille_morceau):
+        for row in morceau.to_dict("records"):
             content = f"title: {row['title']}\n\nDescription: {row['overview']}\n\systeme de recommendation: {row['recommendations']}\n\note_moyenne: {row['note_moyenne']}"
             
             metadata = {
+                'id_tmdb': int(row['id_tmdb']),
                 'title': row['title'],
                 'Description': row['overview'],
                 'url': row['URL'] if 'URL' in row else '',
+                'cibles': row['cibles'] if isinstance(row.get('cibles'), str) else '',
+                'note_moyenne': None if pd.isna(row.get('note_moyenne')) else float(row['note_moyenne']),
                 'source': 'Movie_Mind'
             }
             
-            doc = Document(page_content=content, metadata=metadata)
-            documents.append(doc)
-        
-        return documents
+            yield Document(page_content=content, metadata=metadata)
+
+def par_lots(iterable, taille):
+    """
+    Regroupe un itérable en listes de `taille` éléments au plus.
+    """
+    iterateur = iter(iterable)
+    while lot := list(islice(iterateur, taille)):
+        yield lot
+
+def create_documents_from_csv(csv_path: str) -> List[Document]:
+    """
+    Crée une liste de documents à partir d'un fichier CSV
+    """
+    try:
+        return list(iter_documents_csv(csv_path))
     except Exception as e:
         print(f"Erreur lors de la lecture du fichier CSV: {e}")
         return []
 
+def build_vectorstore(csv_path, path="data/vectorstore", embeddings=None, taille_lot=TAILLE_LOT, cache=None,
+                      nb_listes_ivf=IVF_LISTES):
+    """
+    Construit l'index vectoriel en flux : CSV lu par morceaux -> lots de documents
+    -> embeddings (avec cache) -> écriture du lot sur disque, puis le graphe
+    des voisins entre films (utils/voisins.py) et, si nb_listes_ivf > 0,
+    l'index approximatif IVF de `nb_listes_ivf` groupes.
+
+    La mémoire utilisée est bornée par la taille d'un lot, pas par celle du catalogue.
+
+    Returns:
+        int: Nombre de documents indexés
+    """
+    embeddings = embeddings or creer_embeddings()
+    if hasattr(embeddings, "ajuster"):
+        # Backend local : IDF calculée sur le corpus (première lecture du CSV, en flux)
+        embeddings.ajuster(doc.page_content for doc in iter_documents_csv(csv_path, taille_morceau=taille_lot))
+    if getattr(embeddings, "cache", True):
+        cache = cache if cache is not None else CacheEmbeddings(embeddings.modele)
+    ecrivain = EcrivainIndex(path, modele=embeddings.modele, backend=embeddings.nom)
+    nb_calcules = 0
+    cles = set()
+
+    for lot in par_lots(iter_documents_csv(csv_path, taille_morceau=taille_lot), taille_lot):
+        textes = [doc.page_content for doc in lot]
+        vecteurs, nb = embed_incremental(textes, embeddings, embeddings.modele, cache=cache, taille_lot=taille_lot)
+        ecrivain.ajouter(vecteurs, lot)
+        nb_calcules += nb
+        if cache is not None:
+            cles.update(cle_document(texte, embeddings.modele) for texte in textes)
+
+    ecrivain.terminer()
+    if hasattr(embeddings, "sauvegarder_idf"):
+        embeddings.sauvegarder_idf(path)
+    print(f"Embeddings : {nb_calcules} calculés, {ecrivain.nb_documents - nb_calcules} lus depuis le cache")
+    if cache is not None:
+        # Le cache ne garde que les documents de cette construction
+        retirees = cache.compacter(cles)
+        if retirees:
+            print(f"Cache des embeddings : {retirees} entrées obsolètes supprimées")
+    # Graphe des voisins entre films, calculé une fois à partir des vecteurs écrits
+    construire_pour_index(path)
+    if nb_listes_ivf and ecrivain.nb_documents:
+        construire_ivf_pour_index(path, nb_listes_ivf)
+    return ecrivain.nb_documents
+
 def main():
     """
-    Fonction principale
+    Fonction principale : construit l'index vectoriel là où l'application le
+    lit, c'est-à-dire dans les artefacts de la version courante du catalogue
+    (comme `python -m utils.artefacts`).
     """
-    os.makedirs("data/vectorstore", exist_ok=True)
-    
-    documents = create_documents_from_csv("data/recommendation_dataset.csv")
-    texts = [doc.page_content for doc in documents]
-    
-    vectorstore = create_vectorstore(texts)
-    print("Vectorstore FAISS créé avec succès")
+    from utils.artefacts import construire_artefacts
+
+    dossier = construire_artefacts("data/recommendation_dataset.csv", avec_vectorstore=True,
+                                   remplacer=True)
+    print(f"Index vectoriel créé avec succès ({os.path.join(dossier, 'vectorstore')})")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,240 @@
+"""
+Graphe des plus proches voisins entre films, à partir des embeddings
+
+Les vecteurs de l'index vectoriel (un par ligne du catalogue, donc parfois
+plusieurs par film) servent aussi à relier les films entre eux. Un calcul
+hors ligne produit, pour chaque film (id_tmdb distinct), ses `k` voisins les
+plus proches par similarité cosinus. Le graphe est exact (pas d'approximation) :
+
+1. Produits matriciels par blocs : un bloc de films requêtes contre un bloc
+   de films candidats à la fois, en gardant les k meilleurs au fil des
+   blocs ; la mémoire reste bornée par la taille des blocs.
+   Coût : tous les couples de films sont comparés, soit N² · d
+   multiplications-additions pour N films de dimension d (environ 10¹³ pour
+   100 000 films en dimension 1024, quelques minutes sur plusieurs cœurs).
+   Chaque processus garde en mémoire un bloc de scores de taille_bloc²
+   float32 (16 Mio pour 2048).
+
+2. Pool de processus : les blocs de requêtes sont répartis entre plusieurs
+   processus, qui lisent tous la même matrice projetée en mémoire (mmap).
+
+3. Stockage à largeur fixe, à côté de l'index vectoriel :
+   - graphe_ids.npy : id_tmdb distincts triés ;
+   - graphe_lignes.npy : ligne de l'index vectoriel de chaque film ;
+   - graphe_voisins.npy : (nb_films, k) positions dans graphe_ids, -1 si absent ;
+   - graphe_scores.npy : (nb_films, k) similarités cosinus.
+
+"Plus comme celui-ci" (`GrapheVoisins.plus_comme_ca`) n'est ensuite qu'une lecture
+de tableau, sans aucun calcul de similarité.
+
+Le graphe est calculé par la construction des artefacts (python -m
+utils.artefacts), juste après l'index vectoriel. Pour le recalculer seul
+(autre k, index des artefacts courants par défaut) :
+    python -m utils.voisins
+    python -m utils.voisins data/artefacts/<version>/vectorstore --k 20 --processus 4
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+NB_VOISINS = 10
+TAILLE_BLOC = 2048
+
+_VECTEURS = None
+_LIGNES = None
+
+
+def _initialiser(chemin_vecteurs, lignes):
+    global _VECTEURS, _LIGNES
+    _VECTEURS = np.load(chemin_vecteurs, mmap_mode="r")
+    _LIGNES = lignes
+
+
+def _calculer_bloc(debut, fin, k, taille_bloc):
+    """
+    k meilleurs voisins des films [debut, fin) parmi tous les films, par blocs de candidats.
+    """
+    requetes = np.asarray(_VECTEURS[_LIGNES[debut:fin]], dtype=np.float32)
+    lignes = np.arange(fin - debut)
+    meilleurs = np.full((fin - debut, k), -1, dtype=np.int64)
+    scores = np.full((fin - debut, k), -np.inf, dtype=np.float32)
+    for debut_c in range(0, len(_LIGNES), taille_bloc):
+        fin_c = min(debut_c + taille_bloc, len(_LIGNES))
+        bloc = requetes @ np.asarray(_VECTEURS[_LIGNES[debut_c:fin_c]], dtype=np.float32).T
+        # Un film n'est pas son propre voisin
+        propres = lignes + debut - debut_c
+        dans_bloc = (propres >= 0) & (propres < fin_c - debut_c)
+        bloc[lignes[dans_bloc], propres[dans_bloc]] = -np.inf
+
+        candidats = np.concatenate([meilleurs, np.broadcast_to(np.arange(debut_c, fin_c), bloc.shape)], axis=1)
+        valeurs = np.concatenate([scores, bloc], axis=1)
+        garder = np.argpartition(-valeurs, k - 1, axis=1)[:, :k]
+        meilleurs = np.take_along_axis(candidats, garder, axis=1)
+        scores = np.take_along_axis(valeurs, garder, axis=1)
+
+    ordre = np.argsort(-scores, axis=1, kind="stable")
+    meilleurs = np.take_along_axis(meilleurs, ordre, axis=1)
+    scores = np.take_along_axis(scores, ordre, axis=1)
+    absents = ~np.isfinite(scores)
+    meilleurs[absents] = -1
+    scores[absents] = 0.0
+    return debut, meilleurs.astype(np.int32), scores
+
+
+def films_distincts(ids_lignes):
+    """
+    id_tmdb distincts triés et première ligne de chacun dans l'index vectoriel.
+    """
+    return np.unique(np.asarray(ids_lignes, dtype=np.int64), return_index=True)
+
+
+def construire_graphe(chemin_vecteurs, ids_lignes, k=NB_VOISINS, taille_bloc=TAILLE_BLOC, nb_processus=None):
+    """
+    Calcule le graphe exact des k plus proches voisins des films, en
+    comparant tous les couples de films (O(N² · d), voir l'en-tête du module).
+
+    Args:
+        chemin_vecteurs (str): vecteurs.npy de l'index vectoriel (lignes normalisées)
+        ids_lignes: id_tmdb de chaque ligne de l'index vectoriel
+        nb_processus (int): Taille du pool (défaut : nombre de CPU ; 1 = sans pool)
+
+    Returns:
+        GrapheVoisins
+    """
+    ids, lignes = films_distincts(ids_lignes)
+    n = len(ids)
+    k = max(0, min(k, n - 1))
+    voisins = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return GrapheVoisins(ids, lignes, voisins, scores)
+
+    blocs = [(debut, min(debut + taille_bloc, n), k, taille_bloc) for debut in range(0, n, taille_bloc)]
+    nb_processus = min(nb_processus or os.cpu_count() or 1, len(blocs))
+    if nb_processus <= 1:
+        _initialiser(chemin_vecteurs, lignes)
+        resultats = (_calculer_bloc(*bloc) for bloc in blocs)
+    else:
+        pool = ProcessPoolExecutor(nb_processus, initializer=_initialiser, initargs=(chemin_vecteurs, lignes))
+        resultats = pool.map(_calculer_bloc, *zip(*blocs))
+    try:
+        for debut, voisins_bloc, scores_bloc in resultats:
+            voisins[debut : debut + len(voisins_bloc)] = voisins_bloc
+            scores[debut : debut + len(scores_bloc)] = scores_bloc
+    finally:
+        if nb_processus > 1:
+            pool.shutdown()
+    return GrapheVoisins(ids, lignes, voisins, scores)
+
+
+class GrapheVoisins:
+    """
+    Voisins précalculés de chaque film, en tableaux de largeur fixe.
+    """
+
+    FICHIERS = ("ids", "lignes", "voisins", "scores")
+
+    def __init__(self, ids, lignes, voisins, scores):
+        self.ids = ids            # (n,) id_tmdb triés
+        self.lignes = lignes      # (n,) ligne de l'index vectoriel
+        self.voisins = voisins    # (n, k) positions dans ids, -1 si absent
+        self.scores = scores      # (n, k) similarité cosinus
+
+    def __len__(self):
+        return len(self.ids)
+
+    def position(self, id_tmdb):
+        i = int(np.searchsorted(self.ids, id_tmdb))
+        return i if i < len(self.ids) and self.ids[i] == id_tmdb else None
+
+    def voisins_positions(self, id_tmdb, k=None):
+        """
+        Positions (dans `ids`) et scores des voisins d'un film.
+        """
+        i = self.position(id_tmdb)
+        if i is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        voisins, scores = self.voisins[i, :k], self.scores[i, :k]
+        garder = voisins >= 0
+        return voisins[garder], scores[garder]
+
+    def plus_comme_ca(self, id_tmdb, k=None):
+        """
+        Plus comme celui-ci : [(id_tmdb, score)] des films les plus proches d'un film.
+        """
+        positions, scores = self.voisins_positions(id_tmdb, k)
+        return list(zip(self.ids[positions].tolist(), scores.tolist()))
+
+    def plus_comme_ceux_ci(self, ids, k=10):
+        """
+        id_tmdb des films proches d'un ensemble de films (voisins entrelacés,
+        par rang), sans doublon ni film de départ.
+        """
+        depart = list(dict.fromkeys(int(i) for i in ids))
+        listes = [self.plus_comme_ca(i, k) for i in depart]
+        resultat, vus = [], set(depart)
+        for rang in range(max((len(l) for l in listes), default=0)):
+            for liste in listes:
+                if rang < len(liste) and liste[rang][0] not in vus:
+                    vus.add(liste[rang][0])
+                    resultat.append(liste[rang][0])
+        return resultat[:k]
+
+    def save(self, path):
+        for nom in self.FICHIERS:
+            np.save(os.path.join(path, f"graphe_{nom}.npy"), np.ascontiguousarray(getattr(self, nom)))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Graphe projeté en mémoire, ou None s'il n'a pas été calculé.
+        """
+        chemins = [os.path.join(path, f"graphe_{nom}.npy") for nom in cls.FICHIERS]
+        if not all(os.path.exists(c) for c in chemins):
+            return None
+        return cls(*(np.load(c, mmap_mode="r") for c in chemins))
+
+
+def construire_pour_index(path, k=NB_VOISINS, taille_bloc=TAILLE_BLOC, nb_processus=None):
+    """
+    Calcule et enregistre le graphe d'un index vectoriel sauvegardé (dossier `path`).
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    table = ipc.open_file(pa.memory_map(os.path.join(path, "metadonnees.arrow"), "r")).read_all()
+    ids_lignes = table.column("id_tmdb").to_numpy()
+    debut = time.perf_counter()
+    graphe = construire_graphe(os.path.join(path, "vecteurs.npy"), ids_lignes, k, taille_bloc, nb_processus)
+    graphe.save(path)
+    print(f"Graphe des voisins : {len(graphe)} films, k={graphe.voisins.shape[1]}, "
+          f"{time.perf_counter() - debut:.1f} s")
+    return graphe
+
+
+def main():
+    """
+    Calcule le graphe des voisins de l'index vectoriel courant.
+    """
+    parser = argparse.ArgumentParser(description="Graphe des plus proches voisins entre films (embeddings)")
+    parser.add_argument("index", nargs="?", default=None, help="Dossier de l'index vectoriel")
+    parser.add_argument("--k", type=int, default=NB_VOISINS)
+    parser.add_argument("--taille-bloc", type=int, default=TAILLE_BLOC)
+    parser.add_argument("--processus", type=int, default=None)
+    args = parser.parse_args()
+
+    path = args.index
+    if path is None:
+        from utils.artefacts import dossier_courant
+
+        courant = dossier_courant()
+        path = os.path.join(courant, "vectorstore") if courant else "data/vectorstore"
+    construire_pour_index(path, args.k, args.taille_bloc, args.processus)
+
+
+if __name__ == "__main__":
+    main()